@@ -0,0 +1,314 @@
+# fixtures.py
+# Purpose: Record/replay stand-ins for AKShare and the REST API sessions, so benchmarks run offline
+# with stable inputs.
+#
+# Key Components:
+# - SyntheticFixtures: Deterministic generator producing frames shaped like every AKShare endpoint
+#   the agents read (same column names), plus JSON bodies for the MetalpriceAPI/Metals-API routes.
+# - RecordingBackend / ReplayBackend: Drop-in `backend` objects for DataLayer. Recording wraps the
+#   real akshare module and pickles each result; replay serves recorded results, falling back to
+#   synthetic data for calls that were never recorded.
+# - RecordingSession / ReplaySession: Drop-in `session` objects for the API clients (same get()
+#   signature as HTTPSession), recording or replaying response bodies.
+#
+# Fixtures are stored as <fixtures_dir>/<endpoint>/<key>.pkl (AKShare) and
+# <fixtures_dir>/http/<route>/<key>.json (REST), keyed by a hash of the call arguments.
+# API keys are never part of the key or the stored body.
+#
+# Usage:
+#   data = DataLayer(backend=RecordingBackend("benchmarks/fixtures"))   # record once, online
+#   data = DataLayer(backend=ReplayBackend("benchmarks/fixtures"))      # replay, offline
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.tools.data_access import _freeze
+
+# Call arguments that identify the caller rather than the data
+SECRET_PARAMS = {"api_key", "access_key"}
+
+
+def fixture_key(args: tuple, kwargs: Dict[str, Any]) -> str:
+    """Stable short hash of call arguments, ignoring secrets."""
+    kwargs = {k: v for k, v in kwargs.items() if k not in SECRET_PARAMS}
+    return hashlib.sha1(repr((_freeze(args), _freeze(kwargs))).encode("utf-8")).hexdigest()[:16]
+
+
+class SyntheticFixtures:
+    """
+    Generates deterministic data shaped like the upstream responses. The same seed and call
+    arguments always produce the same data, so benchmark runs are comparable across commits.
+    """
+
+    def __init__(self, seed: int = 0, history_days: int = 2500, news_items: int = 200, events: int = 120):
+        self.seed = seed
+        self.history_days = history_days
+        self.news_items = news_items
+        self.events = events
+
+    def _rng(self, name: str, args: tuple = (), kwargs: Optional[dict] = None) -> np.random.Generator:
+        digest = hashlib.sha1(f"{self.seed}:{name}:{fixture_key(args, kwargs or {})}".encode()).digest()
+        return np.random.default_rng(int.from_bytes(digest[:8], "little"))
+
+    @staticmethod
+    def _dates(n: int, freq: str = "D") -> pd.DatetimeIndex:
+        return pd.date_range(end=pd.Timestamp("2024-06-28"), periods=n, freq=freq)
+
+    @staticmethod
+    def price_series(n: int, rng: np.random.Generator, start: float = 1800.0, vol: float = 0.01,
+                     drift: float = 0.0002) -> np.ndarray:
+        """Geometric random walk used for every synthetic price path."""
+        return start * np.exp(np.cumsum(rng.normal(drift, vol, n)))
+
+    def _macro(self, rng, column: str, n: int, level: float, scale: float, freq: str = "MS") -> pd.DataFrame:
+        values = level + np.cumsum(rng.normal(0, scale, n))
+        return pd.DataFrame({"date": self._dates(n, freq).strftime("%Y-%m-%d"), column: values.round(3)})
+
+    def akshare(self, endpoint: str, *args, **kwargs) -> pd.DataFrame:
+        """Returns a synthetic frame for an AKShare endpoint used by the agents."""
+        rng = self._rng(endpoint, args, kwargs)
+        if endpoint == "macro_usa_cpi_monthly":
+            return self._macro(rng, "cpi", 300, 2.6, 0.15)
+        if endpoint == "macro_usa_interest_rate":
+            return self._macro(rng, "value", 300, 2.5, 0.1)
+        if endpoint == "macro_usa_gdp_yearly":
+            return self._macro(rng, "gdp", 120, 2.2, 0.3, freq="QS")
+        if endpoint == "macro_usa_unemployment_rate":
+            return self._macro(rng, "unemployment_rate", 300, 4.5, 0.1)
+        if endpoint in ("macro_world_gold_demand", "macro_world_gold_production"):
+            return self._macro(rng, "value", 80, 950.0, 25.0, freq="QS")
+        if endpoint == "macro_world_gold_reserves":
+            return self._macro(rng, "value", 80, 31000.0, 300.0, freq="QS")
+        if endpoint == "currency_latest":
+            symbols = str(kwargs.get("symbols", "EUR,CNY,JPY")).split(",")
+            base_rates = {"EUR": 0.92, "CNY": 7.2, "JPY": 155.0, "GBP": 0.79}
+            return pd.DataFrame({
+                "currency": symbols,
+                "date": "2024-06-28",
+                "base": kwargs.get("base", "USD"),
+                "rates": [base_rates.get(s, 1.0) * (1 + rng.normal(0, 0.005)) for s in symbols],
+            })
+        if endpoint == "macro_usa_cme_merchant_goods_holding":
+            n = 250
+            kinds = ["黄金-ETF", "白银-ETF", "铜"]
+            return pd.DataFrame({
+                "日期": np.repeat(self._dates(n).strftime("%Y-%m-%d"), len(kinds)),
+                "品种": kinds * n,
+                "持仓总量": (850 + np.cumsum(rng.normal(0, 3, n * len(kinds)))).round(2),
+            })
+        if endpoint in ("macro_info_ws", "news_economic_baidu"):
+            regions = ["美国", "中国", "欧元区", "日本", "英国"]
+            frame = pd.DataFrame({
+                "时间": [f"{h:02d}:{m:02d}" for h, m in zip(rng.integers(0, 24, self.events),
+                                                              rng.integers(0, 60, self.events))],
+                "地区": rng.choice(regions, self.events),
+                "事件": [f"事件{i}" for i in rng.integers(0, self.events * 2, self.events)],
+                "重要性": rng.integers(0, 4, self.events),
+            })
+            if endpoint == "news_economic_baidu":
+                frame.insert(0, "日期", str(kwargs.get("date") or "20240628"))
+            return frame
+        if endpoint == "news_cctv":
+            words = ["上涨", "利好", "增持", "创新高", "下跌", "利空", "减持", "创新低", "市场", "黄金", "央行"]
+            content = [" ".join(rng.choice(words, 40)) for _ in range(self.news_items)]
+            return pd.DataFrame({
+                "date": rng.choice(self._dates(30).strftime("%Y%m%d"), self.news_items),
+                "title": [text[:12] for text in content],
+                "content": content,
+            })
+        if endpoint == "gold_spot_hist_sina":
+            close = self.price_series(self.history_days, rng, start=400.0)
+            return pd.DataFrame({
+                "date": self._dates(self.history_days).strftime("%Y-%m-%d"),
+                "open": close * (1 + rng.normal(0, 0.002, self.history_days)),
+                "high": close * 1.005,
+                "low": close * 0.995,
+                "close": close,
+                "volume": rng.integers(1_000, 50_000, self.history_days),
+            })
+        raise KeyError(f"No synthetic fixture for AKShare endpoint '{endpoint}'.")
+
+    def http(self, route: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns a synthetic JSON body for a REST route (last URL path segment)."""
+        rng = self._rng(route, (), params)
+        currencies = str(params.get("currencies", "USD")).split(",")
+        if route == "latest":
+            return {"success": True, "base": params.get("base", "XAU"),
+                    "rates": {c: float(rng.uniform(0.5, 2500.0)) for c in currencies}}
+        if route == "timeframe":
+            start = date.fromisoformat(params["start_date"])
+            end = date.fromisoformat(params["end_date"])
+            days = (end - start).days + 1
+            paths = {c: self.price_series(days, rng) for c in currencies}
+            return {"success": True, "base": params.get("base", "XAU"),
+                    "rates": {(start + timedelta(days=i)).isoformat(): {c: float(paths[c][i]) for c in currencies}
+                              for i in range(days)}}
+        return {"success": True, "value": float(rng.normal(2.5, 0.5))}
+
+
+class ReplayBackend:
+    """
+    DataLayer backend serving recorded AKShare results from `fixtures_dir`. Calls without a
+    recording are answered by `synthetic`, or raise KeyError when `strict` is set.
+    `latency` adds a fixed delay per call to model network round trips.
+    """
+
+    def __init__(self, fixtures_dir: Optional[str] = None, synthetic: Optional[SyntheticFixtures] = None,
+                 latency: float = 0.0, strict: bool = False):
+        self.fixtures_dir = fixtures_dir
+        self.synthetic = None if strict else (synthetic or SyntheticFixtures())
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._loaded: Dict[tuple, Any] = {}
+
+    def _load(self, endpoint: str, key: str) -> Any:
+        if self.fixtures_dir is None:
+            return None
+        path = os.path.join(self.fixtures_dir, endpoint, f"{key}.pkl")
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def call(self, endpoint: str, *args, **kwargs) -> Any:
+        key = fixture_key(args, kwargs)
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            cached = self._loaded.get((endpoint, key))
+        if self.latency:
+            time.sleep(self.latency)
+        if cached is None:
+            cached = self._load(endpoint, key)
+            if cached is None:
+                if self.synthetic is None:
+                    raise KeyError(f"No recorded fixture for {endpoint}{args or ''}{kwargs or ''}.")
+                cached = self.synthetic.akshare(endpoint, *args, **kwargs)
+            with self._lock:
+                self._loaded[(endpoint, key)] = cached
+        # Hand out a copy, as a live backend returns a new frame on every call
+        return cached.copy() if hasattr(cached, "copy") else cached
+
+    def __getattr__(self, endpoint: str):
+        if endpoint.startswith("_"):
+            raise AttributeError(endpoint)
+        return lambda *args, **kwargs: self.call(endpoint, *args, **kwargs)
+
+
+class RecordingBackend:
+    """
+    DataLayer backend that forwards to the real AKShare module and pickles every result under
+    `fixtures_dir` for later replay.
+    """
+
+    def __init__(self, fixtures_dir: str, backend: Any = None):
+        self.fixtures_dir = fixtures_dir
+        self._backend = backend
+
+    @property
+    def backend(self) -> Any:
+        if self._backend is None:
+            import akshare
+            self._backend = akshare
+        return self._backend
+
+    def __getattr__(self, endpoint: str):
+        if endpoint.startswith("_"):
+            raise AttributeError(endpoint)
+
+        def call(*args, **kwargs):
+            result = getattr(self.backend, endpoint)(*args, **kwargs)
+            directory = os.path.join(self.fixtures_dir, endpoint)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{fixture_key(args, kwargs)}.pkl"), "wb") as f:
+                pickle.dump(result, f)
+            return result
+        return call
+
+
+class FixtureResponse:
+    """Minimal stand-in for requests.Response as used by the API clients."""
+
+    def __init__(self, body: Any, status_code: int = 200):
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+        self._body = body
+        self.content = json.dumps(body).encode("utf-8")
+
+    def json(self) -> Any:
+        return self._body
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} error (fixture)", response=self)
+
+
+def _http_path(fixtures_dir: str, url: str, params: Optional[Dict[str, Any]]) -> tuple:
+    route = url.rstrip("/").rsplit("/", 1)[-1]
+    key = fixture_key((), dict(params or {}))
+    return route, os.path.join(fixtures_dir, "http", route, f"{key}.json")
+
+
+class ReplaySession:
+    """
+    API client session replaying recorded response bodies, with synthetic bodies as the fallback.
+    """
+
+    def __init__(self, fixtures_dir: Optional[str] = None, synthetic: Optional[SyntheticFixtures] = None,
+                 latency: float = 0.0):
+        self.fixtures_dir = fixtures_dir
+        self.synthetic = synthetic or SyntheticFixtures()
+        self.latency = latency
+        self.requests = 0
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None) -> FixtureResponse:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        params = {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+        route, path = _http_path(self.fixtures_dir or "", url, params)
+        if self.fixtures_dir is not None and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                recorded = json.load(f)
+            return FixtureResponse(recorded["body"], recorded["status_code"])
+        return FixtureResponse(self.synthetic.http(route, params))
+
+    def close(self) -> None:
+        pass
+
+
+class RecordingSession:
+    """
+    API client session forwarding to a real HTTPSession and saving each response body.
+    """
+
+    def __init__(self, fixtures_dir: str, session):
+        self.fixtures_dir = fixtures_dir
+        self.session = session
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None):
+        response = self.session.get(url, params=params, timeout=timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            return response
+        clean = {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+        _, path = _http_path(self.fixtures_dir, url, clean)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"status_code": response.status_code, "body": body}, f)
+        return response
+
+    def close(self) -> None:
+        self.session.close()
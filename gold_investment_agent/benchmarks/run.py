@@ -0,0 +1,349 @@
+# run.py
+# Purpose: Offline benchmark suite for the analysis pipeline.
+# All upstream data comes from the record/replay stand-ins in benchmarks/fixtures.py, so runs are
+# repeatable and need no network access. Each run is saved as benchmarks/results/<commit>.json so
+# regressions between commits can be compared with --compare.
+#
+# Benchmarks:
+# - end_to_end: Coordinator.run_analysis latency (sequential and concurrent), plus per-agent latency
+#   taken from the run's metrics.
+# - synthesize: Coordinator.synthesize throughput on a large batch of agent outputs.
+# - synthesize_batch: Coordinator.synthesize_batch over scenarios x weight sets (what-if grid).
+# - indicators: data_tools.clean_data and add_technical_indicators on a 1M-row price series, plus the
+#   NumPy indicator engine (float64 and float32 output) against the pandas rolling code it replaced.
+# - api_clients: MetalPriceAPIClient.get_gold_history over ten years through a replayed session.
+#
+# Usage (from gold_investment_agent/):
+#   python -m benchmarks.run                       # replay (synthetic data unless recorded)
+#   python -m benchmarks.run --record              # record AKShare fixtures once, online
+#   python -m benchmarks.run --compare <commit>    # compare against a saved result
+#   python -m benchmarks.run --only indicators --rows 200000
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import ReplayBackend, ReplaySession, RecordingBackend, SyntheticFixtures
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+# A result is flagged when its median is this much slower than the baseline
+REGRESSION_THRESHOLD = 1.10
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """
+    Times fn() `repeat` times after `warmup` untimed calls. Returns summary statistics in seconds.
+    """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "repeat": repeat,
+        "min": times[0],
+        "median": statistics.median(times),
+        "p95": times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))],
+        "mean": statistics.fmean(times),
+    }
+
+
+def make_coordinator(fixtures_dir: Optional[str], concurrent: bool, latency: float, state_dir: str,
+                     backend=None):
+    """
+    Builds a Coordinator over all registered agents, wired to a private replay data layer.
+    Agents that persist state keep it in `state_dir`, never in the live data/state directory.
+    """
+    from src.agents.registry import available_agents, create_agents
+    from src.coordinator import Coordinator
+    from src.tools.data_access import DataLayer
+
+    backend = backend or ReplayBackend(fixtures_dir, latency=latency)
+    data = DataLayer(backend=backend, cache=None)
+    options = {name: {"data": data} for name in available_agents()}
+    options["technical_factors"]["state_dir"] = state_dir
+    options["investor_sentiment"]["state_dir"] = state_dir
+    return Coordinator(create_agents(options=options), concurrent=concurrent, data=data)
+
+
+def bench_end_to_end(fixtures_dir: Optional[str], repeat: int, latency: float) -> Dict[str, dict]:
+    """
+    Times run_analysis for both execution modes. Indicator and sentiment state is reset before
+    every run so each run does the same (cold) work.
+    """
+    from src.agents.investor_sentiment import LEXICONS, InvestorSentimentAgent
+    from src.tools.sentiment import SentimentIndex
+
+    results = {}
+    for mode, concurrent in (("sequential", False), ("concurrent", True)):
+        per_agent: Dict[str, List[float]] = {}
+        with tempfile.TemporaryDirectory() as state_dir:
+            coordinator = make_coordinator(fixtures_dir, concurrent, latency, state_dir)
+
+            def run():
+                for name in os.listdir(state_dir):
+                    os.remove(os.path.join(state_dir, name))
+                for agent in coordinator.agents:
+                    if isinstance(agent, InvestorSentimentAgent):
+                        # The index is held in memory as well as on disk
+                        agent.index = SentimentIndex(LEXICONS)
+                result = coordinator.run_analysis()
+                for span in result.get("metrics", {}).get("spans", []):
+                    if span["name"] == "agent":
+                        per_agent.setdefault(span["labels"]["agent"], []).append(span["total_seconds"])
+
+            stats = measure(run, repeat=repeat)
+        stats["per_agent_median"] = {agent: statistics.median(times) for agent, times in sorted(per_agent.items())}
+        results[mode] = stats
+    return results
+
+
+def synthetic_outputs(n: int, seed: int = 0) -> list:
+    """Random agent outputs (AgentSignal records) spread over the registered agent names."""
+    from src.signals import AgentSignal
+    rng = np.random.default_rng(seed)
+    agents = ["EconomicIndicatorsAgent", "TechnicalFactorsAgent", "InvestorSentimentAgent",
+              "CurrencyMovementsAgent", "GeopoliticalEventsAgent", "SupplyDemandAgent"]
+    signals = ["Buy", "Sell", "Hold"]
+    agent_idx = rng.integers(0, len(agents), n)
+    signal_idx = rng.integers(0, len(signals), n)
+    confidence = rng.uniform(0.3, 0.9, n).round(3)
+    return [AgentSignal(agents[a], signals[s], float(c), f"reason {i}")
+            for i, (a, s, c) in enumerate(zip(agent_idx, signal_idx, confidence))]
+
+
+def bench_synthesize(outputs: int, repeat: int) -> Dict[str, float]:
+    from src.coordinator import Coordinator
+
+    batch = synthetic_outputs(outputs)
+    coordinator = Coordinator([], data=object())
+    stats = measure(lambda: coordinator.synthesize(batch), repeat=repeat)
+    stats["outputs"] = outputs
+    stats["outputs_per_second"] = outputs / stats["median"]
+    return stats
+
+
+def bench_synthesize_batch(scenarios: int, weight_sets: int, repeat: int) -> Dict[str, float]:
+    from src.coordinator import Coordinator
+
+    coordinator = Coordinator([], data=object())
+    agents = list(coordinator.weights)
+    rng = np.random.default_rng(0)
+    signals = rng.integers(0, 3, (scenarios, len(agents)))
+    confidences = rng.uniform(0.3, 0.9, (scenarios, len(agents)))
+    weights = rng.uniform(0.0, 0.5, (weight_sets, len(agents)))
+    stats = measure(lambda: coordinator.synthesize_batch(signals, confidences, agents, weights), repeat=repeat)
+    stats["combinations"] = scenarios * weight_sets
+    stats["combinations_per_second"] = scenarios * weight_sets / stats["median"]
+    return stats
+
+
+def price_frame(rows: int, seed: int = 0, missing: float = 0.01) -> pd.DataFrame:
+    """
+    Synthetic gold price frame with a fraction of missing values, as found in raw merges.
+    Uses minute-bar volatility and no drift so a million rows stay in a realistic price range.
+    """
+    rng = np.random.default_rng(seed)
+    price = SyntheticFixtures.price_series(rows, rng, vol=0.0005, drift=0.0)
+    price[rng.random(rows) < missing] = np.nan
+    return pd.DataFrame({
+        "date": pd.date_range("1900-01-01", periods=rows, freq="D"),
+        "gold_price_usd": price,
+    })
+
+
+def pandas_indicators(price: pd.Series) -> dict:
+    """The pandas rolling MA20/MA50/RSI14 that data_tools used before the shared indicator engine."""
+    delta = price.diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    return {
+        "ma_20": price.rolling(window=20).mean(),
+        "ma_50": price.rolling(window=50).mean(),
+        "rsi_14": 100 - (100 / (1 + gain / (loss + 1e-9))),
+    }
+
+
+def bench_indicators(rows: int, repeat: int) -> Dict[str, dict]:
+    from src.tools import data_tools
+    from src.tools.indicators import TECHNICAL_SPEC, compute_indicators
+
+    df = price_frame(rows)
+    cleaned = data_tools.clean_data(df)
+    price = cleaned["gold_price_usd"]
+    values = price.to_numpy()
+    results = {
+        "clean_data": measure(lambda: data_tools.clean_data(df), repeat=repeat),
+        "add_technical_indicators": measure(lambda: data_tools.add_technical_indicators(cleaned), repeat=repeat),
+        "pandas_rolling": measure(lambda: pandas_indicators(price), repeat=repeat),
+        "engine": measure(lambda: compute_indicators(values, data_tools.INDICATOR_SPEC), repeat=repeat),
+        "engine_float32": measure(lambda: compute_indicators(values, data_tools.INDICATOR_SPEC, dtype=np.float32),
+                                  repeat=repeat),
+        "engine_wilder": measure(lambda: compute_indicators(values, TECHNICAL_SPEC), repeat=repeat),
+    }
+    for stats in results.values():
+        stats["rows"] = rows
+        stats["rows_per_second"] = rows / stats["median"]
+    results["engine"]["speedup_vs_pandas"] = results["pandas_rolling"]["median"] / results["engine"]["median"]
+    return results
+
+
+def bench_api_clients(fixtures_dir: Optional[str], repeat: int, latency: float) -> Dict[str, dict]:
+    from src.tools.api_tools import MetalPriceAPIClient
+
+    session = ReplaySession(fixtures_dir, latency=latency)
+    client = MetalPriceAPIClient(api_key="benchmark", session=session)
+    stats = measure(lambda: client.get_gold_history("2014-01-01", "2023-12-31", currencies=("USD", "EUR")),
+                    repeat=repeat)
+    stats["requests_per_call"] = session.requests / (repeat + 1)
+    return {"gold_history_10y": stats}
+
+
+BENCHMARKS = ("end_to_end", "synthesize", "synthesize_batch", "indicators", "api_clients")
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=BENCH_DIR, check=True)
+        commit = out.stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, cwd=BENCH_DIR).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    """Maps each benchmark's median to a dotted name, e.g. end_to_end.sequential."""
+    flat = {}
+    for key, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        name = f"{prefix}{key}"
+        if "median" in value:
+            flat[name] = value["median"]
+            for agent, seconds in value.get("per_agent_median", {}).items():
+                flat[f"{name}.{agent}"] = seconds
+        else:
+            flat.update(flatten(value, f"{name}."))
+    return flat
+
+
+def load_result(ref: str) -> dict:
+    """Loads a saved result by path or by (a prefix of) its commit id."""
+    if os.path.exists(ref):
+        path = ref
+    else:
+        matches = sorted(f for f in os.listdir(RESULTS_DIR) if f.startswith(ref) and f.endswith(".json")) \
+            if os.path.isdir(RESULTS_DIR) else []
+        if not matches:
+            raise SystemExit(f"No saved benchmark result matching '{ref}' in {RESULTS_DIR}.")
+        path = os.path.join(RESULTS_DIR, matches[-1])
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict) -> List[str]:
+    """Returns report lines comparing medians; ratios above REGRESSION_THRESHOLD are flagged."""
+    base = flatten(baseline["results"])
+    cur = flatten(current["results"])
+    lines = [f"Comparing {current['commit']} against {baseline['commit']} (median seconds)"]
+    for name in sorted(set(base) & set(cur)):
+        ratio = cur[name] / base[name] if base[name] else float("inf")
+        flag = "  REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+        lines.append(f"  {name:<60} {base[name]:>10.4f} -> {cur[name]:>10.4f}  x{ratio:5.2f}{flag}")
+    return lines
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the gold investment pipeline")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}.")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="Recorded fixtures directory.")
+    parser.add_argument("--record", action="store_true",
+                        help="Run every agent once against live AKShare, saving fixtures, then exit.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per benchmark.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in the indicator benchmark.")
+    parser.add_argument("--outputs", type=int, default=100_000, help="Agent outputs in the synthesize benchmark.")
+    parser.add_argument("--scenarios", type=int, default=10_000,
+                        help="Scenarios in the synthesize_batch benchmark (scored against 100 weight sets).")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated seconds per upstream call (models network round trips).")
+    parser.add_argument("--compare", help="Commit id or result file to compare against.")
+    parser.add_argument("--no-save", action="store_true", help="Don't write the result file.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.record:
+        with tempfile.TemporaryDirectory() as state_dir:
+            coordinator = make_coordinator(None, False, 0.0, state_dir, backend=RecordingBackend(args.fixtures))
+            coordinator.run_analysis()
+        print(f"Recorded fixtures to {args.fixtures}")
+        return
+
+    selected = [b.strip() for b in args.only.split(",")] if args.only else list(BENCHMARKS)
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    fixtures = args.fixtures if os.path.isdir(args.fixtures) else None
+
+    runners = {
+        "end_to_end": lambda: bench_end_to_end(fixtures, args.repeat, args.latency),
+        "synthesize": lambda: bench_synthesize(args.outputs, args.repeat),
+        "synthesize_batch": lambda: bench_synthesize_batch(args.scenarios, 100, args.repeat),
+        "indicators": lambda: bench_indicators(args.rows, args.repeat),
+        "api_clients": lambda: bench_api_clients(fixtures, args.repeat, args.latency),
+    }
+    results = {}
+    for name in selected:
+        print(f"Running {name}...")
+        try:
+            results[name] = runners[name]()
+        except Exception as e:
+            # Keep going so one broken code path doesn't hide the other numbers
+            print(f"  {name} failed: {type(e).__name__}: {e}")
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "fixtures": "recorded" if fixtures else "synthetic",
+        "settings": {"repeat": args.repeat, "rows": args.rows, "outputs": args.outputs,
+                     "scenarios": args.scenarios, "latency": args.latency},
+        "results": results,
+    }
+    for name, seconds in flatten(results).items():
+        print(f"  {name:<60} {seconds * 1000:>10.2f} ms")
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {path}")
+    if args.compare:
+        print("\n".join(compare(load_result(args.compare), report)))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,24 +6,26 @@
 # - CurrencyMovementsAgent: Main agent class for analysis.
 # - fetch_currency_rates: Fetches latest USD exchange rates for major currencies.
 # - fetch_gold_price: Fetches latest gold ETF (SPDR) holding as a proxy for gold price.
-# - analyze: Main method to perform analysis and update shared state.
+# - analyze: Main method to perform analysis; returns an AgentSignal (src/signals.py). The raw rate
+#   and holding frames stay in the data layer and are referenced (refs), not copied into the output.
 #
 # Dependencies:
-# - akshare: For financial and macroeconomic data retrieval.
+# - akshare: For financial and macroeconomic data retrieval (via the shared data layer in src/tools/data_access.py).
 # - dotenv: For secure API key management (if needed).
 #
 # Usage:
 #   agent = CurrencyMovementsAgent()
-#   state = {}
-#   updated_state = agent.analyze(state)
+#   output = agent.analyze({})
 #
 # Note:
 #   - Requires AKShare to be installed: pip install akshare
 #   - If using API keys for currency endpoints, set AKSHARE_CURRENCY_API_KEY in your .env file.
 
-import akshare as ak
 import os
 from dotenv import load_dotenv
+from src.signals import AgentSignal, data_ref
+from src.tools.concurrency import fetch_all
+from src.tools.data_access import get_data_layer
 
 class CurrencyMovementsAgent:
     """
@@ -31,15 +33,23 @@ class CurrencyMovementsAgent:
     Utilizes AKShare to fetch both currency and gold price data, then summarizes their relationship.
     """
 
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, data=None):
         """
         Initialize the agent, loading API key from environment if not provided.
         Args:
             api_key (str, optional): API key for AKShare currency endpoints. Defaults to None.
+            data (DataLayer, optional): Shared data layer. Defaults to the process-wide layer.
         """
         load_dotenv()  # Load environment variables from .env file
         self.api_key = api_key or os.getenv("AKSHARE_CURRENCY_API_KEY")
         self.base_currency = "USD"  # Default base currency for analysis
+        self.data = data or get_data_layer()
+
+    def currency_rates_ref(self, symbols=["EUR", "CNY", "JPY"]) -> dict:
+        """
+        Data-layer reference for fetch_currency_rates (the API key is not stored in references).
+        """
+        return data_ref("currency_latest", base=self.base_currency, symbols=",".join(symbols))
 
     def fetch_currency_rates(self, symbols=["EUR", "CNY", "JPY"]):
         """
@@ -50,7 +60,8 @@ class CurrencyMovementsAgent:
             pandas.DataFrame: DataFrame containing currency codes and their latest rates.
         """
         # Example: USD/EUR, USD/CNY, USD/JPY
-        rates_df = ak.currency_latest(base=self.base_currency, symbols=",".join(symbols), api_key=self.api_key)
+        rates_df = self.data.fetch("currency_latest", base=self.base_currency, symbols=",".join(symbols),
+                                   api_key=self.api_key)
         return rates_df
 
     def fetch_gold_price(self):
@@ -59,36 +70,41 @@ class CurrencyMovementsAgent:
         Returns:
             pandas.DataFrame: DataFrame containing gold ETF holding data.
         """
-        gold_df = ak.macro_usa_cme_merchant_goods_holding()
+        gold_df = self.data.fetch("macro_usa_cme_merchant_goods_holding")
         return gold_df
 
-    def analyze(self, state: dict) -> dict:
+    def analyze(self, state: dict) -> AgentSignal:
         """
-        Main analysis method. Fetches relevant currency rates and gold price, analyzes their relationship,
-        and updates the shared state with a summary analysis and raw data.
+        Main analysis method. Fetches relevant currency rates and gold price and summarizes their relationship.
+        The agent has no directional rule yet, so it votes Hold with neutral confidence (0.5); the latest
+        rates and ETF holding are reported as details, the raw frames as data-layer references.
         Args:
-            state (dict): Shared state dictionary to be updated with analysis results.
+            state (dict): Shared state (unused).
         Returns:
-            dict: Updated state with currency and gold analysis.
+            AgentSignal: Currency analysis output.
         """
-        # Fetch latest currency rates (USD vs. major currencies)
-        currency_rates = self.fetch_currency_rates()
-        # Fetch latest gold ETF holding data
-        gold_price_df = self.fetch_gold_price()
-
-        # Extract the latest gold ETF holding value (last row, '持仓总量' column)
-        latest_gold_price = gold_price_df.iloc[-1]["持仓总量"]  # Adjust column if needed
+        try:
+            # Fetch latest currency rates (USD vs. major currencies) and gold ETF holding data in parallel
+            data = fetch_all({
+                "currency_rates": self.fetch_currency_rates,
+                "gold_price": self.fetch_gold_price,
+            })
+            currency_rates = data["currency_rates"]
+            gold_price_df = data["gold_price"]
 
-        # Compose a human-readable analysis summary
-        summary = (
-            f"Latest USD exchange rates: {currency_rates[['currency', 'rates']].to_dict(orient='records')}\n"
-            f"Latest Gold ETF (SPDR) holding: {latest_gold_price}\n"
-            "Analysis: If USD strengthens, gold price may weaken (and vice versa). "
-            "Recent trends should be monitored for correlation."
-        )
+            # Extract the latest gold ETF holding value (last row, '持仓总量' column)
+            latest_gold_price = gold_price_df.iloc[-1]["持仓总量"]  # Adjust column if needed
+            rates = dict(zip(currency_rates["currency"], currency_rates["rates"]))
 
-        # Update the shared state with analysis and raw data
-        state['currency_analysis'] = summary
-        state['currency_rates'] = currency_rates
-        state['gold_price'] = latest_gold_price
-        return state 
\ No newline at end of file
+            reasoning = (
+                f"Latest USD exchange rates: {rates}. Latest Gold ETF (SPDR) holding: {latest_gold_price}. "
+                "If USD strengthens, gold price may weaken (and vice versa); "
+                "recent trends should be monitored for correlation."
+            )
+            return AgentSignal("CurrencyMovementsAgent", "Hold", 0.5, reasoning,
+                               details={"usd_rates": rates, "gold_etf_holding": latest_gold_price},
+                               refs={"currency_rates": self.currency_rates_ref(),
+                                     "gold_price": data_ref("macro_usa_cme_merchant_goods_holding")})
+        except Exception as e:
+            return AgentSignal("CurrencyMovementsAgent", "Hold", 0.1,
+                               f"Error fetching currency data: {e}")
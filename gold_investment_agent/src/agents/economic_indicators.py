@@ -3,11 +3,13 @@
 # This agent fetches and analyzes economic data to assess its impact on gold prices.
 #
 # Dependencies:
-# - akshare (for macroeconomic data)
-# - Output: {agent, signal, confidence, reasoning, cpi, interest_rate, gdp, unemployment, timestamp}
+# - akshare (for macroeconomic data, via the shared data layer in src/tools/data_access.py)
+# - Output: AgentSignal (src/signals.py) with details cpi, interest_rate, gdp, unemployment, timestamp
 
-import akshare as ak
 from datetime import datetime
+from src.signals import AgentSignal
+from src.tools.concurrency import fetch_all
+from src.tools.data_access import get_data_layer
 
 class EconomicIndicatorsAgent:
     """
@@ -15,8 +17,8 @@ class EconomicIndicatorsAgent:
     and assess their impact on gold prices. Uses Akshare for data.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, data=None):
+        self.data = data or get_data_layer()  # Shared data layer (coalesces duplicate fetches)
 
     def fetch_us_cpi(self):
         """
@@ -24,7 +26,7 @@ class EconomicIndicatorsAgent:
         Returns:
             float or None: Latest CPI value if available, else None.
         """
-        df = ak.macro_usa_cpi_monthly()
+        df = self.data.fetch("macro_usa_cpi_monthly")
         latest = df.iloc[-1]
         return float(latest['cpi']) if 'cpi' in latest else None
 
@@ -34,7 +36,7 @@ class EconomicIndicatorsAgent:
         Returns:
             float or None: Latest interest rate if available, else None.
         """
-        df = ak.macro_usa_interest_rate()
+        df = self.data.fetch("macro_usa_interest_rate")
         latest = df.iloc[-1]
         return float(latest['value']) if 'value' in latest else None
 
@@ -44,7 +46,7 @@ class EconomicIndicatorsAgent:
         Returns:
             float or None: Latest GDP value if available, else None.
         """
-        df = ak.macro_usa_gdp_yearly()
+        df = self.data.fetch("macro_usa_gdp_yearly")
         latest = df.iloc[-1]
         return float(latest['gdp']) if 'gdp' in latest else None
 
@@ -54,11 +56,11 @@ class EconomicIndicatorsAgent:
         Returns:
             float or None: Latest unemployment rate if available, else None.
         """
-        df = ak.macro_usa_unemployment_rate()
+        df = self.data.fetch("macro_usa_unemployment_rate")
         latest = df.iloc[-1]
         return float(latest['unemployment_rate']) if 'unemployment_rate' in latest else None
 
-    def analyze(self, state: dict) -> dict:
+    def analyze(self, state: dict) -> AgentSignal:
         """
         Fetches US macroeconomic indicators, analyzes them, and returns a structured output.
         Args:
@@ -67,10 +69,14 @@ class EconomicIndicatorsAgent:
             dict: Analysis result with agent, signal, confidence, reasoning, and raw values.
         """
         try:
-            cpi = self.fetch_us_cpi()
-            ir = self.fetch_us_interest_rate()
-            gdp = self.fetch_us_gdp()
-            unemp = self.fetch_us_unemployment()
+            # The four macro series are independent, so fetch them in parallel
+            values = fetch_all({
+                "cpi": self.fetch_us_cpi,
+                "ir": self.fetch_us_interest_rate,
+                "gdp": self.fetch_us_gdp,
+                "unemp": self.fetch_us_unemployment,
+            })
+            cpi, ir, gdp, unemp = values["cpi"], values["ir"], values["gdp"], values["unemp"]
 
             # Example logic: high inflation and low rates are bullish for gold
             if cpi is not None and ir is not None:
@@ -95,14 +101,10 @@ class EconomicIndicatorsAgent:
             confidence = 0.1
             reasoning = f"Error fetching macroeconomic data: {e}"
 
-        return {
-            "agent": "EconomicIndicatorsAgent",
-            "signal": signal,
-            "confidence": confidence,
-            "reasoning": reasoning,
+        return AgentSignal("EconomicIndicatorsAgent", signal, confidence, reasoning, details={
             "cpi": cpi if 'cpi' in locals() else None,
             "interest_rate": ir if 'ir' in locals() else None,
             "gdp": gdp if 'gdp' in locals() else None,
             "unemployment": unemp if 'unemp' in locals() else None,
             "timestamp": datetime.now().isoformat()
-        } 
\ No newline at end of file
+        }) 
\ No newline at end of file
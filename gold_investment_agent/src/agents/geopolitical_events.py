@@ -1,13 +1,85 @@
 # geopolitical_events.py
 # Purpose: Monitor and analyze global macroeconomic and geopolitical events that influence gold prices.
 # This agent processes macro event data to assess risk for gold investment.
+# Risk is assessed over a trailing window of `window_days` days ending at `date` (default: today):
+# - Every (source, day) fetch of the window runs in parallel, so a window costs about one fetch's latency.
+# - Past days are immutable: they are cached on disk without expiry (DataLayer.fetch_immutable) and
+#   kept in memory once summarized, so after the first run only the current day is fetched and merged.
+#   A day summarized before it ended (while it was today) is fetched once more after midnight.
+# - Events from both sources are merged and deduplicated on (date, region, event), keeping the
+#   highest importance, so an event listed by both feeds counts once.
+# - Window totals are kept as running sums: a new day is added, days leaving the window are subtracted,
+#   and the current day's summary is replaced on each run.
+# Failed fetches are reported in the reasoning and details (errors) rather than dropped.
 #
 # Dependencies:
-# - akshare (for macro event data)
-# - Output: {agent, signal, confidence, reasoning, event_count, high_importance_count, events}
+# - akshare (for macro event data, via the shared data layer in src/tools/data_access.py)
+# - Output: AgentSignal (src/signals.py) with details event_count, high_importance_count, events, date,
+#   window_days, errors
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+from src.signals import AgentSignal
+from src.tools.concurrency import fetch_all
+from src.tools.data_access import get_data_layer
+
+SOURCES = ("macro_info_ws", "news_economic_baidu")
+EVENT_COLUMNS = ["日期", "时间", "地区", "事件", "重要性"]
+# Events at or above this importance count as high-importance (3=high, 2=medium, 1=low)
+HIGH_IMPORTANCE = 2
+# High-importance events per day (averaged over the window) at which the agent signals Buy
+HIGH_IMPORTANCE_EVENTS = 5
+# Upper bound on parallel (source, day) fetches
+MAX_FETCH_WORKERS = 8
+
+
+def merge_events(day: str, frames) -> dict:
+    """
+    Merges one day's event frames from several sources into an index keyed on (日期, 地区, 事件);
+    an event listed more than once keeps its highest importance (and the time of that listing).
+    Args:
+        day (str): The day the frames were fetched for (YYYYMMDD); used as 日期 for every event.
+        frames (list): Source DataFrames (None or empty frames are skipped).
+    Returns:
+        dict: (日期, 地区, 事件) -> (时间, 重要性), sorted by key.
+    """
+    index = {}
+    for df in frames:
+        if df is None or df.empty:
+            continue
+        times = df["时间"].astype(str) if "时间" in df.columns else [""] * len(df)
+        importance = pd.to_numeric(df["重要性"], errors="coerce").fillna(0).tolist()
+        for time, region, event, level in zip(times, df["地区"].astype(str), df["事件"].astype(str), importance):
+            key = (day, region, event)
+            if key not in index or level > index[key][1]:
+                index[key] = (time, level)
+    return dict(sorted(index.items()))
+
+
+def _day_end(day: str) -> float:
+    """Unix time at which a day (YYYYMMDD, local time) ends."""
+    return (datetime.strptime(day, "%Y%m%d") + timedelta(days=1)).timestamp()
+
+
+class _Day:
+    """
+    Summary of one day's merged events; `complete` is False if any source failed, and
+    `fetched_at` is the Unix time the fetch started (a summary taken before the day's end is partial).
+    """
+    __slots__ = ("event_count", "high_importance", "errors", "complete", "fetched_at")
+
+    def __init__(self, events: dict, errors: list, fetched_at: float):
+        self.fetched_at = fetched_at
+        self.event_count = len(events)
+        self.high_importance = [dict(zip(EVENT_COLUMNS, (day, time, region, event, level)))
+                                for (day, region, event), (time, level) in events.items()
+                                if level >= HIGH_IMPORTANCE]
+        self.errors = errors
+        self.complete = not errors
 
-import akshare as ak
-from datetime import datetime
 
 class GeopoliticalEventsAgent:
     """
@@ -15,66 +87,122 @@ class GeopoliticalEventsAgent:
     that may influence gold prices. Uses Akshare for macro event data.
     """
 
-    def __init__(self, date=None):
-        # Default to today if no date is provided
+    def __init__(self, date=None, data=None, window_days=1):
+        """
+        Args:
+            date (str, optional): Last day of the window (YYYYMMDD). Defaults to the current day at each run.
+            data (DataLayer, optional): Shared data layer. Defaults to the process-wide layer.
+            window_days (int): Number of trailing days (including `date`) to assess risk over.
+        """
+        if window_days < 1:
+            raise ValueError("window_days must be at least 1.")
+        self.fixed_date = date
         self.date = date or datetime.now().strftime("%Y%m%d")
+        self.window_days = window_days
+        self.data = data or get_data_layer()  # Shared data layer (coalesces duplicate fetches)
+        self._lock = threading.Lock()
+        self._days = {}  # day -> _Day for the days of the current window
+        self._event_count = 0
+        self._high_count = 0
 
-    def fetch_macro_events(self):
+    def window(self) -> list:
+        """The days of the current window, oldest first (YYYYMMDD strings)."""
+        end = datetime.strptime(self.date, "%Y%m%d")
+        return [(end - timedelta(days=i)).strftime("%Y%m%d") for i in range(self.window_days - 1, -1, -1)]
+
+    def _fetch_day(self, endpoint: str, day: str, today: str):
+        """Fetches one source for one day; returns (DataFrame or None, error message or None)."""
+        try:
+            if day < today:
+                # The day is over: cache it for good, unless the cached copy predates the day's end
+                return self.data.fetch_immutable(endpoint, date=day, stored_after=_day_end(day)), None
+            return self.data.fetch(endpoint, date=day), None
+        except Exception as e:
+            return None, f"{endpoint} {day}: {e}"
+
+    def fetch_macro_events(self, days=None) -> dict:
         """
-        Fetch global macroeconomic events for the given date using AKShare.
+        Fetch global macroeconomic events for the given days (default: the current date) using AKShare.
+        Every (source, day) pair is fetched in parallel.
         Returns:
-            DataFrame: Combined events from macro_info_ws and news_economic_baidu.
+            dict: day -> _Day with the merged, deduplicated events of macro_info_ws and news_economic_baidu.
         """
-        try:
-            ws_df = ak.macro_info_ws(date=self.date)
-        except Exception:
-            ws_df = None
-        try:
-            baidu_df = ak.news_economic_baidu(date=self.date)
-        except Exception:
-            baidu_df = None
-        return ws_df, baidu_df
+        days = days or [self.date]
+        fetched_at = time.time()
+        today = datetime.fromtimestamp(fetched_at).strftime("%Y%m%d")
+        calls = {(endpoint, day): (lambda e=endpoint, d=day: self._fetch_day(e, d, today))
+                 for day in days for endpoint in SOURCES}
+        fetched = fetch_all(calls, max_workers=min(len(calls), MAX_FETCH_WORKERS))
+        summaries = {}
+        for day in days:
+            results = [fetched[(endpoint, day)] for endpoint in SOURCES]
+            summaries[day] = _Day(merge_events(day, [df for df, _ in results]),
+                                  [error for _, error in results if error], fetched_at)
+        return summaries
 
-    def analyze(self, state: dict) -> dict:
+    def update_window(self) -> list:
+        """
+        Brings the window up to date: fetches the days that are new, still in progress (today),
+        previously incomplete or summarized before they ended, drops days that left the window,
+        and adjusts the running totals.
+        Returns the window's days.
+        """
+        self.date = self.fixed_date or datetime.now().strftime("%Y%m%d")
+        today = datetime.now().strftime("%Y%m%d")
+        days = self.window()
+        with self._lock:
+            for day in [d for d in self._days if d not in days]:
+                self._remove(day)
+            stale = [d for d in days if d not in self._days or d >= today or not self._days[d].complete
+                     or self._days[d].fetched_at < _day_end(d)]
+        summaries = self.fetch_macro_events(stale) if stale else {}
+        with self._lock:
+            for day, summary in summaries.items():
+                if day in self._days:
+                    self._remove(day)
+                self._days[day] = summary
+                self._event_count += summary.event_count
+                self._high_count += len(summary.high_importance)
+        return days
+
+    def _remove(self, day: str) -> None:
+        summary = self._days.pop(day)
+        self._event_count -= summary.event_count
+        self._high_count -= len(summary.high_importance)
+
+    def analyze(self, state: dict) -> AgentSignal:
         """
         Fetches global macroeconomic events, analyzes their risk, and returns a structured output.
         """
+        errors = []
         try:
-            ws_df, baidu_df = self.fetch_macro_events()
-            event_count = 0
-            high_importance_count = 0
-            reasoning = ""
-            events = []
-
-            # Analyze Wallstreetcn macro calendar
-            if ws_df is not None and not ws_df.empty:
-                # Importance: 3=high, 2=medium, 1=low
-                high_importance = ws_df[ws_df['重要性'] >= 2]
-                high_importance_count += len(high_importance)
-                event_count += len(ws_df)
-                events += high_importance[['时间', '地区', '事件', '重要性']].to_dict(orient='records')
-
-            # Analyze Baidu macro events
-            if baidu_df is not None and not baidu_df.empty:
-                # Importance: higher number = more important
-                high_importance_baidu = baidu_df[baidu_df['重要性'] >= 2]
-                high_importance_count += len(high_importance_baidu)
-                event_count += len(baidu_df)
-                events += high_importance_baidu[['日期', '时间', '地区', '事件', '重要性']].to_dict(orient='records')
+            days = self.update_window()
+            with self._lock:
+                summaries = [self._days[day] for day in days]
+                event_count = self._event_count
+                high_importance_count = self._high_count
+            errors = [error for summary in summaries for error in summary.errors]
+            events = [event for summary in summaries for event in summary.high_importance]
+            span = "today" if self.window_days == 1 else f"in the last {self.window_days} days"
+            failed = f" ({len(errors)} of {len(days) * len(SOURCES)} fetches failed)" if errors else ""
 
             # Simple logic: many high-importance events = risk = bullish for gold
-            if high_importance_count >= 5:
+            if len(errors) == len(days) * len(SOURCES):
+                signal = "Hold"
+                confidence = 0.1
+                reasoning = f"Error fetching macroeconomic event data: {errors[0]}"
+            elif high_importance_count >= HIGH_IMPORTANCE_EVENTS * self.window_days:
                 signal = "Buy"
                 confidence = 0.7
-                reasoning = f"{high_importance_count} high-importance macro events detected today. Gold is a safe haven."
+                reasoning = f"{high_importance_count} high-importance macro events detected {span}. Gold is a safe haven.{failed}"
             elif high_importance_count == 0:
                 signal = "Hold"
                 confidence = 0.4
-                reasoning = "No significant macroeconomic/geopolitical events today."
+                reasoning = f"No significant macroeconomic/geopolitical events {span}.{failed}"
             else:
                 signal = "Hold"
                 confidence = 0.5
-                reasoning = f"{high_importance_count} moderate macro events. No strong risk signal."
+                reasoning = f"{high_importance_count} moderate macro events {span}. No strong risk signal.{failed}"
 
         except Exception as e:
             signal = "Hold"
@@ -84,13 +212,11 @@ class GeopoliticalEventsAgent:
             high_importance_count = 0
             events = []
 
-        return {
-            "agent": "GeopoliticalEventsAgent",
-            "signal": signal,
-            "confidence": confidence,
-            "reasoning": reasoning,
+        return AgentSignal("GeopoliticalEventsAgent", signal, confidence, reasoning, details={
             "event_count": event_count,
             "high_importance_count": high_importance_count,
             "events": events,
-            "date": self.date
-        } 
\ No newline at end of file
+            "date": self.date,
+            "window_days": self.window_days,
+            "errors": errors,
+        })
@@ -1,46 +1,92 @@
 # investor_sentiment.py
 # Purpose: Analyze investor sentiment from news and social media using NLP techniques.
 # This agent uses sentiment analysis to gauge market mood and its impact on gold prices.
+# Articles are scored incrementally by a SentimentIndex whose state is persisted between runs:
+# each article's keyword counts are cached by content hash, so a run only scores articles it has
+# not seen before, and near-duplicate articles (syndicated copies) count once.
 #
 # Dependencies:
-# - akshare (for news data)
-# - Output: {agent, signal, confidence, reasoning}
+# - akshare (for news data, via the shared data layer in src/tools/data_access.py)
+# - src/tools/sentiment.py (single-pass lexicon matching, content-hash cache, MinHash dedup)
+# - Output: AgentSignal (src/signals.py) with details articles, unique_articles, new_articles
+
+import hashlib
+import os
+import threading
+
+from src.signals import AgentSignal
+from src.tools.data_access import get_data_layer
+from src.tools.sentiment import SentimentIndex
+
+# Simple sentiment lexicons (placeholder); changing them rebuilds the persisted index
+LEXICONS = {
+    "positive": ["上涨", "利好", "增持", "创新高"],
+    "negative": ["下跌", "利空", "减持", "创新低"],
+}
 
-import akshare as ak
 
 class InvestorSentimentAgent:
     """
     Agent to analyze investor sentiment from news and social media using NLP techniques.
     Uses Akshare for news data. Users can adjust endpoints or keywords as needed.
     """
-    def __init__(self, keyword="黄金"):
+    def __init__(self, keyword="黄金", data=None, state_dir="data/state"):
+        """
+        Args:
+            keyword (str): News keyword passed to news_cctv.
+            data (DataLayer, optional): Shared data layer. Defaults to the process-wide layer.
+            state_dir (str, optional): Directory for the persisted sentiment index; None disables persistence.
+        """
         self.keyword = keyword  # Users can adjust the news keyword as needed
+        self.data = data or get_data_layer()  # Shared data layer (coalesces duplicate fetches)
+        name = hashlib.sha1(keyword.encode("utf-8")).hexdigest()[:8]
+        self.state_path = os.path.join(state_dir, f"sentiment_{name}.npz") if state_dir else None
+        self.index = SentimentIndex.load(self.state_path, LEXICONS) if self.state_path else SentimentIndex(LEXICONS)
+        self._lock = threading.Lock()
+
+    def score_news(self, news_df) -> tuple:
+        """
+        Scores the articles in `news_df` (only those not seen before are matched against the
+        lexicons), persists the new ones (appended to the index's journal), and returns
+        (totals, stats) from SentimentIndex.score.
+        """
+        with self._lock:
+            totals, stats = self.index.score(news_df['content'].tolist())
+            if self.state_path and stats["new"]:
+                try:
+                    self.index.save(self.state_path)
+                except OSError as e:
+                    print(f"Could not save sentiment state to {self.state_path}: {e}")
+        return totals, stats
 
-    def analyze(self, state: dict) -> dict:
+    def analyze(self, state: dict) -> AgentSignal:
         """
         Fetches recent news using Akshare, performs simple sentiment analysis, and returns a structured output.
         """
+        details = {}
         try:
             # Fetch latest news related to gold ("黄金")
-            news_df = ak.news_cctv(keyword=self.keyword)
+            news_df = self.data.fetch("news_cctv", keyword=self.keyword)
             if not news_df.empty:
-                # Simple sentiment logic: count positive/negative words (placeholder)
-                positive_words = ["上涨", "利好", "增持", "创新高"]
-                negative_words = ["下跌", "利空", "减持", "创新低"]
-                pos_count = news_df['content'].str.count('|'.join(positive_words)).sum()
-                neg_count = news_df['content'].str.count('|'.join(negative_words)).sum()
+                # Simple sentiment logic: count positive/negative words once per distinct story
+                totals, stats = self.score_news(news_df)
+                pos_count, neg_count = totals["positive"], totals["negative"]
+                details = {"articles": stats["articles"], "unique_articles": stats["unique"],
+                           "new_articles": stats["new"]}
+                counts = (f"pos: {pos_count}, neg: {neg_count}; "
+                          f"{stats['unique']} distinct of {stats['articles']} articles")
                 if pos_count > neg_count:
                     signal = "Buy"
                     confidence = 0.6
-                    reasoning = f"Recent news sentiment is positive for gold (pos: {pos_count}, neg: {neg_count})."
+                    reasoning = f"Recent news sentiment is positive for gold ({counts})."
                 elif neg_count > pos_count:
                     signal = "Sell"
                     confidence = 0.6
-                    reasoning = f"Recent news sentiment is negative for gold (pos: {pos_count}, neg: {neg_count})."
+                    reasoning = f"Recent news sentiment is negative for gold ({counts})."
                 else:
                     signal = "Hold"
                     confidence = 0.4
-                    reasoning = f"Recent news sentiment is neutral for gold (pos: {pos_count}, neg: {neg_count})."
+                    reasoning = f"Recent news sentiment is neutral for gold ({counts})."
             else:
                 signal = "Hold"
                 confidence = 0.3
@@ -49,9 +95,4 @@ class InvestorSentimentAgent:
             signal = "Hold"
             confidence = 0.1
             reasoning = f"Error fetching news data: {e}"
-        return {
-            "agent": "InvestorSentimentAgent",
-            "signal": signal,
-            "confidence": confidence,
-            "reasoning": reasoning
-        } 
\ No newline at end of file
+        return AgentSignal("InvestorSentimentAgent", signal, confidence, reasoning, details=details)
@@ -0,0 +1,57 @@
+# registry.py
+# Purpose: Declare the available agents by name and import them only when selected.
+# Importing an agent module is deferred until the agent is requested, so partial runs and
+# health checks don't pay for modules (and their dependencies) they never use.
+#
+# Usage:
+#   from src.agents.registry import create_agents, available_agents
+#   agents = create_agents(["technical_factors", "investor_sentiment"])
+
+import importlib
+from typing import Dict, List, Optional, Tuple
+
+# name -> (module path, class name), in the Coordinator's default order
+AGENT_REGISTRY: Dict[str, Tuple[str, str]] = {
+    "economic_indicators": ("src.agents.economic_indicators", "EconomicIndicatorsAgent"),
+    "currency_movements": ("src.agents.currency_movements", "CurrencyMovementsAgent"),
+    "geopolitical_events": ("src.agents.geopolitical_events", "GeopoliticalEventsAgent"),
+    "supply_demand": ("src.agents.supply_demand", "SupplyDemandAgent"),
+    "investor_sentiment": ("src.agents.investor_sentiment", "InvestorSentimentAgent"),
+    "technical_factors": ("src.agents.technical_factors", "TechnicalFactorsAgent"),
+}
+
+
+def available_agents() -> List[str]:
+    """Returns the registered agent names without importing any agent module."""
+    return list(AGENT_REGISTRY)
+
+
+def resolve_name(name: str) -> str:
+    """
+    Maps a registry name or an agent class name (e.g. "TechnicalFactorsAgent") to its registry name.
+    Raises KeyError for unknown agents.
+    """
+    if name in AGENT_REGISTRY:
+        return name
+    for key, (_, class_name) in AGENT_REGISTRY.items():
+        if class_name == name:
+            return key
+    raise KeyError(f"Unknown agent '{name}'. Available: {', '.join(AGENT_REGISTRY)}")
+
+
+def load_agent_class(name: str):
+    """Imports and returns the agent class registered under `name`."""
+    module_path, class_name = AGENT_REGISTRY[resolve_name(name)]
+    return getattr(importlib.import_module(module_path), class_name)
+
+
+def create_agents(names: Optional[List[str]] = None, options: Optional[Dict[str, dict]] = None) -> list:
+    """
+    Instantiates the selected agents (all registered agents by default), importing only their modules.
+    Args:
+        names (list, optional): Registry or class names to create, in order.
+        options (dict, optional): Constructor keyword arguments per registry name.
+    """
+    options = options or {}
+    selected = [resolve_name(n) for n in (names or available_agents())]
+    return [load_agent_class(name)(**options.get(name, {})) for name in selected]
@@ -3,11 +3,14 @@
 # This agent evaluates supply and demand data to determine their effect on gold prices.
 #
 # Dependencies:
-# - akshare (for gold supply/demand data)
-# - Output: {agent, signal, confidence, reasoning, etf_holding, world_demand, central_bank_reserves, production}
+# - akshare (for gold supply/demand data, via the shared data layer in src/tools/data_access.py)
+# - Output: AgentSignal (src/signals.py) with details etf_holding, world_demand, central_bank_reserves,
+#   production, timestamp
 
-import akshare as ak
 from datetime import datetime
+from src.signals import AgentSignal
+from src.tools.concurrency import fetch_all
+from src.tools.data_access import get_data_layer
 
 class SupplyDemandAgent:
     """
@@ -15,12 +18,12 @@ class SupplyDemandAgent:
     and assess their effect on gold prices. Uses Akshare for data.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, data=None):
+        self.data = data or get_data_layer()  # Shared data layer (coalesces duplicate fetches)
 
     def fetch_etf_holding(self):
         """Fetch latest SPDR Gold Trust ETF holding (proxy for investment demand)."""
-        df = ak.macro_usa_cme_merchant_goods_holding()
+        df = self.data.fetch("macro_usa_cme_merchant_goods_holding")
         latest = df[df['品种'] == '黄金-ETF']
         if not latest.empty:
             return float(latest.iloc[-1]['持仓总量'])
@@ -29,7 +32,7 @@ class SupplyDemandAgent:
     def fetch_world_demand(self):
         """Fetch latest world gold demand."""
         try:
-            df = ak.macro_world_gold_demand()
+            df = self.data.fetch("macro_world_gold_demand")
             if not df.empty:
                 return float(df.iloc[-1]['value'])
         except Exception:
@@ -39,7 +42,7 @@ class SupplyDemandAgent:
     def fetch_central_bank_reserves(self):
         """Fetch latest world central bank gold reserves."""
         try:
-            df = ak.macro_world_gold_reserves()
+            df = self.data.fetch("macro_world_gold_reserves")
             if not df.empty:
                 return float(df.iloc[-1]['value'])
         except Exception:
@@ -49,22 +52,28 @@ class SupplyDemandAgent:
     def fetch_production(self):
         """Fetch latest world gold production."""
         try:
-            df = ak.macro_world_gold_production()
+            df = self.data.fetch("macro_world_gold_production")
             if not df.empty:
                 return float(df.iloc[-1]['value'])
         except Exception:
             pass
         return None
 
-    def analyze(self, state: dict) -> dict:
+    def analyze(self, state: dict) -> AgentSignal:
         """
         Fetches gold supply/demand data using Akshare, analyzes it, and returns a structured output.
         """
         try:
-            etf_holding = self.fetch_etf_holding()
-            world_demand = self.fetch_world_demand()
-            central_bank_reserves = self.fetch_central_bank_reserves()
-            production = self.fetch_production()
+            values = fetch_all({
+                "etf_holding": self.fetch_etf_holding,
+                "world_demand": self.fetch_world_demand,
+                "central_bank_reserves": self.fetch_central_bank_reserves,
+                "production": self.fetch_production,
+            })
+            etf_holding = values["etf_holding"]
+            world_demand = values["world_demand"]
+            central_bank_reserves = values["central_bank_reserves"]
+            production = values["production"]
 
             # Simple logic: rising ETF holdings or demand or reserves = bullish
             bullish = []
@@ -105,14 +114,10 @@ class SupplyDemandAgent:
             reasoning = f"Error fetching supply/demand data: {e}"
             etf_holding = world_demand = central_bank_reserves = production = None
 
-        return {
-            "agent": "SupplyDemandAgent",
-            "signal": signal,
-            "confidence": confidence,
-            "reasoning": reasoning,
+        return AgentSignal("SupplyDemandAgent", signal, confidence, reasoning, details={
             "etf_holding": etf_holding,
             "world_demand": world_demand,
             "central_bank_reserves": central_bank_reserves,
             "production": production,
             "timestamp": datetime.now().isoformat()
-        } 
\ No newline at end of file
+        }) 
\ No newline at end of file
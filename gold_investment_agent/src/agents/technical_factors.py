@@ -1,13 +1,31 @@
 # technical_factors.py
 # Purpose: Perform technical analysis (moving averages, RSI, etc.) on gold price data.
 # This agent generates technical signals to inform gold investment decisions.
+# Indicators are maintained incrementally by a StreamingIndicators engine whose state is persisted
+# between runs, so each run only applies bars newer than the last one it has seen. That last bar is
+# provisional (today's bar may be partial or revised later): each run rolls it back and re-applies it.
+# analyze_batch() covers many instruments at once: their close series are aligned into one
+# (dates x symbols) array and MA/RSI/crossover signals are computed for all columns together.
 #
 # Dependencies:
-# - akshare (for gold price data)
-# - Output: {agent, signal, confidence, reasoning}
+# - akshare (for gold price data, via the shared data layer in src/tools/data_access.py)
+# - src/tools/streaming_indicators.py (O(1) MA/RSI updates)
+# - src/tools/indicators.py (vectorized MA/RSI for analyze_batch and the streaming warm-up)
+# - Output: AgentSignal (src/signals.py); analyze_batch adds details symbol, ma20, ma50, rsi14
 
-import akshare as ak
+import os
+import threading
+
+import numpy as np
 import pandas as pd
+from src.signals import AgentSignal
+from src.tools.concurrency import fetch_all
+from src.tools.data_access import get_data_layer
+from src.tools.indicators import TECHNICAL_SPEC, compute_indicators
+from src.tools.streaming_indicators import StreamingIndicators
+
+# Default endpoint for batch symbols given without an "endpoint:" prefix
+BATCH_ENDPOINT = "gold_spot_hist_sina"
 
 
 class TechnicalFactorsAgent:
@@ -15,39 +33,147 @@ class TechnicalFactorsAgent:
     Agent to perform technical analysis (moving averages, RSI, etc.) on gold price data.
     Uses Akshare for gold price data. Users can adjust endpoints or currencies as needed.
     """
-    def __init__(self, symbol="AU9999"):
+    def __init__(self, symbol="AU9999", data=None, state_dir="data/state"):
+        """
+        Args:
+            symbol (str): Gold contract passed to gold_spot_hist_sina.
+            data (DataLayer, optional): Shared data layer. Defaults to the process-wide layer.
+            state_dir (str, optional): Directory for persisted indicator state; None disables persistence.
+        """
         self.symbol = symbol  # Users can adjust the gold symbol as needed
+        self.data = data or get_data_layer()  # Shared data layer (coalesces duplicate fetches)
+        self.state_path = os.path.join(state_dir, f"technical_{symbol}.json") if state_dir else None
+        self.engine = StreamingIndicators.load(self.state_path) if self.state_path else StreamingIndicators()
+        self._lock = threading.Lock()
+
+    def update_indicators(self, df: pd.DataFrame) -> dict:
+        """
+        Applies the bars in `df` that are newer than the engine's last seen bar, persists the
+        engine state, and returns the latest indicator values. New bars are applied in one
+        vectorized step, so warming up from a long history is as cheap as a single update.
+        The latest bar is applied provisionally (today's bar may be partial or revised): the next
+        update rolls it back and re-applies it from the data then current.
+        """
+        # The fetched frame is shared through the data layer, so don't modify it in place
+        close = pd.to_numeric(df['close'], errors='coerce')
+        with self._lock:
+            if 'date' in df.columns:
+                dates = pd.to_datetime(df['date'], errors='coerce')
+                # Rows without a date or close can't be placed in the stream
+                valid = (dates.notna() & close.notna()).to_numpy()
+                close, dates = close[valid], dates[valid]
+                if self.engine.last_timestamp is not None:
+                    last = pd.Timestamp(self.engine.last_timestamp)
+                    if (dates >= last).any() and self.engine.rollback():
+                        new = (dates >= last).to_numpy()
+                    else:
+                        new = (dates > last).to_numpy()
+                    close, dates = close[new], dates[new]
+                stamp = dates.iloc[-1].strftime("%Y-%m-%dT%H:%M:%S") if len(dates) else None
+            else:
+                # Without timestamps new bars cannot be told apart, so rebuild from the full history
+                self.engine = StreamingIndicators()
+                stamp = None
+            self.engine.extend(close.to_numpy(dtype=float), stamp, provisional=stamp is not None)
+            if self.state_path and len(close):
+                self.engine.save(self.state_path)
+            return self.engine.latest()
+
+    @staticmethod
+    def _reasoning(signal: str, ma20: float, ma50: float, rsi14: float) -> str:
+        if signal == "Buy":
+            return f"MA20 ({ma20:.2f}) > MA50 ({ma50:.2f}), RSI14={rsi14:.1f}. Bullish technicals."
+        if signal == "Sell":
+            return f"MA20 ({ma20:.2f}) < MA50 ({ma50:.2f}), RSI14={rsi14:.1f}. Bearish technicals."
+        return f"MA20={ma20:.2f}, MA50={ma50:.2f}, RSI14={rsi14:.1f}. No strong technical signal."
+
+    @classmethod
+    def _decide(cls, ma20: float, ma50: float, rsi14: float) -> tuple:
+        """
+        Applies the MA crossover / RSI rules. Returns (signal, confidence, reasoning).
+        """
+        # Example logic
+        if ma20 > ma50 and rsi14 < 70:
+            signal, confidence = "Buy", 0.7
+        elif ma20 < ma50 and rsi14 > 30:
+            signal, confidence = "Sell", 0.7
+        else:
+            signal, confidence = "Hold", 0.5
+        return signal, confidence, cls._reasoning(signal, ma20, ma50, rsi14)
+
+    def fetch_close_matrix(self, symbols: list) -> pd.DataFrame:
+        """
+        Fetches close series for many instruments in parallel and aligns them on date.
+        Symbols are either plain contract names for BATCH_ENDPOINT (e.g. "AU9999", "Au(T+D)") or
+        "endpoint:symbol" strings for other Akshare price endpoints with date/close columns
+        (e.g. "futures_zh_daily_sina:AU0", "fund_etf_hist_sina:sh518880").
+        Returns a (dates x symbols) DataFrame; gaps from differing trading calendars are forward-filled.
+        Symbols whose fetch fails are omitted.
+        """
+        def fetcher(spec):
+            endpoint, _, symbol = spec.rpartition(":")
+            endpoint = endpoint or BATCH_ENDPOINT
+
+            def fetch():
+                try:
+                    df = self.data.fetch(endpoint, symbol=symbol)
+                except Exception as e:
+                    print(f"Error fetching {spec}: {e}")
+                    return None
+                if df is None or df.empty:
+                    return None
+                return pd.Series(pd.to_numeric(df['close'], errors='coerce').to_numpy(),
+                                 index=pd.to_datetime(df['date'], errors='coerce'), name=spec)
+            return fetch
+
+        series = fetch_all({spec: fetcher(spec) for spec in symbols})
+        closes = [s[~s.index.duplicated(keep='last')] for s in series.values() if s is not None]
+        if not closes:
+            return pd.DataFrame()
+        return pd.concat(closes, axis=1, sort=True).ffill()
+
+    def analyze_batch(self, symbols: list) -> list:
+        """
+        Computes MA20/MA50/RSI14 and crossover signals for many instruments in one vectorized pass
+        over a (dates x symbols) array. Returns one AgentSignal per requested symbol, in order.
+        """
+        try:
+            closes = self.fetch_close_matrix(symbols)
+        except Exception as e:
+            closes = pd.DataFrame()
+            print(f"Error fetching batch price data: {e}")
+        outputs = {}
+        if not closes.empty:
+            values = compute_indicators(closes.to_numpy(dtype=float), TECHNICAL_SPEC)
+            ma20, ma50, rsi14 = values["ma20"][-1], values["ma50"][-1], values["rsi14"][-1]
+            # Same rules as _decide, applied to every symbol at once
+            buy = (ma20 > ma50) & (rsi14 < 70)
+            sell = ~buy & (ma20 < ma50) & (rsi14 > 30)
+            signals = np.select([buy, sell], ["Buy", "Sell"], "Hold")
+            confidences = np.where(buy | sell, 0.7, 0.5)
+            for j, spec in enumerate(closes.columns):
+                signal = str(signals[j])
+                outputs[spec] = AgentSignal(
+                    "TechnicalFactorsAgent", signal, float(confidences[j]),
+                    self._reasoning(signal, ma20[j], ma50[j], rsi14[j]),
+                    details={"symbol": spec, "ma20": float(ma20[j]), "ma50": float(ma50[j]),
+                             "rsi14": float(rsi14[j])})
+        return [outputs.get(spec) or AgentSignal("TechnicalFactorsAgent", "Hold", 0.3,
+                                                 f"No price data available for {spec}.",
+                                                 details={"symbol": spec})
+                for spec in symbols]
 
-    def analyze(self, state: dict) -> dict:
+    def analyze(self, state: dict) -> AgentSignal:
         """
         Fetches gold price data using Akshare, computes technical indicators, and returns a structured output.
         """
         try:
             # Fetch historical gold price data (Shanghai Gold Exchange AU9999 as example)
-            df = ak.gold_spot_hist_sina(symbol=self.symbol)
+            df = self.data.fetch("gold_spot_hist_sina", symbol=self.symbol)
             if not df.empty:
-                df['close'] = pd.to_numeric(df['close'], errors='coerce')
-                ma20 = df['close'].rolling(window=20).mean().iloc[-1]
-                ma50 = df['close'].rolling(window=50).mean().iloc[-1]
-                # Simple RSI calculation
-                delta = df['close'].diff()
-                gain = delta.where(delta > 0, 0).rolling(window=14).mean().iloc[-1]
-                loss = -delta.where(delta < 0, 0).rolling(window=14).mean().iloc[-1]
-                rs = gain / (loss + 1e-9)
-                rsi14 = 100 - (100 / (1 + rs))
-                # Example logic
-                if ma20 > ma50 and rsi14 < 70:
-                    signal = "Buy"
-                    confidence = 0.7
-                    reasoning = f"MA20 ({ma20:.2f}) > MA50 ({ma50:.2f}), RSI14={rsi14:.1f}. Bullish technicals."
-                elif ma20 < ma50 and rsi14 > 30:
-                    signal = "Sell"
-                    confidence = 0.7
-                    reasoning = f"MA20 ({ma20:.2f}) < MA50 ({ma50:.2f}), RSI14={rsi14:.1f}. Bearish technicals."
-                else:
-                    signal = "Hold"
-                    confidence = 0.5
-                    reasoning = f"MA20={ma20:.2f}, MA50={ma50:.2f}, RSI14={rsi14:.1f}. No strong technical signal."
+                indicators = self.update_indicators(df)
+                signal, confidence, reasoning = self._decide(
+                    indicators["ma20"], indicators["ma50"], indicators["rsi14"])
             else:
                 signal = "Hold"
                 confidence = 0.3
@@ -56,9 +182,4 @@ class TechnicalFactorsAgent:
             signal = "Hold"
             confidence = 0.1
             reasoning = f"Error fetching gold price data: {e}"
-        return {
-            "agent": "TechnicalFactorsAgent",
-            "signal": signal,
-            "confidence": confidence,
-            "reasoning": reasoning
-        } 
\ No newline at end of file
+        return AgentSignal("TechnicalFactorsAgent", signal, confidence, reasoning) 
\ No newline at end of file
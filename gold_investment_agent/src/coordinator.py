@@ -2,18 +2,108 @@
 # Purpose: Aggregate outputs from all agents, act as the debate room, and synthesize a final investment recommendation with confidence and reasoning.
 # Implements decision synthesis logic, weighted voting, and summary reporting for the user interface.
 #
+# Agents can be run one after another (default) or fanned out over a thread pool with a per-agent
+# deadline and a global deadline. Agents that miss their deadline get the same "Hold / 0.0" fallback
+# record as agents that raise.
+#
+# Each run is scoped on the shared data layer so duplicate upstream fetches across agents are
+# coalesced; the number of calls saved is reported under "data_stats".
+#
+# Agent outputs are AgentSignal records (src/signals.py); plain dicts are converted on synthesis.
+# A result holds each output once, under "agent_outputs"; see signals.summary_table() for the flat
+# per-agent table and signals.encode_result() / result_to_json() for compact serialization.
+#
+# Each run records timing spans for every agent's analyze() call ("agent"), every data-layer fetch
+# ("fetch"/"upstream") and synthesis ("synthesize"); they are returned under "metrics" and also
+# accumulate in the process-wide registry (src/tools/metrics.py) for Prometheus export.
+#
+# stream_analysis() yields a provisional recommendation as each agent completes and, with early
+# stopping, ends the run once the agents still pending cannot overturn the leader even at full
+# confidence (is_decided). Stragglers are cancelled (queued) or abandoned (running) and recorded
+# with a "Hold / 0.0" fallback; run_analysis() uses it when the Coordinator has early_stop=True.
+#
+# With an LLMClient (src/tools/llm_client.py), each run ends with a debate step: the model is asked
+# to argue the bull and bear cases from the agents' votes and reasoning and to challenge the weighted
+# recommendation. Its answer is returned under "debate" and the client's counters under "llm_stats".
+# The prompt only contains the agents' signals, confidences and reasoning, so unchanged inputs are
+# answered from the LLM cache; a failed call or an exhausted token budget leaves "debate" as None.
+#
+# synthesize_batch() applies the same weighted vote to many what-if scenarios and weight sets at
+# once: signals and confidences are (scenarios x agents) arrays, weights a (weight sets x agents)
+# matrix, and every combination is scored in a single matrix product.
+#
 # Dependencies:
 # - Agent classes from src/agents/
+# - DataLayer from src/tools/data_access.py
+# - Metrics from src/tools/metrics.py
+# - AgentSignal from src/signals.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+
+from src.signals import SIGNAL_CODES, SIGNALS, AgentSignal, combined_reasoning
+from src.tools.data_access import get_data_layer
+from src.tools.metrics import Metrics, NULL_METRICS, get_metrics
+
+# Weight of agents without an entry in the weights dict, as in synthesize
+DEFAULT_AGENT_WEIGHT = 0.1
+
+DEBATE_SYSTEM_PROMPT = ("You are the moderator of an investment committee for gold. "
+                        "Be concise, concrete and critical.")
+
+
+def fallback_output(agent, reason: str) -> AgentSignal:
+    """
+    Builds the neutral output recorded for an agent that failed or missed its deadline.
+    """
+    return AgentSignal(agent.__class__.__name__, "Hold", 0.0, reason)
+
+
+def is_decided(scores: Dict[str, float], remaining_weight: float) -> bool:
+    """
+    True if agents that have not reported yet cannot change the recommendation: each of them adds
+    at most weight x 1.0 (the maximum confidence) to a single signal, so the leader is safe when no
+    other signal can reach it even with all `remaining_weight` (ties resolve Buy, then Sell, then Hold).
+    """
+    leader = max(SIGNALS, key=lambda signal: scores[signal])
+    rank = SIGNALS.index(leader)
+    for j, signal in enumerate(SIGNALS):
+        if signal == leader:
+            continue
+        reachable = scores[signal] + remaining_weight
+        if reachable > scores[leader] or (reachable == scores[leader] and j < rank):
+            return False
+    return True
+
 
 class Coordinator:
     """
     Aggregates agent outputs, facilitates debate, and synthesizes a final investment recommendation.
-    Each agent returns a structured output: {agent, signal, confidence, reasoning, ...}.
+    Each agent returns an AgentSignal (agent, signal, confidence, reasoning, details, refs).
     The coordinator performs weighted voting and aggregates explanations.
     """
-    def __init__(self, agents: list, weights: dict = None):
+    def __init__(self, agents: list, weights: dict = None, concurrent: bool = False,
+                 agent_timeout: Optional[float] = None, global_timeout: Optional[float] = None,
+                 max_workers: Optional[int] = None, data=None, instrument: bool = True,
+                 early_stop: bool = False, llm=None, llm_token_budget: Optional[int] = None):
         """
         Initializes the Coordinator with a list of agent instances and optional custom weights.
+        Args:
+            agents (list): Agent instances exposing analyze(state).
+            weights (dict, optional): Voting weight per agent class name.
+            concurrent (bool): Run all agents in parallel on a thread pool instead of sequentially.
+            agent_timeout (float, optional): Seconds each agent may take in concurrent mode.
+            global_timeout (float, optional): Seconds the whole concurrent run may take.
+            max_workers (int, optional): Thread pool size; defaults to one thread per agent.
+            data (DataLayer, optional): Data layer shared with the agents. Defaults to the process-wide layer.
+            instrument (bool): Record per-run timing metrics. When False, spans are no-ops.
+            early_stop (bool): Let run_analysis() return as soon as the recommendation is decided,
+                cancelling agents that have not finished (see stream_analysis).
+            llm (LLMClient, optional): Enables the debate step.
+            llm_token_budget (int, optional): Tokens the debate step may spend per run.
         """
         self.agents = agents
         # Assign weights to each agent for decision synthesis
@@ -25,57 +115,347 @@ class Coordinator:
             "GeopoliticalEventsAgent": 0.1,
             "SupplyDemandAgent": 0.1,
         }
+        self.concurrent = concurrent
+        self.agent_timeout = agent_timeout
+        self.global_timeout = global_timeout
+        self.max_workers = max_workers
+        self.data = data or get_data_layer()
+        self.instrument = instrument
+        self.early_stop = early_stop
+        self.llm = llm
+        self.llm_token_budget = llm_token_budget
+
+    def _new_metrics(self) -> Metrics:
+        """Returns the recorder for one run; it forwards into the process-wide registry."""
+        if not self.instrument:
+            return NULL_METRICS
+        return Metrics(parent=get_metrics())
+
+    def _finish(self, agent_outputs: list, data_stats: dict, metrics: Metrics) -> dict:
+        with metrics.span("synthesize"):
+            result = self.synthesize(agent_outputs)
+        result["data_stats"] = data_stats
+        if self.llm is not None:
+            with self.llm.run(token_budget=self.llm_token_budget), metrics.span("debate"):
+                result["debate"] = self.debate(result)
+                result["llm_stats"] = self.llm.stats()
+        if metrics.enabled:
+            result["metrics"] = metrics.to_dict()
+        return result
+
+    def debate_prompt(self, result: dict) -> str:
+        """Builds the debate prompt from a synthesized result (votes, weights and reasoning only)."""
+        lines = [f"- {o.agent} (weight {self.weights.get(o.agent, DEFAULT_AGENT_WEIGHT):.2f}): "
+                 f"{o.signal} with confidence {o.confidence:.2f}. {o.reasoning}"
+                 for o in result["agent_outputs"]]
+        return (
+            "Several analysts voted on whether to Buy, Sell or Hold gold:\n" + "\n".join(lines) +
+            f"\nThe weighted vote recommends {result['recommendation']} "
+            f"(confidence {result['confidence']:.2f}).\n"
+            "Debate the decision: give the strongest bullish case, the strongest bearish case, point out "
+            "analysts that contradict each other or rest on weak evidence, and conclude whether you agree "
+            "with the recommendation. Answer in under 200 words."
+        )
+
+    def debate(self, result: dict) -> Optional[str]:
+        """Runs the LLM debate over a synthesized result. Returns None if the call fails."""
+        from src.tools.llm_client import LLMError
+        try:
+            return self.llm.complete(self.debate_prompt(result), system=DEBATE_SYSTEM_PROMPT)
+        except (LLMError, OSError) as e:
+            print(f"Error running LLM debate: {e}")
+            return None
 
     def run_analysis(self) -> dict:
         """
         Runs all agents, collects their structured outputs, and synthesizes a final recommendation.
-        Returns a dict with recommendation, confidence, reasoning, all agent outputs, and a summary table.
+        Returns a dict with recommendation, confidence, reasoning, agent_outputs (AgentSignal records),
+        data_stats (upstream requests, calls issued, calls saved by the shared data layer) and,
+        when instrumented, metrics (timing spans and counters, see Metrics.to_dict()).
+        """
+        if self.early_stop:
+            for result in self.stream_analysis(early_stop=True):
+                pass
+            return result
+        metrics = self._new_metrics()
+        with self.data.run(metrics if metrics.enabled else None):
+            agent_outputs = self._run_agents(self.agents, metrics)
+            data_stats = self.data.stats()
+        return self._finish(agent_outputs, data_stats, metrics)
+
+    def run_partial(self, agent_names, previous: dict) -> dict:
+        """
+        Re-runs only the agents whose class names are in `agent_names` and re-synthesizes using the
+        other agents' outputs from a previous run_analysis result (matched by position in self.agents).
+        Falls back to a full run when `previous` does not cover every agent.
+        """
+        previous_outputs = list(previous.get("agent_outputs", [])) if previous else []
+        if len(previous_outputs) != len(self.agents):
+            return self.run_analysis()
+        indices = [i for i, agent in enumerate(self.agents) if agent.__class__.__name__ in agent_names]
+        metrics = self._new_metrics()
+        with self.data.run(metrics if metrics.enabled else None):
+            fresh = self._run_agents([self.agents[i] for i in indices], metrics)
+            data_stats = self.data.stats()
+        for i, output in zip(indices, fresh):
+            previous_outputs[i] = output
+        return self._finish(previous_outputs, data_stats, metrics)
+
+    def _run_agents(self, agents: list, metrics: Metrics = NULL_METRICS) -> list:
+        if self.concurrent:
+            return self._run_concurrent(agents, metrics)
+        return self._run_sequential(agents, metrics)
+
+    @staticmethod
+    def _analyze(agent, metrics: Metrics) -> AgentSignal:
+        with metrics.span("agent", agent=agent.__class__.__name__):
+            return AgentSignal.coerce(agent.analyze({}))
+
+    def _run_sequential(self, agents: list, metrics: Metrics = NULL_METRICS) -> list:
+        """
+        Runs each agent in turn, substituting the fallback output for agents that raise.
         """
         agent_outputs = []
-        for agent in self.agents:
+        for agent in agents:
             try:
-                agent_outputs.append(agent.analyze({}))
+                agent_outputs.append(self._analyze(agent, metrics))
             except Exception as e:
-                agent_outputs.append({
-                    "agent": agent.__class__.__name__,
-                    "signal": "Hold",
-                    "confidence": 0.0,
-                    "reasoning": f"Error running agent: {e}"
-                })
-        result = self.synthesize(agent_outputs)
-        return result
+                agent_outputs.append(fallback_output(agent, f"Error running agent: {e}"))
+        return agent_outputs
+
+    def _run_concurrent(self, agents: list, metrics: Metrics = NULL_METRICS) -> list:
+        """
+        Submits every agent to a thread pool and collects results until each agent's own deadline
+        (measured from when it starts running) or the global deadline expires.
+        Outputs keep the order of `agents`. Threads that overrun are abandoned, not killed.
+        """
+        outputs = [None] * len(agents)
+        for i, output in self._iter_concurrent(agents, metrics):
+            outputs[i] = output
+        return outputs
+
+    def _iter_concurrent(self, agents: list, metrics: Metrics = NULL_METRICS,
+                         order: Optional[Sequence[int]] = None) -> Iterator[tuple]:
+        """
+        Yields (index, output) for each agent as it completes, then the fallback outputs of agents
+        that missed their deadline. Agents are submitted in `order` (default: as given), which sets
+        who gets a worker first when max_workers is smaller than the number of agents.
+        Closing the generator early cancels agents that have not started; running ones are abandoned.
+        """
+        if not agents:
+            return
+        start = time.monotonic()
+        global_deadline = start + self.global_timeout if self.global_timeout is not None else float("inf")
+        started = {}
+
+        def run(i, agent):
+            started[i] = time.monotonic()
+            return self._analyze(agent, metrics)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers or len(agents),
+                                      thread_name_prefix="agent")
+        futures = {executor.submit(run, i, agents[i]): i for i in (order or range(len(agents)))}
+        pending = set(futures)
+        timed_out = {}
+        try:
+            while pending:
+                now = time.monotonic()
+                deadline = global_deadline
+                if self.agent_timeout is not None:
+                    for future in list(pending):
+                        i = futures[future]
+                        if i in started:
+                            agent_deadline = started[i] + self.agent_timeout
+                            if agent_deadline <= now:
+                                pending.discard(future)
+                                timed_out[future] = now - started[i]
+                            else:
+                                deadline = min(deadline, agent_deadline)
+                        else:
+                            # Queued agents have not started yet; re-check shortly.
+                            deadline = min(deadline, now + min(self.agent_timeout, 0.05))
+                if not pending:
+                    break
+                if deadline <= now:
+                    break
+                done, pending = wait(pending, timeout=None if deadline == float("inf") else deadline - now,
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = futures[future]
+                    try:
+                        output = future.result()
+                    except Exception as e:
+                        output = fallback_output(agents[i], f"Error running agent: {e}")
+                    yield i, output
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        now = time.monotonic()
+        for future in pending:
+            timed_out[future] = now - started.get(futures[future], start)
+        for future, elapsed in timed_out.items():
+            i = futures[future]
+            metrics.incr("agent_timeouts", agent=agents[i].__class__.__name__)
+            yield i, fallback_output(agents[i], f"Agent timed out after {elapsed:.1f}s")
+
+    def stream_analysis(self, early_stop: bool = True) -> Iterator[dict]:
+        """
+        Runs all agents and yields a provisional result each time one completes: synthesize() over the
+        outputs so far plus "completed" and "pending" agent names and "decided". The last yielded
+        result is final ("final": True): it covers every agent, lists "cancelled" agents and carries
+        data_stats and metrics like run_analysis().
+        With early_stop, the run ends as soon as the recommendation is decided (see is_decided):
+        agents still running are abandoned and queued ones cancelled, and each is recorded with a
+        "Hold / 0.0" fallback. Agents are started in order of decreasing weight, so the agents most
+        likely to decide the vote get workers first.
+        """
+        agents = self.agents
+        names = [agent.__class__.__name__ for agent in agents]
+        weights = [self.weights.get(name, DEFAULT_AGENT_WEIGHT) for name in names]
+        order = sorted(range(len(agents)), key=lambda i: -weights[i])
+        metrics = self._new_metrics()
+        outputs = [None] * len(agents)
+        remaining = sum(weights)
+        decided = False
+        with self.data.run(metrics if metrics.enabled else None):
+            if self.concurrent:
+                completions = self._iter_concurrent(agents, metrics, order)
+            else:
+                completions = ((i, self._run_sequential([agents[i]], metrics)[0]) for i in order)
+            try:
+                for i, output in completions:
+                    outputs[i] = output
+                    remaining -= weights[i]
+                    done = [o for o in outputs if o is not None]
+                    decided = is_decided(self.scores(done), remaining)
+                    partial = self.synthesize(done)
+                    partial.update({
+                        "completed": [names[j] for j in range(len(agents)) if outputs[j] is not None],
+                        "pending": [names[j] for j in range(len(agents)) if outputs[j] is None],
+                        "decided": decided,
+                        "final": False,
+                    })
+                    if not partial["pending"] or (early_stop and decided):
+                        break
+                    yield partial
+            finally:
+                if hasattr(completions, "close"):
+                    completions.close()
+            data_stats = self.data.stats()
+        cancelled = [names[i] for i, output in enumerate(outputs) if output is None]
+        for i, output in enumerate(outputs):
+            if output is None:
+                outputs[i] = fallback_output(agents[i], "Cancelled: the recommendation was already decided")
+                metrics.incr("agents_cancelled", agent=names[i])
+        result = self._finish(outputs, data_stats, metrics)
+        result.update({"completed": [name for name in names if name not in cancelled],
+                       "cancelled": cancelled, "decided": True, "final": True})
+        yield result
 
     def synthesize(self, agent_outputs: list) -> dict:
         """
         Synthesizes a final investment recommendation based on agent outputs using weighted voting.
-        Returns a structured dict with recommendation, confidence, reasoning, agent_outputs, and a summary table.
+        Returns a structured dict with recommendation, confidence, reasoning and agent_outputs
+        (AgentSignal records; dict outputs are converted).
         """
-        scores = {"Buy": 0, "Sell": 0, "Hold": 0}
-        explanations = []
-        summary_table = []
-        for output in agent_outputs:
-            agent = output.get("agent", "UnknownAgent")
-            signal = output.get("signal", "Hold")
-            confidence = output.get("confidence", 0.5)
-            reasoning = output.get("reasoning", "")
-            w = self.weights.get(agent, 0.1)
-            scores[signal] += w * confidence
-            explanations.append(f"{agent}: {reasoning}")
-            summary_table.append({
-                "agent": agent,
-                "signal": signal,
-                "confidence": confidence,
-                "reasoning": reasoning,
-                **{k: v for k, v in output.items() if k not in ['agent', 'signal', 'confidence', 'reasoning']}
-            })
+        agent_outputs = [AgentSignal.coerce(output) for output in agent_outputs]
+        scores = self.scores(agent_outputs)
         recommendation = max(scores, key=scores.get)
         total_score = sum(scores.values())
         confidence = scores[recommendation] / total_score if total_score > 0 else 0.0
-        reasoning = " | ".join(explanations)
         return {
             "recommendation": recommendation,
             "confidence": confidence,
-            "reasoning": reasoning,
+            "reasoning": combined_reasoning(agent_outputs),
             "agent_outputs": agent_outputs,
-            "summary_table": summary_table
-        } 
\ No newline at end of file
+        }
+
+    def scores(self, agent_outputs: list) -> Dict[str, float]:
+        """Weighted vote totals: sum of weight x confidence per signal."""
+        scores = {"Buy": 0, "Sell": 0, "Hold": 0}
+        for output in map(AgentSignal.coerce, agent_outputs):
+            scores[output.signal] += self.weights.get(output.agent, DEFAULT_AGENT_WEIGHT) * output.confidence
+        return scores
+
+    def weight_matrix(self, agents: Sequence[str], weight_sets=None) -> np.ndarray:
+        """
+        Builds a (weight sets x agents) matrix for synthesize_batch.
+        Args:
+            agents (sequence): Agent names, one per column of the signal arrays.
+            weight_sets (optional): A weights dict, a list of them, or an array that is already
+                (weight sets x agents). Defaults to the Coordinator's own weights.
+        """
+        if weight_sets is None:
+            weight_sets = [self.weights]
+        elif isinstance(weight_sets, dict):
+            weight_sets = [weight_sets]
+        if len(weight_sets) and isinstance(weight_sets[0], dict):
+            return np.array([[w.get(agent, DEFAULT_AGENT_WEIGHT) for agent in agents] for w in weight_sets])
+        matrix = np.atleast_2d(np.asarray(weight_sets, dtype=float))
+        if matrix.shape[1] != len(agents):
+            raise ValueError(f"Weight matrix has {matrix.shape[1]} columns for {len(agents)} agents.")
+        return matrix
+
+    @staticmethod
+    def encode_outputs(agent_outputs: list, agents: Optional[Sequence[str]] = None) -> tuple:
+        """
+        Turns one run's agent outputs into a base scenario for synthesize_batch.
+        Returns (agents, signal codes (1 x agents), confidences (1 x agents)); agents missing from
+        `agent_outputs` abstain with confidence 0.
+        """
+        by_agent = {o.agent: o for o in map(AgentSignal.coerce, agent_outputs)}
+        agents = list(agents) if agents is not None else list(by_agent)
+        signals = np.full((1, len(agents)), SIGNAL_CODES["Hold"], dtype=np.int8)
+        confidences = np.zeros((1, len(agents)))
+        for j, agent in enumerate(agents):
+            if agent in by_agent:
+                signals[0, j] = by_agent[agent].code
+                confidences[0, j] = by_agent[agent].confidence
+        return agents, signals, confidences
+
+    def synthesize_batch(self, signals, confidences, agents: Sequence[str], weights=None,
+                         reasoning: bool = False) -> dict:
+        """
+        Weighted vote of synthesize() for every (weight set, scenario) pair in one vectorized pass.
+        Args:
+            signals (array): (scenarios x agents) signal codes (0=Buy, 1=Sell, 2=Hold) or signal strings.
+            confidences (array): (scenarios x agents) confidences; NaN means the agent abstains.
+            agents (sequence): Agent name of each column.
+            weights (optional): Weight sets as accepted by weight_matrix(); defaults to self.weights.
+            reasoning (bool): Also build per-combination reasoning strings (slow for large batches).
+        Returns:
+            dict: recommendation (weight sets x scenarios) signal codes, confidence (same shape),
+            scores (weight sets x scenarios x 3, in SIGNALS order), labels (SIGNALS) and, if asked,
+            reasoning (nested lists of strings).
+        """
+        signals = np.atleast_2d(np.asarray(signals))
+        if signals.dtype.kind in "UO":
+            lookup = np.vectorize(SIGNAL_CODES.__getitem__, otypes=[np.int8])
+            signals = lookup(signals)
+        confidences = np.nan_to_num(np.atleast_2d(np.asarray(confidences, dtype=float)))
+        if signals.shape != confidences.shape or signals.shape[1] != len(agents):
+            raise ValueError(f"signals {signals.shape} and confidences {confidences.shape} must both be "
+                             f"(scenarios x {len(agents)} agents).")
+        matrix = self.weight_matrix(agents, weights)
+        n, a = signals.shape
+        # votes[a, n, c] = confidence of agent a in scenario n if it voted c, else 0
+        votes = np.zeros((a, n, len(SIGNALS)))
+        np.put_along_axis(votes, signals.T[:, :, None].astype(np.intp), confidences.T[:, :, None], axis=2)
+        scores = (matrix @ votes.reshape(a, -1)).reshape(len(matrix), n, len(SIGNALS))
+        recommendation = scores.argmax(axis=2)
+        total = scores.sum(axis=2)
+        best = np.take_along_axis(scores, recommendation[:, :, None], axis=2)[:, :, 0]
+        result = {
+            "recommendation": recommendation,
+            "confidence": np.divide(best, total, out=np.zeros_like(total), where=total > 0),
+            "scores": scores,
+            "labels": SIGNALS,
+        }
+        if reasoning:
+            votes_text = [" | ".join(f"{agent}: {SIGNALS[code]} ({conf:.2f})"
+                                     for agent, code, conf in zip(agents, row_signals, row_confidences))
+                          for row_signals, row_confidences in zip(signals.tolist(), confidences.tolist())]
+            result["reasoning"] = [[f"{SIGNALS[rec]} ({conf:.2f}) from {votes_text[i]}"
+                                    for i, (rec, conf) in enumerate(zip(recs, confs))]
+                                   for recs, confs in zip(recommendation.tolist(), result["confidence"].tolist())]
+        return result
@@ -2,37 +2,179 @@
 # Purpose: Application entry point. Sets up LangGraph, loads agents, and orchestrates the analysis workflow.
 # This file runs the end-to-end gold investment analysis pipeline.
 #
+# Agents are loaded through the registry in src/agents/registry.py, so only the selected agents
+# are imported. Run `python -m src.main --help` for the available options; `--serve` starts the
+# long-running HTTP service from src/service.py instead of a one-shot run.
+#
 # Dependencies:
-# - All agent classes from src/agents/
+# - Agent registry from src/agents/registry.py
 # - Coordinator from src/coordinator.py
 
-from src.agents.economic_indicators import EconomicIndicatorsAgent
-from src.agents.currency_movements import CurrencyMovementsAgent
-from src.agents.geopolitical_events import GeopoliticalEventsAgent
-from src.agents.supply_demand import SupplyDemandAgent
-from src.agents.investor_sentiment import InvestorSentimentAgent
-from src.agents.technical_factors import TechnicalFactorsAgent
-from src.coordinator import Coordinator
+import argparse
+
+from src.agents.registry import available_agents, create_agents
+
+# Deadlines (seconds) for the concurrent agent run
+AGENT_TIMEOUT = 30.0
+GLOBAL_TIMEOUT = 45.0
+# Seconds between background refresh ticks in service mode
+REFRESH_INTERVAL = 60.0
+# Last refresh time of each data source (service mode)
+SCHEDULER_STATE = "data/state/scheduler.json"
+# Every run's result is appended here (see src/tools/run_history.py)
+RUN_HISTORY = "data/run_history.sqlite"
+# Tokens the LLM debate step may spend per run (--debate)
+LLM_TOKEN_BUDGET = 4000
+
+
+def parse_args(argv=None):
+    """
+    Parses command-line options.
+    """
+    parser = argparse.ArgumentParser(description="Gold investment analysis")
+    parser.add_argument("--agents", help="Comma-separated agents to run (default: all). "
+                                         "See --list-agents.")
+    parser.add_argument("--list-agents", action="store_true", help="List available agents and exit.")
+    parser.add_argument("--sequential", action="store_true", help="Run agents one after another.")
+    parser.add_argument("--agent-timeout", type=float, default=AGENT_TIMEOUT,
+                        help="Seconds each agent may take (concurrent mode).")
+    parser.add_argument("--global-timeout", type=float, default=GLOBAL_TIMEOUT,
+                        help="Seconds the whole run may take (concurrent mode).")
+    parser.add_argument("--early-stop", action="store_true",
+                        help="Finish as soon as the remaining agents cannot change the recommendation, "
+                             "cancelling them.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Print a provisional recommendation as each agent completes.")
+    parser.add_argument("--debate", action="store_true",
+                        help="Finish each run with an LLM debate over the agents' votes (needs OPENROUTER_API_KEY).")
+    parser.add_argument("--llm-budget", type=int, default=LLM_TOKEN_BUDGET,
+                        help="Tokens the debate step may spend per run.")
+    parser.add_argument("--llm-base-url", help="OpenAI-compatible endpoint to use instead of OpenRouter.")
+    parser.add_argument("--event-window", type=int, default=1, metavar="DAYS",
+                        help="Trailing days of macro events GeopoliticalEventsAgent assesses risk over.")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as an HTTP service serving a periodically refreshed snapshot.")
+    parser.add_argument("--host", default="127.0.0.1", help="Service bind address.")
+    parser.add_argument("--port", type=int, default=8000, help="Service port.")
+    parser.add_argument("--refresh-interval", type=float, default=REFRESH_INTERVAL,
+                        help="Seconds between snapshot refreshes in service mode.")
+    parser.add_argument("--no-schedule", action="store_true",
+                        help="In service mode, refresh every source on every tick instead of following "
+                             "each source's release cadence.")
+    parser.add_argument("--history", default=RUN_HISTORY,
+                        help="Run history database every result is appended to.")
+    parser.add_argument("--no-history", action="store_true", help="Do not record runs in the run history.")
+    parser.add_argument("--no-metrics", action="store_true", help="Disable timing instrumentation.")
+    parser.add_argument("--result-out", help="Save the run's result to this file "
+                                             "(compact JSON if it ends in .json, compact binary otherwise).")
+    parser.add_argument("--metrics-out", help="Write the run's metrics to this file "
+                                              "(Prometheus text if it ends in .prom, JSON otherwise).")
+    return parser.parse_args(argv)
 
 
-def main():
+def main(argv=None):
     """
-    Instantiates all agents, passes them to the Coordinator, runs the analysis,
+    Instantiates the selected agents, passes them to the Coordinator, runs the analysis,
     and prints the results in a readable format.
     """
-    agents = [
-        EconomicIndicatorsAgent(),
-        CurrencyMovementsAgent(),
-        GeopoliticalEventsAgent(),
-        SupplyDemandAgent(),
-        InvestorSentimentAgent(),
-        TechnicalFactorsAgent()
-    ]
-    coordinator = Coordinator(agents)
-    results = coordinator.run_analysis()
+    args = parse_args(argv)
+    if args.list_agents:
+        print("\n".join(available_agents()))
+        return
+
+    names = [n.strip() for n in args.agents.split(",") if n.strip()] if args.agents else None
+    try:
+        agents = create_agents(names, options={"geopolitical_events": {"window_days": args.event_window}})
+    except (KeyError, ValueError) as e:
+        raise SystemExit(str(e.args[0]))
+
+    llm = None
+    if args.debate:
+        from src.tools.llm_client import LLMClient
+        try:
+            llm = LLMClient(base_url=args.llm_base_url)
+        except EnvironmentError as e:
+            print(f"LLM debate disabled: {e}")
+
+    from src.coordinator import Coordinator
+    coordinator = Coordinator(agents, concurrent=not args.sequential,
+                              agent_timeout=args.agent_timeout, global_timeout=args.global_timeout,
+                              instrument=not args.no_metrics, early_stop=args.early_stop,
+                              llm=llm, llm_token_budget=args.llm_budget)
+    history = None
+    if not args.no_history:
+        from src.tools.run_history import RunHistory
+        history = RunHistory(args.history)
+    if args.serve:
+        from src.service import serve
+        scheduler = None
+        if not args.no_schedule:
+            from src.scheduler import RefreshScheduler
+            scheduler = RefreshScheduler(state_path=SCHEDULER_STATE)
+        serve(coordinator, host=args.host, port=args.port, interval=args.refresh_interval,
+              scheduler=scheduler, history=history)
+        return
+
+    if args.stream:
+        for results in coordinator.stream_analysis(early_stop=args.early_stop):
+            if not results["final"]:
+                print(f"[{len(results['completed'])}/{len(agents)}] {results['recommendation']} "
+                      f"({results['confidence']:.2f}){' decided' if results['decided'] else ''}, "
+                      f"waiting for {', '.join(results['pending'])}")
+    else:
+        results = coordinator.run_analysis()
+    if history is not None:
+        history.append(results)
+    if args.result_out:
+        write_result(results, args.result_out)
+    metrics = results.pop("metrics", None)
     print("\n=== Gold Investment Analysis Results ===")
     for key, value in results.items():
-        print(f"{key}: {value}")
+        if key == "agent_outputs":
+            print(f"{key}:")
+            for output in value:
+                print(f"  {output}")
+        else:
+            print(f"{key}: {value}")
+    if metrics is not None:
+        print("\n=== Slowest Operations ===")
+        for span in metrics["spans"][:10]:
+            labels = ",".join(f"{k}={v}" for k, v in span["labels"].items())
+            print(f"{span['name']}[{labels}]: {span['total_seconds']:.3f}s "
+                  f"x{span['count']} rows={span['rows']} errors={span['errors']}")
+        if args.metrics_out:
+            write_metrics(metrics, args.metrics_out)
+
+
+def write_result(result: dict, path: str) -> None:
+    """
+    Writes a run's result as compact JSON for .json files, or in the compact binary format otherwise
+    (read back with src.signals.result_from_json / decode_result).
+    """
+    import os
+    from src.signals import encode_result, result_to_json
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(result_to_json(result))
+    else:
+        with open(path, "wb") as f:
+            f.write(encode_result(result))
+
+
+def write_metrics(metrics: dict, path: str) -> None:
+    """
+    Writes a run's metrics (Metrics.to_dict() output) as JSON, or as Prometheus text for .prom files.
+    """
+    import json
+    import os
+    from src.tools.metrics import Metrics
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".prom"):
+            f.write(Metrics.from_dict(metrics).to_prometheus())
+        else:
+            json.dump(metrics, f, indent=2)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
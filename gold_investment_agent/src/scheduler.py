@@ -0,0 +1,216 @@
+# scheduler.py
+# Purpose: Refresh each data source only when new data can exist, and re-run only the agents
+# that depend on it.
+#
+# Each DataSource declares its release cadence (intraday, daily, weekly, monthly, quarterly, yearly)
+# and its expected release time. RefreshScheduler tracks when each source was last refreshed,
+# computes the next time new data may be published, and reports which sources (and therefore
+# which agents) are due. In continuous operation this turns a full refetch of every source on
+# every tick into a handful of calls per day for intraday feeds and a few per year for macro series.
+#
+# Times passed to and returned by the scheduler are naive local datetimes. A source's release time is
+# read in its own timezone (e.g. America/New_York for US macro data) when it declares one, otherwise
+# in the machine's local timezone, so the schedule holds wherever the service runs.
+#
+# Usage:
+#   scheduler = RefreshScheduler(state_path="data/state/scheduler.json")
+#   due = scheduler.due_sources()
+#   agents = scheduler.agents_for(due)
+#   ... re-run `agents` ...
+#   scheduler.mark_refreshed(due)
+
+import calendar
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+INTRADAY = "intraday"
+DAILY = "daily"
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+QUARTERLY = "quarterly"
+YEARLY = "yearly"
+
+NEW_YORK = "America/New_York"
+
+
+class DataSource:
+    """
+    Declares an upstream data source, how often it publishes, and which agents consume it.
+    """
+
+    def __init__(self, name: str, cadence: str, agents: Iterable[str], release_time: str = "00:00",
+                 interval: Optional[float] = None, release_day: int = 1, release_weekday: int = 0,
+                 release_month: int = 1, timezone: Optional[str] = None):
+        """
+        Args:
+            name (str): Source name; matches the AKShare endpoint used by the data layer.
+            cadence (str): One of INTRADAY, DAILY, WEEKLY, MONTHLY, QUARTERLY, YEARLY.
+            agents (iterable): Class names of the agents that read this source.
+            release_time (str): "HH:MM" at which new data is expected (non-intraday cadences).
+            interval (float, optional): Seconds between refreshes for INTRADAY sources.
+            release_day (int): Day of month for MONTHLY/QUARTERLY/YEARLY releases.
+            release_weekday (int): Weekday (Monday=0) for WEEKLY releases.
+            release_month (int): Month for YEARLY releases; first month of the cycle for QUARTERLY ones.
+            timezone (str, optional): IANA timezone of release_time and release_day (e.g. NEW_YORK).
+                Defaults to the machine's local timezone.
+        """
+        if cadence not in (INTRADAY, DAILY, WEEKLY, MONTHLY, QUARTERLY, YEARLY):
+            raise ValueError(f"Unknown cadence '{cadence}' for source '{name}'.")
+        if cadence == INTRADAY and not interval:
+            raise ValueError(f"Intraday source '{name}' needs a refresh interval.")
+        self.name = name
+        self.cadence = cadence
+        self.agents = frozenset(agents)
+        hour, minute = (int(part) for part in release_time.split(":"))
+        self.release_hour = hour
+        self.release_minute = minute
+        self.interval = interval
+        self.release_day = release_day
+        self.release_weekday = release_weekday
+        self.release_month = release_month
+        self.timezone = ZoneInfo(timezone) if timezone else None
+
+    def __repr__(self) -> str:
+        return f"DataSource({self.name!r}, {self.cadence!r})"
+
+    def _at(self, day: datetime) -> datetime:
+        return day.replace(hour=self.release_hour, minute=self.release_minute, second=0, microsecond=0)
+
+    def _in_month(self, year: int, month: int) -> datetime:
+        day = min(self.release_day, calendar.monthrange(year, month)[1])
+        return self._at(datetime(year, month, day))
+
+    def next_release(self, after: datetime) -> datetime:
+        """
+        Returns the first time strictly after `after` at which this source may publish new data.
+        """
+        if self.cadence == INTRADAY:
+            return after + timedelta(seconds=self.interval)
+        if self.timezone is None:
+            return self._next_scheduled(after)
+        # Find the release in the publisher's timezone, then express it as local time again
+        release = self._next_scheduled(after.astimezone(self.timezone).replace(tzinfo=None))
+        return release.replace(tzinfo=self.timezone).astimezone().replace(tzinfo=None)
+
+    def _next_scheduled(self, after: datetime) -> datetime:
+        """next_release() for non-intraday cadences, with `after` and the result in the source's timezone."""
+        if self.cadence == DAILY:
+            candidate = self._at(after)
+            return candidate if candidate > after else candidate + timedelta(days=1)
+        if self.cadence == WEEKLY:
+            candidate = self._at(after) + timedelta(days=(self.release_weekday - after.weekday()) % 7)
+            return candidate if candidate > after else candidate + timedelta(days=7)
+        if self.cadence == MONTHLY:
+            months = range(1, 13)
+        elif self.cadence == QUARTERLY:
+            months = sorted({(self.release_month - 1 + 3 * q) % 12 + 1 for q in range(4)})
+        else:
+            months = [self.release_month]
+        year = after.year
+        while True:
+            for month in months:
+                candidate = self._in_month(year, month)
+                if candidate > after:
+                    return candidate
+            year += 1
+
+
+# Release cadences of the sources used by the agents. Release times approximate the publishers'
+# schedules (US macro data at 08:30 New York time, world gold statistics quarterly, etc.).
+DEFAULT_SOURCES = [
+    DataSource("macro_usa_cpi_monthly", MONTHLY, ["EconomicIndicatorsAgent"], "08:30", release_day=12,
+               timezone=NEW_YORK),
+    DataSource("macro_usa_interest_rate", DAILY, ["EconomicIndicatorsAgent"], "14:00", timezone=NEW_YORK),
+    DataSource("macro_usa_gdp_yearly", QUARTERLY, ["EconomicIndicatorsAgent"], "08:30",
+               release_day=28, release_month=1, timezone=NEW_YORK),
+    DataSource("macro_usa_unemployment_rate", MONTHLY, ["EconomicIndicatorsAgent"], "08:30", release_day=5,
+               timezone=NEW_YORK),
+    DataSource("currency_latest", INTRADAY, ["CurrencyMovementsAgent"], interval=300),
+    DataSource("macro_usa_cme_merchant_goods_holding", DAILY,
+               ["CurrencyMovementsAgent", "SupplyDemandAgent"], "18:00", timezone=NEW_YORK),
+    DataSource("macro_info_ws", INTRADAY, ["GeopoliticalEventsAgent"], interval=1800),
+    DataSource("news_economic_baidu", INTRADAY, ["GeopoliticalEventsAgent"], interval=1800),
+    DataSource("macro_world_gold_demand", QUARTERLY, ["SupplyDemandAgent"], release_day=1, release_month=2),
+    DataSource("macro_world_gold_reserves", QUARTERLY, ["SupplyDemandAgent"], release_day=1, release_month=1),
+    DataSource("macro_world_gold_production", QUARTERLY, ["SupplyDemandAgent"], release_day=1, release_month=2),
+    DataSource("news_cctv", INTRADAY, ["InvestorSentimentAgent"], interval=600),
+    DataSource("gold_spot_hist_sina", INTRADAY, ["TechnicalFactorsAgent"], interval=300),
+]
+
+
+class RefreshScheduler:
+    """
+    Tracks the last refresh of each DataSource and reports which sources and agents are due.
+    Refresh times can be persisted to JSON so restarts don't refetch everything.
+    """
+
+    def __init__(self, sources: Optional[List[DataSource]] = None, state_path: Optional[str] = None):
+        self.sources = {s.name: s for s in (sources or DEFAULT_SOURCES)}
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self.last_refreshed: Dict[str, datetime] = self._load()
+
+    def next_refresh(self, source: DataSource) -> Optional[datetime]:
+        """Returns when the source is next due, or None if it has never been refreshed (due now)."""
+        last = self.last_refreshed.get(source.name)
+        return source.next_release(last) if last is not None else None
+
+    def due_sources(self, now: Optional[datetime] = None) -> List[DataSource]:
+        """Returns the sources for which new data may have been published since their last refresh."""
+        now = now or datetime.now()
+        with self._lock:
+            return [s for s in self.sources.values()
+                    if (due := self.next_refresh(s)) is None or due <= now]
+
+    def agents_for(self, sources: Iterable[DataSource]) -> Set[str]:
+        """Returns the class names of the agents that depend on any of the given sources."""
+        agents = set()
+        for source in sources:
+            agents |= source.agents
+        return agents
+
+    def due_agents(self, now: Optional[datetime] = None) -> Set[str]:
+        return self.agents_for(self.due_sources(now))
+
+    def sources_for(self, agents: Iterable[str]) -> List[DataSource]:
+        """Returns every source read by any of the given agents."""
+        agents = set(agents)
+        return [s for s in self.sources.values() if s.agents & agents]
+
+    def next_wakeup(self) -> Optional[datetime]:
+        """Returns the earliest time any source becomes due (None if something is due already)."""
+        with self._lock:
+            times = [self.next_refresh(s) for s in self.sources.values()]
+        if not times or any(t is None for t in times):
+            return None
+        return min(times)
+
+    def mark_refreshed(self, sources: Iterable[DataSource], when: Optional[datetime] = None) -> None:
+        """Records that the given sources were refreshed at `when` (default: now) and persists state."""
+        when = when or datetime.now()
+        with self._lock:
+            for source in sources:
+                self.last_refreshed[source.name] = when
+            self._save()
+
+    def _load(self) -> Dict[str, datetime]:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return {name: datetime.fromisoformat(stamp) for name, stamp in data.items() if name in self.sources}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        with open(self.state_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({name: stamp.isoformat() for name, stamp in self.last_refreshed.items()}, f)
+        os.replace(self.state_path + ".tmp", self.state_path)
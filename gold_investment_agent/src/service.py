@@ -0,0 +1,295 @@
+# service.py
+# Purpose: Long-running service mode. A background worker periodically runs Coordinator.run_analysis
+# and atomically swaps in the latest result; Flask endpoints serve that snapshot.
+#
+# HTTP requests never trigger a data fetch: each snapshot's JSON responses are encoded once when the
+# snapshot is published, so serving a request is a reference read plus returning pre-built bytes.
+# With a RefreshScheduler (src/scheduler.py) the worker only refreshes sources whose release cadence
+# says new data can exist, and re-runs only the agents that depend on them; a source whose refresh
+# fails, or whose scheduled release is late (the refresh returns the same data as before), stays due and
+# is retried on the next tick while the cached value is served. With a RunHistory
+# (src/tools/run_history.py) every published result is also appended to the run history.
+#
+# Endpoints:
+# - GET /                    -> web/index.html dashboard
+# - GET /api/recommendation  -> {recommendation, confidence, generated_at}
+# - GET /api/summary         -> {summary_table, generated_at}
+# - GET /api/snapshot        -> recommendation, confidence, reasoning, summary_table, data_stats, metrics
+# - GET /api/result        -> the full result as compact JSON (src/signals.py: result_to_json)
+# - GET /api/result.bin    -> the full result in the compact binary format (signals.encode_result)
+# - GET /api/history       -> downsampled run history (?interval=1h&since=7D&agent=...), with a RunHistory
+# - GET /api/health          -> worker status, snapshot age and last refresh error
+# - GET /metrics             -> process-wide timing metrics in Prometheus text format
+#
+# Usage:
+#   python -m src.main --serve --port 8000 --refresh-interval 300
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from src.scheduler import INTRADAY
+from src.signals import AgentSignal, encode_result, result_to_json, summary_table
+
+WEB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web")
+
+
+def _json_default(value: Any) -> Any:
+    """Makes agent outputs JSON-serializable (AgentSignal records, DataFrames, NumPy scalars, timestamps)."""
+    if isinstance(value, AgentSignal):
+        return value.to_dict()
+    if hasattr(value, "to_dict") and hasattr(value, "columns"):
+        return value.to_dict(orient="records")
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+class Snapshot:
+    """
+    Immutable view of one analysis run with its HTTP responses pre-encoded.
+    """
+    __slots__ = ("result", "generated_at", "duration", "responses")
+
+    def __init__(self, result: Dict[str, Any], generated_at: datetime, duration: float):
+        self.result = result
+        self.generated_at = generated_at
+        self.duration = duration
+        stamp = generated_at.isoformat()
+        table = summary_table(result.get("agent_outputs", []))
+        self.responses = {
+            "recommendation": _encode({
+                "recommendation": result.get("recommendation"),
+                "confidence": result.get("confidence"),
+                "generated_at": stamp,
+            }),
+            "summary": _encode({
+                "summary_table": table,
+                "generated_at": stamp,
+            }),
+            "snapshot": _encode({
+                "recommendation": result.get("recommendation"),
+                "confidence": result.get("confidence"),
+                "reasoning": result.get("reasoning"),
+                "summary_table": table,
+                "data_stats": result.get("data_stats"),
+                "metrics": result.get("metrics"),
+                "generated_at": stamp,
+                "duration_seconds": duration,
+            }),
+            "result": result_to_json({**result, "generated_at": stamp}).encode("utf-8"),
+            "result.bin": encode_result({**result, "generated_at": stamp}),
+        }
+
+
+class SnapshotWorker:
+    """
+    Runs the Coordinator on a background thread every `interval` seconds and publishes the latest
+    result as a Snapshot. Readers get the current snapshot with a single attribute read; a failed
+    refresh keeps serving the previous snapshot and records the error.
+    """
+
+    def __init__(self, coordinator, interval: float = 300.0, scheduler=None, history=None):
+        """
+        Args:
+            coordinator (Coordinator): Runs the analysis.
+            interval (float): Seconds between refresh ticks.
+            scheduler (RefreshScheduler, optional): When set, each tick refreshes only due sources and
+                re-runs only their dependent agents; ticks with nothing due are skipped.
+            history (RunHistory, optional): Records every published result.
+        """
+        self.coordinator = coordinator
+        self.interval = interval
+        self.scheduler = scheduler
+        self.history = history
+        self._snapshot: Optional[Snapshot] = None
+        self.last_error: Optional[str] = None
+        self.last_attempt: Optional[datetime] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        return self._snapshot
+
+    def refresh_once(self) -> Optional[Snapshot]:
+        """Runs one analysis and swaps in the new snapshot. Returns it, or None on failure."""
+        self.last_attempt = datetime.now()
+        start = time.monotonic()
+        try:
+            if self.scheduler is None:
+                result = self.coordinator.run_analysis()
+            else:
+                result = self._scheduled_refresh()
+                if result is None:
+                    return self._snapshot
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Error refreshing analysis snapshot: {e}")
+            return None
+        snapshot = Snapshot(result, datetime.now(), time.monotonic() - start)
+        self._snapshot = snapshot  # Atomic reference swap; readers never see a partial snapshot
+        self.last_error = None
+        if self.history is not None:
+            try:
+                self.history.append(result, snapshot.generated_at)
+            except Exception as e:
+                print(f"Error recording run history: {e}")
+        return snapshot
+
+    def _scheduled_refresh(self) -> Optional[Dict[str, Any]]:
+        """
+        Refreshes the sources that are due and re-runs their agents. Returns None if nothing is due.
+        """
+        now = datetime.now()
+        previous = self._snapshot.result if self._snapshot is not None else None
+        due = self.scheduler.due_sources(now)
+        if previous is not None and not due:
+            return None
+        # Due sources bypass the disk cache's TTL; sources that are not due are read from the cache
+        data = self.coordinator.data
+        data.force_refresh(source.name for source in due)
+        if previous is None:
+            # No snapshot yet: every agent has to run once
+            agents = {agent.__class__.__name__ for agent in self.coordinator.agents}
+            result = self.coordinator.run_analysis()
+        else:
+            agents = self.scheduler.agents_for(due)
+            result = self.coordinator.run_partial(agents, previous)
+        # Only sources that really received new data are done. Failed ones (a forced refresh falls back
+        # to the cached value) and scheduled releases that returned the same data as before (published
+        # late) stay due and are retried on the next tick. Intraday feeds are done once fetched, since
+        # an unchanged answer just means nothing happened since the last poll. Sources that none of
+        # the coordinator's agents read are never fetched, so they count as done.
+        running = {agent.__class__.__name__ for agent in self.coordinator.agents}
+        refreshed = data.refreshed(source.name for source in due)
+        changed = data.changed(source.name for source in due)
+        done = [source for source in due
+                if (source.name in refreshed and (source.cadence == INTRADAY or source.name in changed))
+                or not source.agents & running]
+        self.scheduler.mark_refreshed(done, now)
+        result["retry_sources"] = sorted(source.name for source in due if source not in done)
+        result["refreshed_agents"] = sorted(agents)
+        return result
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.refresh_once()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self) -> "SnapshotWorker":
+        """Starts the background refresh thread (the first refresh begins immediately)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="snapshot-worker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def health(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "status": "ok" if snapshot is not None else "warming_up",
+            "worker_alive": self._thread is not None and self._thread.is_alive(),
+            "generated_at": snapshot.generated_at.isoformat() if snapshot else None,
+            "age_seconds": (datetime.now() - snapshot.generated_at).total_seconds() if snapshot else None,
+            "last_refresh_seconds": snapshot.duration if snapshot else None,
+            "last_attempt": self.last_attempt.isoformat() if self.last_attempt else None,
+            "last_error": self.last_error,
+            "refresh_interval": self.interval,
+        }
+
+
+def create_app(worker: SnapshotWorker):
+    """
+    Builds the Flask app serving the worker's latest snapshot. Handlers only read the snapshot.
+    """
+    import pandas as pd
+    from flask import Flask, Response, request, send_from_directory
+
+    app = Flask(__name__)
+    warming_up = _encode({"status": "warming_up", "detail": "No analysis snapshot available yet."})
+
+    def serve(name: str, mimetype: str = "application/json") -> Response:
+        snapshot = worker.snapshot
+        if snapshot is None:
+            return Response(warming_up, status=503, mimetype="application/json")
+        return Response(snapshot.responses[name], mimetype=mimetype)
+
+    @app.get("/")
+    def index():
+        return send_from_directory(WEB_DIR, "index.html")
+
+    @app.get("/api/recommendation")
+    def recommendation():
+        return serve("recommendation")
+
+    @app.get("/api/summary")
+    def summary():
+        return serve("summary")
+
+    @app.get("/api/snapshot")
+    def snapshot():
+        return serve("snapshot")
+
+    @app.get("/api/result")
+    def result():
+        return serve("result")
+
+    @app.get("/api/result.bin")
+    def result_binary():
+        return serve("result.bin", "application/octet-stream")
+
+    @app.get("/api/history")
+    def history():
+        if worker.history is None:
+            return Response(_encode({"detail": "Run history is disabled."}), status=404,
+                            mimetype="application/json")
+        since = request.args.get("since", "7D")
+        try:
+            table = worker.history.aggregate(request.args.get("interval", "1h"),
+                                             start=datetime.now() - pd.Timedelta(since),
+                                             agent=request.args.get("agent"))
+        except ValueError as e:
+            return Response(_encode({"detail": str(e)}), status=400, mimetype="application/json")
+        rows = [{"bucket": bucket.isoformat(), **values}
+                for bucket, values in zip(table.index, table.to_dict(orient="records"))]
+        return Response(_encode({"history": rows}), mimetype="application/json")
+
+    @app.get("/api/health")
+    def health():
+        return Response(_encode(worker.health()), mimetype="application/json")
+
+    @app.get("/metrics")
+    def metrics():
+        from src.tools.metrics import get_metrics
+        return Response(get_metrics().to_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    return app
+
+
+def serve(coordinator, host: str = "127.0.0.1", port: int = 8000, interval: float = 300.0,
+          scheduler=None, history=None) -> None:
+    """
+    Starts the refresh worker and runs the Flask server until interrupted.
+    """
+    worker = SnapshotWorker(coordinator, interval=interval, scheduler=scheduler, history=history).start()
+    app = create_app(worker)
+    try:
+        app.run(host=host, port=port, threaded=True, use_reloader=False)
+    finally:
+        worker.stop(timeout=1.0)
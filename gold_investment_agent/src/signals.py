@@ -0,0 +1,267 @@
+# signals.py
+# Purpose: Typed record for agent outputs (AgentSignal) and compact serialization of analysis results.
+#
+# Every agent returns an AgentSignal: agent name, signal (Buy/Sell/Hold), confidence in [0, 1],
+# reasoning, plus optional details and refs.
+# - details: small JSON-compatible values (numbers, strings, lists/dicts of them). NumPy scalars and
+#   timestamps are converted on construction; DataFrames and Series are rejected.
+# - refs: data-layer references ({"endpoint": ..., "params": {...}}) to raw frames the analysis used.
+#   The frames stay in the data layer / disk cache and can be re-read with fetch_ref(); results only
+#   hold the reference.
+#
+# A Coordinator result keeps its agent outputs once (result["agent_outputs"]); the summary table the
+# service exposes is derived from them when needed (summary_table()).
+#
+# Serialization of a result (recommendation, confidence, agent outputs and any extra keys such as
+# data_stats or metrics); the combined reasoning string is rebuilt on decoding rather than stored:
+# - encode_result / decode_result: zlib-compressed binary (signal codes and confidences packed with struct).
+# - result_to_json / result_from_json: compact JSON with one array per agent output.
+#
+# Usage:
+#   signal = AgentSignal("TechnicalFactorsAgent", "Buy", 0.7, "MA20 above MA50", details={"rsi14": 55.2})
+#   blob = encode_result(coordinator.run_analysis())
+#   result = decode_result(blob)
+
+import json
+import math
+import struct
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# Signal labels in tie-breaking order (Buy, then Sell, then Hold) and their codes
+SIGNALS = ("Buy", "Sell", "Hold")
+SIGNAL_CODES = {signal: code for code, signal in enumerate(SIGNALS)}
+
+# Output fields that are not details when building an AgentSignal from a dict
+FIELDS = ("agent", "signal", "confidence", "reasoning")
+
+# Binary result format: magic, then a zlib stream of
+#   header (recommendation code, confidence, number of agent outputs),
+#   per output: signal code, confidence, then agent / reasoning / details / refs as length-prefixed UTF-8,
+#   and finally the remaining result keys as length-prefixed JSON.
+MAGIC = b"GIA1"
+_HEADER = struct.Struct("<BdH")
+_RECORD = struct.Struct("<Bd")
+_LENGTH = struct.Struct("<I")
+
+
+def _plain(value: Any, name: str) -> Any:
+    """Converts a detail value to plain JSON-compatible Python, or raises TypeError."""
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return None if math.isnan(value) else float(value)
+    if isinstance(value, dict):
+        return {str(k): _plain(v, name) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v, name) for v in value]
+    if hasattr(value, "columns") or hasattr(value, "index") and hasattr(value, "dtype"):
+        raise TypeError(f"Detail '{name}' is a {type(value).__name__}; keep raw data out of the output "
+                        f"and record a data-layer reference in refs instead.")
+    if isinstance(value, (datetime, date)) or hasattr(value, "isoformat"):
+        return None if value != value else value.isoformat()  # NaT compares unequal to itself
+    if hasattr(value, "tolist"):  # NumPy scalars and arrays
+        return _plain(value.tolist(), name)
+    raise TypeError(f"Detail '{name}' has unsupported type {type(value).__name__}.")
+
+
+def data_ref(endpoint: str, **params) -> dict:
+    """Reference to a data-layer fetch, e.g. data_ref("currency_latest", base="USD")."""
+    return {"endpoint": endpoint, "params": params}
+
+
+def fetch_ref(ref: dict, data=None, **extra) -> Any:
+    """
+    Re-reads the frame behind a reference through the data layer (normally a cache hit).
+    `extra` supplies arguments that are not stored in references, such as API keys.
+    """
+    if data is None:
+        from src.tools.data_access import get_data_layer
+        data = get_data_layer()
+    return data.fetch(ref["endpoint"], **ref.get("params", {}), **extra)
+
+
+class AgentSignal:
+    """
+    One agent's vote: agent name, signal, confidence, reasoning, optional details and data references.
+    The schema is checked on construction (ValueError for a bad signal or confidence, TypeError for
+    details that are not JSON-compatible).
+    """
+    __slots__ = ("agent", "signal", "confidence", "reasoning", "details", "refs")
+
+    def __init__(self, agent: str, signal: str, confidence: float, reasoning: str = "",
+                 details: Optional[Dict[str, Any]] = None, refs: Optional[Dict[str, dict]] = None):
+        if signal not in SIGNAL_CODES:
+            raise ValueError(f"{agent}: signal must be one of {', '.join(SIGNALS)}, got {signal!r}.")
+        confidence = float(confidence)
+        if not 0.0 <= confidence <= 1.0:
+            raise ValueError(f"{agent}: confidence must be within [0, 1], got {confidence}.")
+        self.agent = str(agent)
+        self.signal = signal
+        self.confidence = confidence
+        self.reasoning = str(reasoning)
+        self.details = {str(k): _plain(v, k) for k, v in details.items()} if details else {}
+        self.refs = {str(k): _plain(v, k) for k, v in refs.items()} if refs else {}
+
+    @property
+    def code(self) -> int:
+        """Signal code (0=Buy, 1=Sell, 2=Hold)."""
+        return SIGNAL_CODES[self.signal]
+
+    @classmethod
+    def from_dict(cls, output: Dict[str, Any]) -> "AgentSignal":
+        """Builds a record from an output dict; keys other than the fields and refs become details."""
+        return cls(output.get("agent", "UnknownAgent"), output.get("signal", "Hold"),
+                   output.get("confidence", 0.5), output.get("reasoning", ""),
+                   details={k: v for k, v in output.items() if k not in FIELDS and k != "refs"},
+                   refs=output.get("refs"))
+
+    @classmethod
+    def coerce(cls, output) -> "AgentSignal":
+        """Returns `output` unchanged if it is an AgentSignal, else builds one from a dict."""
+        return output if isinstance(output, cls) else cls.from_dict(output)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat dict: the four fields, then details, then refs (if any)."""
+        out = {"agent": self.agent, "signal": self.signal, "confidence": self.confidence,
+               "reasoning": self.reasoning, **self.details}
+        if self.refs:
+            out["refs"] = self.refs
+        return out
+
+    def to_row(self) -> list:
+        """Compact JSON row: [agent, signal, confidence, reasoning, details, refs] (empty tail dropped)."""
+        row = [self.agent, self.signal, self.confidence, self.reasoning, self.details, self.refs]
+        while len(row) > 4 and not row[-1]:
+            row.pop()
+        return row
+
+    @classmethod
+    def from_row(cls, row: list) -> "AgentSignal":
+        return cls(*row)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, AgentSignal):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        extra = f", details={self.details!r}" if self.details else ""
+        if self.refs:
+            extra += f", refs={self.refs!r}"
+        return (f"AgentSignal({self.agent!r}, {self.signal!r}, {self.confidence!r}, "
+                f"{self.reasoning!r}{extra})")
+
+
+def summary_table(agent_outputs: Iterable) -> List[Dict[str, Any]]:
+    """One flat dict per agent output (fields, details and refs), as served by /api/summary."""
+    return [AgentSignal.coerce(output).to_dict() for output in agent_outputs]
+
+
+def combined_reasoning(agent_outputs: Iterable[AgentSignal]) -> str:
+    """The result-level reasoning: every agent's reasoning prefixed with its name."""
+    return " | ".join(f"{output.agent}: {output.reasoning}" for output in agent_outputs)
+
+
+def _extras(result: Dict[str, Any]) -> Dict[str, Any]:
+    skip = {"recommendation", "confidence", "reasoning", "agent_outputs", "summary_table"}
+    return {k: v for k, v in result.items() if k not in skip}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, AgentSignal):
+        return value.to_dict()
+    return _plain(value, "result")
+
+
+def _rebuild(recommendation: str, confidence: float, outputs: List[AgentSignal],
+             extras: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "recommendation": recommendation,
+        "confidence": confidence,
+        "reasoning": combined_reasoning(outputs),
+        "agent_outputs": outputs,
+        **extras,
+    }
+
+
+def encode_result(result: Dict[str, Any], level: int = 6) -> bytes:
+    """
+    Packs a Coordinator result into the compact binary format (see MAGIC above).
+    Args:
+        result (dict): Output of Coordinator.run_analysis / synthesize.
+        level (int): zlib compression level (0 stores uncompressed).
+    Returns:
+        bytes: The encoded result.
+    """
+    outputs = [AgentSignal.coerce(o) for o in result.get("agent_outputs", [])]
+    parts = [_HEADER.pack(SIGNAL_CODES[result.get("recommendation", "Hold")],
+                          float(result.get("confidence", 0.0)), len(outputs))]
+
+    def text(value: str) -> None:
+        data = value.encode("utf-8")
+        parts.append(_LENGTH.pack(len(data)))
+        parts.append(data)
+
+    def compact(value) -> None:
+        text(json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+             if value else "")
+
+    for output in outputs:
+        parts.append(_RECORD.pack(output.code, output.confidence))
+        text(output.agent)
+        text(output.reasoning)
+        compact(output.details)
+        compact(output.refs)
+    compact(_extras(result))
+    return MAGIC + zlib.compress(b"".join(parts), level)
+
+
+def decode_result(blob: bytes) -> Dict[str, Any]:
+    """Unpacks encode_result output into a result dict with AgentSignal outputs."""
+    if blob[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not an encoded analysis result.")
+    body = memoryview(zlib.decompress(blob[len(MAGIC):]))
+    recommendation, confidence, count = _HEADER.unpack_from(body, 0)
+    pos = _HEADER.size
+
+    def text() -> str:
+        nonlocal pos
+        (length,) = _LENGTH.unpack_from(body, pos)
+        pos += _LENGTH.size + length
+        return str(body[pos - length:pos], "utf-8")
+
+    def compact() -> Any:
+        value = text()
+        return json.loads(value) if value else {}
+
+    outputs = []
+    for _ in range(count):
+        code, agent_confidence = _RECORD.unpack_from(body, pos)
+        pos += _RECORD.size
+        agent, reasoning = text(), text()
+        outputs.append(AgentSignal(agent, SIGNALS[code], agent_confidence, reasoning,
+                                   details=compact(), refs=compact()))
+    return _rebuild(SIGNALS[recommendation], confidence, outputs, compact())
+
+
+def result_to_json(result: Dict[str, Any]) -> str:
+    """
+    Compact JSON for a Coordinator result: agent outputs as rows (AgentSignal.to_row), no whitespace,
+    and no combined reasoning (rebuilt by result_from_json).
+    """
+    payload = {
+        "recommendation": result.get("recommendation"),
+        "confidence": result.get("confidence"),
+        "agent_outputs": [AgentSignal.coerce(o).to_row() for o in result.get("agent_outputs", [])],
+        **_extras(result),
+    }
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def result_from_json(text: str) -> Dict[str, Any]:
+    """Parses result_to_json output into a result dict with AgentSignal outputs."""
+    payload = json.loads(text)
+    outputs = [AgentSignal.from_row(row) for row in payload.pop("agent_outputs", [])]
+    return _rebuild(payload.pop("recommendation", "Hold"), payload.pop("confidence", 0.0), outputs, payload)
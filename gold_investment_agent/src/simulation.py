@@ -0,0 +1,392 @@
+# simulation.py
+# Purpose: Simulation Mode. Backtests the agents' rule logic and the Coordinator's weighted vote
+# over historical data and reports ROI and risk metrics.
+#
+# The agents' decision rules are replayed column-wise over the whole history in a single NumPy
+# pass (no per-day loop), so 20+ years of daily data backtest in milliseconds:
+# - TechnicalFactorsAgent: MA20/MA50 crossover filtered by RSI14 (70/30)
+# - EconomicIndicatorsAgent: CPI > 3.0 and rate < 2.0 => Buy; CPI < 2.0 and rate > 3.0 => Sell
+# - SupplyDemandAgent: majority of ETF holding / demand / reserves / production thresholds
+# - GeopoliticalEventsAgent: >= 5 high-importance events => Buy
+# - InvestorSentimentAgent: positive vs. negative keyword counts
+# - CurrencyMovementsAgent: no directional rule; always Hold at 0.5, as the live agent votes
+# Agents whose input columns are missing from the dataset abstain (zero weight).
+# The rule thresholds are parameters (DEFAULT_THRESHOLDS holds the live agents' values), and
+# prepare_features()/simulate() split the per-dataset work from the per-configuration work so
+# src/sweep.py can replay many threshold and weight settings cheaply.
+#
+# Dependencies:
+# - numpy, pandas
+# - src/tools/data_tools.py (load_historical_data, clean_data)
+# - src/tools/indicators.py (MA/RSI, same Wilder RSI as the live agent)
+#
+# Usage:
+#   python -m src.simulation data/historical_data.csv
+
+import sys
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.tools.data_tools import load_historical_data, clean_data
+from src.tools.indicators import TECHNICAL_SPEC, compute_indicators
+
+# Signal codes; order matches the Coordinator's tie-breaking (Buy, then Sell, then Hold)
+BUY, SELL, HOLD = 0, 1, 2
+SIGNALS = ("Buy", "Sell", "Hold")
+
+DEFAULT_WEIGHTS = {
+    "EconomicIndicatorsAgent": 0.3,
+    "TechnicalFactorsAgent": 0.2,
+    "InvestorSentimentAgent": 0.2,
+    "CurrencyMovementsAgent": 0.1,
+    "GeopoliticalEventsAgent": 0.1,
+    "SupplyDemandAgent": 0.1,
+}
+
+TRADING_DAYS = 252
+
+
+def _column(df: pd.DataFrame, name: str) -> Optional[np.ndarray]:
+    if name not in df.columns:
+        return None
+    return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+
+
+def technical_signals(price: np.ndarray, overbought: float = 70.0, oversold: float = 30.0,
+                      indicators: Optional[Dict[str, np.ndarray]] = None):
+    """
+    Vectorized TechnicalFactorsAgent rules. Returns (signal codes, confidences).
+    `indicators` may hold precomputed ma20/ma50/rsi14 arrays (see prepare_features).
+    """
+    values = indicators if indicators is not None else compute_indicators(price, TECHNICAL_SPEC)
+    ma20, ma50, rsi14 = values["ma20"], values["ma50"], values["rsi14"]
+    buy = (ma20 > ma50) & (rsi14 < overbought)
+    sell = ~buy & (ma20 < ma50) & (rsi14 > oversold)
+    signal = np.select([buy, sell], [BUY, SELL], HOLD)
+    confidence = np.where(buy | sell, 0.7, 0.5)
+    return signal, confidence
+
+
+def economic_signals(cpi: np.ndarray, rate: np.ndarray, cpi_high: float = 3.0, rate_low: float = 2.0,
+                     cpi_low: float = 2.0, rate_high: float = 3.0):
+    """Vectorized EconomicIndicatorsAgent rules. Returns (signal codes, confidences)."""
+    known = ~np.isnan(cpi) & ~np.isnan(rate)
+    buy = known & (cpi > cpi_high) & (rate < rate_low)
+    sell = known & (cpi < cpi_low) & (rate > rate_high)
+    signal = np.select([buy, sell], [BUY, SELL], HOLD)
+    confidence = np.select([buy, sell, known], [0.8, 0.7, 0.5], 0.3)
+    return signal, confidence
+
+
+def supply_demand_signals(etf_holding, world_demand, reserves, production, n: int,
+                          etf_min: float = 900.0, demand_min: float = 1000.0, reserves_min: float = 30000.0,
+                          production_max: float = 900.0):
+    """Vectorized SupplyDemandAgent rules (majority of available factors). Returns (codes, confidences)."""
+    bullish = np.zeros(n, dtype=np.int64)
+    bearish = np.zeros(n, dtype=np.int64)
+    for values, is_bullish in (
+        (etf_holding, lambda v: v > etf_min),
+        (world_demand, lambda v: v > demand_min),
+        (reserves, lambda v: v > reserves_min),
+        (production, lambda v: v < production_max),
+    ):
+        if values is None:
+            continue
+        known = ~np.isnan(values)
+        up = known & is_bullish(values)
+        bullish += up
+        bearish += known & ~up
+    buy = bullish > bearish
+    sell = bearish > bullish
+    signal = np.select([buy, sell], [BUY, SELL], HOLD)
+    confidence = np.where(buy | sell, 0.7, 0.5)
+    return signal, confidence
+
+
+def geopolitical_signals(high_importance_count: np.ndarray, min_events: float = 5):
+    """Vectorized GeopoliticalEventsAgent rules. Returns (signal codes, confidences)."""
+    counts = np.nan_to_num(high_importance_count)
+    signal = np.where(counts >= min_events, BUY, HOLD)
+    confidence = np.select([counts >= min_events, counts == 0], [0.7, 0.4], 0.5)
+    return signal, confidence
+
+
+def sentiment_signals(pos: np.ndarray, neg: np.ndarray):
+    """Vectorized InvestorSentimentAgent rules. Returns (signal codes, confidences)."""
+    pos, neg = np.nan_to_num(pos), np.nan_to_num(neg)
+    signal = np.select([pos > neg, neg > pos], [BUY, SELL], HOLD)
+    confidence = np.where(pos != neg, 0.6, 0.4)
+    return signal, confidence
+
+
+def currency_signals(n: int):
+    """
+    CurrencyMovementsAgent rule: the live agent has no directional rule yet and always votes Hold with
+    confidence 0.5, which still adds Hold weight to the vote. Returns (signal codes, confidences).
+    """
+    return np.full(n, HOLD), np.full(n, 0.5)
+
+
+# Input columns read by the agents' rules (besides the price column)
+FEATURE_COLUMNS = ("cpi", "interest_rate", "etf_holding", "world_demand", "central_bank_reserves",
+                   "production", "high_importance_count", "sentiment_pos", "sentiment_neg")
+
+
+def prepare_features(df: pd.DataFrame, price_col: str = "gold_price_usd") -> Dict[str, Optional[np.ndarray]]:
+    """
+    Extracts everything the rules and the backtest read from `df` as arrays: the price, its daily
+    returns and MA/RSI indicators, and each input column (None when missing). Computed once, the
+    features can be replayed under many thresholds and weights without touching the DataFrame.
+    """
+    price = _column(df, price_col)
+    features = {"n": len(df), "price": price}
+    if price is not None:
+        features.update(compute_indicators(price, TECHNICAL_SPEC))
+        returns = np.zeros(len(price))
+        returns[1:] = np.nan_to_num(price[1:] / price[:-1] - 1.0)
+        features["returns"] = returns
+    for name in FEATURE_COLUMNS:
+        features[name] = _column(df, name)
+    return features
+
+
+def _technical_rule(f, t):
+    if f["price"] is None:
+        return None
+    return technical_signals(f["price"], t["rsi_overbought"], t["rsi_oversold"], indicators=f)
+
+
+def _economic_rule(f, t):
+    if f["cpi"] is None or f["interest_rate"] is None:
+        return None
+    return economic_signals(f["cpi"], f["interest_rate"], t["cpi_high"], t["rate_low"], t["cpi_low"], t["rate_high"])
+
+
+def _supply_demand_rule(f, t):
+    supply = [f[c] for c in ("etf_holding", "world_demand", "central_bank_reserves", "production")]
+    if all(v is None for v in supply):
+        return None
+    return supply_demand_signals(*supply, f["n"], t["etf_holding"], t["world_demand"],
+                                 t["central_bank_reserves"], t["production"])
+
+
+def _geopolitical_rule(f, t):
+    if f["high_importance_count"] is None:
+        return None
+    return geopolitical_signals(f["high_importance_count"], t["high_importance_events"])
+
+
+def _sentiment_rule(f, t):
+    if f["sentiment_pos"] is None or f["sentiment_neg"] is None:
+        return None
+    return sentiment_signals(f["sentiment_pos"], f["sentiment_neg"])
+
+
+def _currency_rule(f, t):
+    return currency_signals(f["n"])
+
+
+# Decision thresholds of the agents' rules; the defaults are the values hard-coded in the live agents
+DEFAULT_THRESHOLDS = {
+    "rsi_overbought": 70.0,             # TechnicalFactorsAgent: no Buy at or above
+    "rsi_oversold": 30.0,               # TechnicalFactorsAgent: no Sell at or below
+    "cpi_high": 3.0,                    # EconomicIndicatorsAgent: Buy if CPI above and rate below rate_low
+    "rate_low": 2.0,
+    "cpi_low": 2.0,                     # EconomicIndicatorsAgent: Sell if CPI below and rate above rate_high
+    "rate_high": 3.0,
+    "etf_holding": 900.0,               # SupplyDemandAgent: bullish above
+    "world_demand": 1000.0,             # SupplyDemandAgent: bullish above
+    "central_bank_reserves": 30000.0,   # SupplyDemandAgent: bullish above
+    "production": 900.0,                # SupplyDemandAgent: bullish below
+    "high_importance_events": 5,        # GeopoliticalEventsAgent: Buy at or above
+}
+
+# Agent -> (thresholds its rule reads, rule over prepared features)
+AGENT_RULES = {
+    "TechnicalFactorsAgent": (("rsi_overbought", "rsi_oversold"), _technical_rule),
+    "EconomicIndicatorsAgent": (("cpi_high", "rate_low", "cpi_low", "rate_high"), _economic_rule),
+    "SupplyDemandAgent": (("etf_holding", "world_demand", "central_bank_reserves", "production"),
+                          _supply_demand_rule),
+    "GeopoliticalEventsAgent": (("high_importance_events",), _geopolitical_rule),
+    "InvestorSentimentAgent": ((), _sentiment_rule),
+    "CurrencyMovementsAgent": ((), _currency_rule),
+}
+
+
+def signals_from_features(features: dict, thresholds: Optional[Dict[str, float]] = None,
+                          cache: Optional[dict] = None) -> Dict[str, tuple]:
+    """
+    Replays every agent whose inputs are present in `features` under the given thresholds
+    (missing keys take DEFAULT_THRESHOLDS). With a `cache` dict, each agent's signals are reused
+    for later calls that pass the same values for the thresholds that agent reads.
+    Returns {agent name: (signal codes, confidences)}.
+    """
+    t = {**DEFAULT_THRESHOLDS, **thresholds} if thresholds else DEFAULT_THRESHOLDS
+    signals = {}
+    for agent, (params, rule) in AGENT_RULES.items():
+        key = (agent, *(t[p] for p in params))
+        if cache is not None and key in cache:
+            result = cache[key]
+        else:
+            result = rule(features, t)
+            if cache is not None:
+                cache[key] = result
+        if result is not None:
+            signals[agent] = result
+    return signals
+
+
+def agent_signals(df: pd.DataFrame, price_col: str = "gold_price_usd",
+                  thresholds: Optional[Dict[str, float]] = None) -> Dict[str, tuple]:
+    """
+    Replays every agent whose inputs are present in `df`.
+    Returns {agent name: (signal codes, confidences)} with one entry per row.
+    """
+    return signals_from_features(prepare_features(df, price_col), thresholds)
+
+
+def weighted_vote(signals: Dict[str, tuple], weights: Optional[Dict[str, float]] = None):
+    """
+    Vectorized Coordinator.synthesize: accumulates weight * confidence per signal and picks the
+    highest score per row (ties resolve Buy, Sell, Hold as in the Coordinator).
+    Returns (recommendation codes, confidences).
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    if not signals:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    codes = np.stack([signal for signal, _ in signals.values()])
+    weighted = np.stack([weights.get(agent, 0.1) * confidence for agent, (_, confidence) in signals.items()])
+    n = codes.shape[1]
+    # One pass over all votes: cell (code, row) accumulates in agent order, as the Coordinator does
+    cells = codes * n + np.arange(n)
+    buy, sell, hold = np.bincount(cells.ravel(), weights=weighted.ravel(), minlength=3 * n).reshape(3, n)
+    sell_or_hold = np.maximum(sell, hold)
+    recommendation = np.where(buy >= sell_or_hold, BUY, np.where(sell >= hold, SELL, HOLD))
+    total = buy + sell + hold
+    best = np.maximum(buy, sell_or_hold)
+    confidence = np.divide(best, total, out=np.zeros(n), where=total > 0)
+    return recommendation, confidence
+
+
+def positions_from_signals(recommendation: np.ndarray) -> np.ndarray:
+    """
+    Long-only position per row: Buy opens (1), Sell closes (0), Hold keeps the previous position.
+    Implemented as a vectorized forward fill of the last Buy/Sell decision.
+    """
+    n = len(recommendation)
+    decided = recommendation != HOLD
+    idx = np.where(decided, np.arange(n), -1)
+    np.maximum.accumulate(idx, out=idx)
+    position = np.zeros(n)
+    has = idx >= 0
+    position[has] = (recommendation[idx[has]] == BUY).astype(float)
+    return position
+
+
+def performance_metrics(equity: np.ndarray, returns: np.ndarray, periods_per_year: int = TRADING_DAYS) -> dict:
+    """Computes ROI, max drawdown and annualized Sharpe ratio from an equity curve and its returns."""
+    if len(equity) == 0:
+        return {"roi": 0.0, "max_drawdown": 0.0, "sharpe": 0.0}
+    roi = equity[-1] / equity[0] - 1.0 if equity[0] else 0.0
+    peak = np.maximum.accumulate(equity)
+    max_drawdown = float(np.max((peak - equity) / peak)) if len(equity) else 0.0
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    sharpe = float(returns.mean() / std * np.sqrt(periods_per_year)) if std > 0 else 0.0
+    return {"roi": float(roi), "max_drawdown": max_drawdown, "sharpe": sharpe}
+
+
+def simulate(features: dict, weights: Optional[Dict[str, float]] = None,
+             thresholds: Optional[Dict[str, float]] = None, initial_capital: float = 10000.0,
+             transaction_cost: float = 0.0, cache: Optional[dict] = None) -> dict:
+    """
+    Core of run_backtest over prepared features (see prepare_features and signals_from_features).
+    Returns the per-row arrays (recommendation, confidence, position, returns, equity), the number
+    of trades, the agents replayed and the performance metrics.
+    """
+    if features["price"] is None:
+        raise ValueError("Historical data has no price column.")
+    signals = signals_from_features(features, thresholds, cache)
+    recommendation, confidence = weighted_vote(signals, weights)
+    position = positions_from_signals(recommendation)
+
+    held = np.concatenate(([0.0], position[:-1]))
+    turnover = np.abs(np.diff(held, prepend=0.0))
+    strategy_returns = held * features["returns"] - turnover * transaction_cost
+    equity = initial_capital * np.cumprod(1.0 + strategy_returns)
+    return {
+        "recommendation": recommendation,
+        "confidence": confidence,
+        "position": position,
+        "returns": strategy_returns,
+        "equity": equity,
+        "trades": int(np.count_nonzero(turnover)),
+        "agents": sorted(signals),
+        **performance_metrics(np.concatenate(([initial_capital], equity)), strategy_returns[1:]),
+    }
+
+
+def run_backtest(df: pd.DataFrame, weights: Optional[Dict[str, float]] = None,
+                 price_col: str = "gold_price_usd", initial_capital: float = 10000.0,
+                 transaction_cost: float = 0.0, thresholds: Optional[Dict[str, float]] = None) -> dict:
+    """
+    Backtests the agents' rules and the weighted vote over a historical DataFrame.
+    Decisions made on day t are applied to the return from t to t+1 (no look-ahead).
+    Args:
+        df (DataFrame): Historical data sorted by date with a price column and optional macro columns.
+        weights (dict, optional): Agent weights; defaults to the Coordinator's weights.
+        price_col (str): Column holding the gold price.
+        initial_capital (float): Starting equity.
+        transaction_cost (float): Proportional cost charged on each change in position.
+        thresholds (dict, optional): Rule thresholds overriding DEFAULT_THRESHOLDS.
+    Returns:
+        dict: equity_curve (DataFrame), roi, max_drawdown, sharpe, trades, and per-day recommendations.
+    """
+    if price_col not in df.columns:
+        raise ValueError(f"Historical data has no '{price_col}' column.")
+    features = prepare_features(df, price_col)
+    result = simulate(features, weights, thresholds, initial_capital, transaction_cost)
+
+    index = df["date"] if "date" in df.columns else pd.RangeIndex(len(df))
+    curve = pd.DataFrame({
+        "price": features["price"],
+        "recommendation": np.asarray(SIGNALS)[result["recommendation"]],
+        "confidence": result["confidence"],
+        "position": result["position"],
+        "return": result["returns"],
+        "equity": result["equity"],
+    }, index=pd.Index(index, name="date"))
+    return {
+        "equity_curve": curve,
+        "trades": result["trades"],
+        "agents": result["agents"],
+        "roi": result["roi"],
+        "max_drawdown": result["max_drawdown"],
+        "sharpe": result["sharpe"],
+    }
+
+
+def main(argv=None):
+    """
+    Runs a backtest on a historical CSV (or HistoryStore instrument directory) and prints the summary metrics.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    filepath = argv[0] if argv else "data/historical_data.csv"
+    df = load_historical_data(filepath)
+    if df is None:
+        sys.exit(1)
+    if "date" in df.columns:
+        df = df.sort_values("date").reset_index(drop=True)
+    # The frame was just loaded, so clean it in place rather than copying it
+    result = run_backtest(clean_data(df, copy=False))
+    print("\n=== Gold Strategy Backtest ===")
+    print(f"Agents replayed: {', '.join(result['agents'])}")
+    print(f"ROI: {result['roi']:.2%}")
+    print(f"Max drawdown: {result['max_drawdown']:.2%}")
+    print(f"Sharpe ratio: {result['sharpe']:.2f}")
+    print(f"Trades: {result['trades']}")
+
+
+if __name__ == "__main__":
+    main()
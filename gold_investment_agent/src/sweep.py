@@ -0,0 +1,220 @@
+# sweep.py
+# Purpose: Parameter sweep over the agents' rule thresholds and the Coordinator weights on historical
+# data. Every configuration is a backtest of the simulation (src/simulation.py); the result is a table
+# of configurations ranked by a performance metric.
+#
+# Parameters are the keys of simulation.DEFAULT_THRESHOLDS (e.g. rsi_overbought, cpi_high,
+# etf_holding, high_importance_events) and agent names, whose values are voting weights.
+# Configurations come from a full grid (grid) or random samples of value lists and ranges
+# (random_configs); parameters left out keep their defaults.
+#
+# Scaling:
+# - The history is loaded, cleaned and turned into features (price indicators, returns, input
+#   columns) once in the parent process; a process-pool initializer hands them to each worker, so
+#   workers never reload or recompute them.
+# - Inside a worker, each agent's signals are cached by the thresholds that agent reads, so
+#   configurations that differ only in other agents' thresholds or in weights reuse them.
+#   Configurations are sent in contiguous chunks to keep those cache hits within one worker.
+#
+# Usage:
+#   python -m src.sweep data/historical_data.csv --param rsi_overbought=65,70,75 --param cpi_high=2.5,3,3.5
+#   python -m src.sweep data/historical_data.csv --samples 20000 --param rsi_overbought=60:80 \
+#       --param TechnicalFactorsAgent=0:0.5 --workers 8 --top 20 --out sweep.csv
+
+import argparse
+import itertools
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from src.simulation import AGENT_RULES, DEFAULT_THRESHOLDS, DEFAULT_WEIGHTS, prepare_features, simulate
+from src.tools.data_tools import clean_data, load_historical_data
+
+METRICS = ("roi", "max_drawdown", "sharpe", "trades")
+
+# Per-worker bound on cached agent signals (each entry holds two arrays as long as the history)
+SIGNAL_CACHE_SIZE = 256
+
+# State installed in each worker process by _init_worker
+_FEATURES: Optional[dict] = None
+_OPTIONS: dict = {}
+_CACHE: dict = {}
+
+
+# Agents whose weight can be swept: only agents the simulation replays have votes to weight
+WEIGHT_PARAMETERS = tuple(agent for agent in DEFAULT_WEIGHTS if agent in AGENT_RULES)
+
+
+def _check_parameters(names: Iterable[str]) -> None:
+    unknown = sorted(set(names) - set(DEFAULT_THRESHOLDS) - set(WEIGHT_PARAMETERS))
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(unknown)}. Expected thresholds "
+                         f"({', '.join(DEFAULT_THRESHOLDS)}) or agent weights ({', '.join(WEIGHT_PARAMETERS)}).")
+
+
+def grid(space: Dict[str, Sequence]) -> List[dict]:
+    """
+    Every combination of the listed values, e.g. grid({"rsi_overbought": [65, 70], "cpi_high": [2.5, 3.0]}).
+    The last parameter varies fastest, so neighbouring configurations share the earlier ones.
+    """
+    _check_parameters(space)
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_configs(space: Dict[str, object], n: int, seed: int = 0) -> List[dict]:
+    """
+    n random configurations. A list of values is sampled uniformly; a (low, high) tuple is a uniform
+    range (integers for integer defaults such as high_importance_events).
+    """
+    _check_parameters(space)
+    rng = random.Random(seed)
+
+    def draw(name, values):
+        if isinstance(values, tuple):
+            low, high = values
+            if isinstance(DEFAULT_THRESHOLDS.get(name), int):
+                return rng.randint(int(low), int(high))
+            return rng.uniform(low, high)
+        return rng.choice(list(values))
+
+    configs = [{name: draw(name, values) for name, values in space.items()} for _ in range(n)]
+    # Sort so configurations sharing an agent's thresholds land in the same chunk
+    return sorted(configs, key=lambda c: tuple(c[name] for name in space))
+
+
+def _split(config: dict) -> tuple:
+    """Separates a flat configuration into (thresholds, weights)."""
+    thresholds = {k: v for k, v in config.items() if k in DEFAULT_THRESHOLDS}
+    weights = {**DEFAULT_WEIGHTS, **{k: v for k, v in config.items() if k in DEFAULT_WEIGHTS}}
+    return thresholds, weights
+
+
+def _init_worker(features: dict, options: dict) -> None:
+    global _FEATURES, _OPTIONS, _CACHE
+    _FEATURES, _OPTIONS, _CACHE = features, options, {}
+
+
+def _evaluate_chunk(configs: List[dict]) -> List[dict]:
+    rows = []
+    for config in configs:
+        if len(_CACHE) > SIGNAL_CACHE_SIZE:
+            _CACHE.clear()
+        thresholds, weights = _split(config)
+        result = simulate(_FEATURES, weights, thresholds, cache=_CACHE, **_OPTIONS)
+        rows.append({**config, **{m: result[m] for m in METRICS}})
+    return rows
+
+
+def run_sweep(features: dict, configs: List[dict], workers: Optional[int] = None,
+              chunksize: Optional[int] = None, sort_by: str = "sharpe", ascending: bool = False,
+              initial_capital: float = 10000.0, transaction_cost: float = 0.0) -> pd.DataFrame:
+    """
+    Backtests every configuration and returns them ranked by `sort_by`.
+    Args:
+        features (dict): Output of simulation.prepare_features for the history.
+        configs (list): Flat parameter dicts, e.g. from grid() or random_configs().
+        workers (int, optional): Worker processes (default: CPU count); 1 evaluates in this process.
+        chunksize (int, optional): Configurations per task (default: about 8 tasks per worker).
+        sort_by (str): Metric to rank by (roi, max_drawdown, sharpe or trades).
+        ascending (bool): Rank ascending (e.g. for max_drawdown).
+        initial_capital, transaction_cost: Passed to every backtest.
+    Returns:
+        DataFrame: One row per configuration with its parameters, metrics and rank (1 = best).
+    """
+    if sort_by not in METRICS:
+        raise ValueError(f"Cannot rank by '{sort_by}' (expected one of {', '.join(METRICS)}).")
+    for config in configs:
+        _check_parameters(config)
+    options = {"initial_capital": initial_capital, "transaction_cost": transaction_cost}
+    workers = workers or os.cpu_count() or 1
+    chunksize = chunksize or max(1, min(1000, -(-len(configs) // (workers * 8))))
+    chunks = [configs[i:i + chunksize] for i in range(0, len(configs), chunksize)]
+    if workers == 1 or len(chunks) <= 1:
+        _init_worker(features, options)
+        rows = [row for chunk in chunks for row in _evaluate_chunk(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(features, options)) as pool:
+            rows = [row for chunk_rows in pool.map(_evaluate_chunk, chunks) for row in chunk_rows]
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table = table.sort_values(sort_by, ascending=ascending, kind="stable").reset_index(drop=True)
+    table.insert(0, "rank", range(1, len(table) + 1))
+    return table
+
+
+def _parse_value(text: str):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_space(specs: Sequence[str]) -> Dict[str, object]:
+    """Parses --param values: name=v1,v2,... (a list) or name=low:high (a range, random sampling only)."""
+    space = {}
+    for spec in specs:
+        name, sep, values = spec.partition("=")
+        if not sep or not values:
+            raise ValueError(f"Invalid --param '{spec}' (expected name=v1,v2 or name=low:high).")
+        if ":" in values:
+            low, high = values.split(":", 1)
+            space[name] = (_parse_value(low), _parse_value(high))
+        else:
+            space[name] = [_parse_value(v) for v in values.split(",")]
+    return space
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep agent thresholds and weights over historical data")
+    parser.add_argument("filepath", help="Historical CSV file or history store instrument directory.")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUES",
+                        help="Parameter values: name=v1,v2,... or name=low:high (with --samples). Repeatable.")
+    parser.add_argument("--samples", type=int, help="Random configurations to draw instead of the full grid.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for --samples.")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count).")
+    parser.add_argument("--sort", default="sharpe", choices=METRICS, help="Metric to rank by.")
+    parser.add_argument("--ascending", action="store_true", help="Rank ascending (e.g. for max_drawdown).")
+    parser.add_argument("--transaction-cost", type=float, default=0.0, help="Cost per change in position.")
+    parser.add_argument("--top", type=int, default=20, help="Rows of the ranked table to print.")
+    parser.add_argument("--out", help="Write the full ranked table to this CSV file.")
+    args = parser.parse_args(argv)
+
+    try:
+        space = parse_space(args.param)
+        if args.samples:
+            configs = random_configs(space, args.samples, seed=args.seed)
+        elif any(isinstance(v, tuple) for v in space.values()):
+            raise ValueError("Ranges (low:high) need --samples.")
+        else:
+            configs = grid(space)
+    except ValueError as e:
+        parser.error(str(e))
+
+    df = load_historical_data(args.filepath)
+    if df is None:
+        sys.exit(1)
+    if "date" in df.columns:
+        df = df.sort_values("date").reset_index(drop=True)
+    features = prepare_features(clean_data(df, copy=False))
+    if features["price"] is None:
+        print("Historical data has no 'gold_price_usd' column.")
+        sys.exit(1)
+
+    print(f"Evaluating {len(configs)} configurations...")
+    table = run_sweep(features, configs, workers=args.workers, sort_by=args.sort, ascending=args.ascending,
+                      transaction_cost=args.transaction_cost)
+    print(table.head(args.top).to_string(index=False))
+    if args.out:
+        table.to_csv(args.out, index=False)
+        print(f"Wrote {len(table)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,152 @@
 # api_tools.py
 # Purpose: Provide functions and classes for accessing financial APIs (MetalpriceAPI, Metals-API, macroeconomic data, etc.)
 # Handles API requests, error handling, and rate limiting for agent modules.
+# Clients accept an optional DiskCache (src/tools/cache.py) so repeated quotes are served from disk.
+# All clients share one connection-pooled HTTPSession per provider, with a token-bucket rate limiter
+# and jittered exponential backoff on 429/5xx responses and connection errors.
+# Each request is timed under the "http" span (bytes received, failed requests) with retries counted
+# in the process-wide Metrics registry (src/tools/metrics.py).
 #
 # References:
 # - https://github.com/virattt/ai-hedge-fund/blob/main/src/tools/api.py
 # - https://github.com/virattt/ai-hedge-fund/blob/main/.env.example
 
 import os
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+import pandas as pd
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, Callable, Iterable, List, Union
+
+from src.tools.cache import DiskCache
+from src.tools.concurrency import fetch_all
+from src.tools.metrics import get_metrics
+
+# Requests per second and burst size allowed per provider (free-tier friendly defaults)
+PROVIDER_LIMITS = {
+    "metalpriceapi": (2.0, 5),
+    "metals-api": (1.0, 3),
+    "openrouter": (5.0, 10),
+}
+DEFAULT_LIMIT = (5.0, 10)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 class APIKeyError(Exception):
     """Custom exception for missing API keys."""
     pass
 
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+    Tokens refill continuously at `rate` per second up to `capacity`; acquire() blocks until one is available.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class HTTPSession:
+    """
+    Connection-pooled HTTP session for one API provider.
+    Reuses keep-alive connections, rate-limits outgoing requests with a TokenBucket, and retries
+    429/5xx responses and connection errors with full-jitter exponential backoff
+    (honouring Retry-After when the server sends it).
+    """
+
+    def __init__(self, rate: float = DEFAULT_LIMIT[0], burst: int = DEFAULT_LIMIT[1], max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0, pool_maxsize: int = 10,
+                 timeout: float = 10, name: str = "default"):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    return min(self.backoff_max, float(retry_after))
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None) -> requests.Response:
+        """
+        Sends a rate-limited GET with retries. Returns the final response (callers still check the status);
+        re-raises the last connection error if every attempt failed to connect.
+        """
+        return self.request("GET", url, params=params, timeout=timeout)
+
+    def post(self, url: str, json: Any = None, headers: Optional[Dict[str, str]] = None,
+             timeout: Optional[float] = None) -> requests.Response:
+        """Sends a rate-limited POST with a JSON body, with the same retries as get()."""
+        return self.request("POST", url, json=json, headers=headers, timeout=timeout)
+
+    def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """Sends a rate-limited request with retries; kwargs are passed to requests (params, json, headers)."""
+        metrics = get_metrics()
+        with metrics.span("http", provider=self.name) as span:
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    metrics.incr("http_retries", provider=self.name)
+                self.bucket.acquire()
+                try:
+                    response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt == self.max_retries:
+                        raise
+                    time.sleep(self._backoff(attempt))
+                    continue
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    time.sleep(self._backoff(attempt, response))
+                    continue
+                span.payload(rows=1, nbytes=len(response.content))
+                if response.status_code >= 400:
+                    span.fail()
+                return response
+
+    def close(self) -> None:
+        self.session.close()
+
+_sessions: Dict[str, HTTPSession] = {}
+_sessions_lock = threading.Lock()
+
+def get_session(provider: str) -> HTTPSession:
+    """
+    Returns the process-wide HTTPSession for a provider, creating it with PROVIDER_LIMITS on first use.
+    """
+    with _sessions_lock:
+        if provider not in _sessions:
+            rate, burst = PROVIDER_LIMITS.get(provider, DEFAULT_LIMIT)
+            _sessions[provider] = HTTPSession(rate=rate, burst=burst, name=provider)
+        return _sessions[provider]
+
 class MetalPriceAPIClient:
     """
     Client for MetalpriceAPI (https://metalpriceapi.com/)
@@ -21,42 +154,144 @@ class MetalPriceAPIClient:
     """
     BASE_URL = "https://api.metalpriceapi.com/v1/"
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[DiskCache] = None,
+                 session: Optional[HTTPSession] = None, base_url: Optional[str] = None):
+        """
+        Args:
+            api_key (str, optional): Defaults to METALPRICE_API_KEY.
+            cache (DiskCache, optional): Disk cache for responses.
+            session (HTTPSession, optional): Defaults to the shared "metalpriceapi" session.
+            base_url (str, optional): Overrides BASE_URL, e.g. to point at a local stub server.
+        """
         self.api_key = api_key or os.environ.get("METALPRICE_API_KEY")
         if not self.api_key:
             raise APIKeyError("METALPRICE_API_KEY is not set in environment variables.")
+        self.cache = cache
+        self.session = session or get_session("metalpriceapi")
+        self.base_url = base_url or self.BASE_URL
+
+    # Longest date range the timeframe endpoint accepts in one request
+    MAX_TIMEFRAME_DAYS = 365
+
+    def _cached(self, endpoint: str, params: Dict[str, Any], fetch: Callable[[], Any],
+                ttl: Optional[float] = None) -> Any:
+        """Serves a request through the disk cache when one is configured."""
+        if self.cache is None:
+            return fetch()
+        # Keep the API key out of the cache key
+        key = sorted((k, v) for k, v in params.items() if k != "api_key")
+        return self.cache.get_or_fetch(f"metalprice.{endpoint}", key, fetch, ttl=ttl)
 
     def get_gold_price(self, currency: str = "USD") -> Optional[float]:
         """
         Fetches the latest gold price in the specified currency.
         Returns the price as a float, or None if the request fails.
         """
-        endpoint = f"{self.BASE_URL}latest"
+        endpoint = f"{self.base_url}latest"
         params = {"api_key": self.api_key, "base": "XAU", "currencies": currency}
-        try:
-            response = requests.get(endpoint, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            return data["rates"].get(currency)
-        except Exception as e:
-            print(f"Error fetching gold price: {e}")
-            return None
+
+        def fetch():
+            try:
+                response = self.session.get(endpoint, params=params)
+                response.raise_for_status()
+                data = response.json()
+                return data["rates"].get(currency)
+            except Exception as e:
+                print(f"Error fetching gold price: {e}")
+                get_metrics().incr("api_errors", endpoint="metalprice.latest")
+                return None
+        return self._cached("latest", params, fetch)
 
     def get_currency_rate(self, base: str = "USD", target: str = "EUR") -> Optional[float]:
         """
         Fetches the latest exchange rate between two currencies.
         Returns the rate as a float, or None if the request fails.
         """
-        endpoint = f"{self.BASE_URL}latest"
+        endpoint = f"{self.base_url}latest"
         params = {"api_key": self.api_key, "base": base, "currencies": target}
-        try:
-            response = requests.get(endpoint, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            return data["rates"].get(target)
-        except Exception as e:
-            print(f"Error fetching currency rate: {e}")
-            return None
+
+        def fetch():
+            try:
+                response = self.session.get(endpoint, params=params)
+                response.raise_for_status()
+                data = response.json()
+                return data["rates"].get(target)
+            except Exception as e:
+                print(f"Error fetching currency rate: {e}")
+                get_metrics().incr("api_errors", endpoint="metalprice.latest")
+                return None
+        return self._cached("latest", params, fetch)
+
+    @staticmethod
+    def _date_chunks(start: date, end: date, max_days: int) -> List[tuple]:
+        """Splits [start, end] into consecutive inclusive ranges of at most max_days days."""
+        chunks = []
+        while start <= end:
+            chunk_end = min(end, start + timedelta(days=max_days - 1))
+            chunks.append((start, chunk_end))
+            start = chunk_end + timedelta(days=1)
+        return chunks
+
+    def get_timeframe(self, start_date: Union[str, date], end_date: Union[str, date],
+                      currencies: Iterable[str] = ("USD",), base: str = "XAU",
+                      max_days: Optional[int] = None) -> pd.DataFrame:
+        """
+        Fetches daily rates for many currencies over a date range using the timeframe endpoint.
+        Long ranges are split into chunks of at most MAX_TIMEFRAME_DAYS, one request each (fetched in
+        parallel, subject to the session's rate limit). Chunks that end before today are immutable
+        and cached permanently.
+        Returns a DataFrame sorted by a 'date' column (datetime64) with one column per currency,
+        named gold_price_<currency> for base XAU (matching data_tools) or <base>_<currency> otherwise.
+        Chunks that fail are reported and skipped.
+        """
+        start = pd.Timestamp(start_date).date()
+        end = pd.Timestamp(end_date).date()
+        currencies = [c.upper() for c in currencies]
+        today = datetime.now().date()
+        endpoint = f"{self.base_url}timeframe"
+
+        def chunk_fetcher(chunk_start: date, chunk_end: date):
+            params = {
+                "api_key": self.api_key,
+                "start_date": chunk_start.isoformat(),
+                "end_date": chunk_end.isoformat(),
+                "base": base,
+                "currencies": ",".join(currencies),
+            }
+
+            def fetch():
+                try:
+                    response = self.session.get(endpoint, params=params)
+                    response.raise_for_status()
+                    return response.json()["rates"]
+                except Exception as e:
+                    print(f"Error fetching {base} rates for {chunk_start}..{chunk_end}: {e}")
+                    get_metrics().incr("api_errors", endpoint="metalprice.timeframe")
+                    return None
+
+            ttl = float("inf") if chunk_end < today else None
+            return lambda: self._cached("timeframe", params, fetch, ttl=ttl)
+
+        chunks = self._date_chunks(start, end, max_days or self.MAX_TIMEFRAME_DAYS)
+        results = fetch_all({chunk: chunk_fetcher(*chunk) for chunk in chunks}, max_workers=4)
+
+        prefix = "gold_price" if base.upper() == "XAU" else base.lower()
+        columns = {c: f"{prefix}_{c.lower()}" for c in currencies}
+        rows = {}
+        for rates in results.values():
+            for day, values in (rates or {}).items():
+                rows[day] = {columns[c]: values.get(c) for c in currencies}
+        df = pd.DataFrame.from_dict(rows, orient="index", columns=list(columns.values()))
+        df.index = pd.to_datetime(df.index)
+        return df.sort_index().rename_axis("date").reset_index()
+
+    def get_gold_history(self, start_date: Union[str, date], end_date: Union[str, date],
+                         currencies: Iterable[str] = ("USD",)) -> pd.DataFrame:
+        """
+        Fetches the daily gold price (base XAU) in each currency over a date range.
+        A decade of history takes about ten requests. See get_timeframe.
+        """
+        return self.get_timeframe(start_date, end_date, currencies=currencies, base="XAU")
 
 class MacroDataAPIClient:
     """
@@ -65,10 +300,21 @@ class MacroDataAPIClient:
     """
     BASE_URL = "https://metals-api.com/api/"  # Example; replace with actual endpoint as needed
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[DiskCache] = None,
+                 session: Optional[HTTPSession] = None, base_url: Optional[str] = None):
+        """
+        Args:
+            api_key (str, optional): Defaults to METALS_API_KEY.
+            cache (DiskCache, optional): Disk cache for responses.
+            session (HTTPSession, optional): Defaults to the shared "metals-api" session.
+            base_url (str, optional): Overrides BASE_URL, e.g. to point at a local stub server.
+        """
         self.api_key = api_key or os.environ.get("METALS_API_KEY")
         if not self.api_key:
             raise APIKeyError("METALS_API_KEY is not set in environment variables.")
+        self.cache = cache
+        self.session = session or get_session("metals-api")
+        self.base_url = base_url or self.BASE_URL
 
     def get_indicator(self, indicator: str) -> Optional[Any]:
         """
@@ -76,16 +322,22 @@ class MacroDataAPIClient:
         Returns the value, or None if the request fails.
         """
         # This is a placeholder; actual implementation depends on the API's capabilities
-        endpoint = f"{self.BASE_URL}{indicator}"
+        endpoint = f"{self.base_url}{indicator}"
         params = {"access_key": self.api_key}
-        try:
-            response = requests.get(endpoint, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("value")
-        except Exception as e:
-            print(f"Error fetching macro indicator '{indicator}': {e}")
-            return None
+
+        def fetch():
+            try:
+                response = self.session.get(endpoint, params=params)
+                response.raise_for_status()
+                data = response.json()
+                return data.get("value")
+            except Exception as e:
+                print(f"Error fetching macro indicator '{indicator}': {e}")
+                get_metrics().incr("api_errors", endpoint="metals_api.indicator")
+                return None
+        if self.cache is None:
+            return fetch()
+        return self.cache.get_or_fetch("metals_api.indicator", indicator, fetch)
 
 def load_api_keys() -> Dict[str, str]:
     """
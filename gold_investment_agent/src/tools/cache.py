@@ -0,0 +1,343 @@
+# cache.py
+# Purpose: Persistent on-disk TTL cache for AKShare DataFrames and REST API responses.
+# Provides the "fallbacks (e.g., cached data)" required by the PRD and makes warm runs near-instant.
+#
+# Key Components:
+# - DiskCache: Stores DataFrames as Parquet (columnar) and scalar/JSON payloads as JSON files,
+#   with per-endpoint TTLs, size-bounded LRU eviction and stale-while-revalidate.
+# - get_disk_cache: Process-wide cache used by the shared data layer.
+#
+# Behaviour of get_or_fetch:
+# - fresh entry  -> returned from disk;
+# - stale entry  -> returned immediately while a background thread refreshes it;
+# - missing      -> fetched synchronously and stored (None results are never cached).
+# Each entry records a fingerprint of its value (see fingerprint()), so callers can tell whether a
+# refresh returned new data or the same data again.
+#
+# Configuration:
+# - GOLD_AGENT_CACHE_DIR: cache directory (default: data/cache)
+# - GOLD_AGENT_CACHE_MAX_MB: size bound for LRU eviction (default: 256)
+# - GOLD_AGENT_CACHE=0: disable the process-wide cache
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# Time-to-live (seconds) per endpoint, matched to how often each source publishes new data.
+DEFAULT_TTLS = {
+    # Macro series: monthly/yearly releases
+    "macro_usa_cpi_monthly": DAY,
+    "macro_usa_interest_rate": 6 * HOUR,
+    "macro_usa_gdp_yearly": 7 * DAY,
+    "macro_usa_unemployment_rate": DAY,
+    # Supply/demand: weekly to quarterly
+    "macro_usa_cme_merchant_goods_holding": 6 * HOUR,
+    "macro_world_gold_demand": 7 * DAY,
+    "macro_world_gold_reserves": 7 * DAY,
+    "macro_world_gold_production": 7 * DAY,
+    # Intraday and news feeds
+    "gold_spot_hist_sina": 5 * MINUTE,
+    "currency_latest": 5 * MINUTE,
+    "news_cctv": 10 * MINUTE,
+    "macro_info_ws": 30 * MINUTE,
+    "news_economic_baidu": 30 * MINUTE,
+    # REST clients in src/tools/api_tools.py
+    "metalprice.latest": MINUTE,
+    "metals_api.indicator": HOUR,
+    # LLM completions (src/tools/llm_client.py) are keyed on their full request, so they never go stale
+    "llm.chat": float("inf"),
+}
+DEFAULT_TTL = 15 * MINUTE
+
+
+def fingerprint(value: Any) -> str:
+    """
+    Content hash of a cached value: DataFrames are hashed on their columns, index and values,
+    other values on their JSON (or pickled) form. Equal data gives equal fingerprints.
+    """
+    digest = hashlib.sha1()
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(list(value.columns)).encode("utf-8"))
+        try:
+            digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        except TypeError:
+            # Unhashable cells (e.g. lists in object columns)
+            digest.update(pickle.dumps(value))
+    else:
+        try:
+            digest.update(json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        except (TypeError, ValueError):
+            digest.update(pickle.dumps(value))
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Disk-backed key/value cache with per-endpoint TTLs, LRU eviction and stale-while-revalidate.
+    Thread-safe within a process. Entries are keyed on the endpoint name plus the call arguments.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, root: str = "data/cache", max_bytes: int = 256 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None, default_ttl: float = DEFAULT_TTL):
+        """
+        Args:
+            root (str): Directory holding cached files and the index.
+            max_bytes (int): Total size bound; least recently used entries are evicted beyond it.
+            ttls (dict, optional): Per-endpoint TTLs in seconds, merged over DEFAULT_TTLS.
+            default_ttl (float): TTL for endpoints without an explicit entry.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        os.makedirs(self.root, exist_ok=True)
+        self._index = self._load_index()
+
+    # ---- public API -------------------------------------------------------------------------
+
+    def ttl_for(self, endpoint: str) -> float:
+        """Returns the TTL in seconds configured for an endpoint."""
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get_or_fetch(self, endpoint: str, params: Any, fetch: Callable[[], Any],
+                     ttl: Optional[float] = None, refresh: bool = False,
+                     stored_after: Optional[float] = None) -> Any:
+        """
+        Returns the cached value for (endpoint, params), fetching it if needed.
+        Args:
+            endpoint (str): Endpoint name, used for TTL lookup and invalidation.
+            params: Call arguments; any value with a stable repr().
+            fetch (callable): Zero-argument function performing the upstream call.
+            ttl (float, optional): Overrides the endpoint TTL. Use float("inf") for immutable data.
+            refresh (bool): Fetch synchronously regardless of freshness, falling back to the cached
+                value if the fetch raises or returns None.
+            stored_after (float, optional): Unix time before which a cached entry is outdated regardless
+                of its TTL; such an entry is refreshed as with `refresh`.
+        """
+        key = self._key(endpoint, params)
+        ttl = self.ttl_for(endpoint) if ttl is None else ttl
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is not None and stored_after is not None and entry["stored_at"] < stored_after:
+            refresh = True
+        if refresh:
+            try:
+                value = fetch()
+            except Exception:
+                value = None
+                if entry is None:
+                    raise
+            if value is not None:
+                self._store(key, endpoint, value)
+                return value
+            cached = self._read(entry) if entry is not None else None
+            return cached
+        if entry is not None:
+            value = self._read(entry)
+            if value is not None:
+                now = time.time()
+                fresh = now - entry["stored_at"] <= ttl
+                with self._lock:
+                    entry["last_access"] = now
+                    if fresh:
+                        self.hits += 1
+                    else:
+                        self.stale_hits += 1
+                if not fresh:
+                    self._refresh_in_background(key, endpoint, fetch)
+                return value
+        with self._lock:
+            self.misses += 1
+        value = fetch()
+        self._store(key, endpoint, value)
+        return value
+
+    def fingerprint(self, endpoint: str, params: Any) -> Optional[str]:
+        """Returns the fingerprint of the cached value for (endpoint, params), or None if there is none."""
+        with self._lock:
+            entry = self._index.get(self._key(endpoint, params))
+            return entry.get("fingerprint") if entry is not None else None
+
+    def invalidate(self, endpoint: Optional[str] = None) -> int:
+        """
+        Removes all entries for an endpoint (or every entry when endpoint is None).
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            keys = [k for k, e in self._index.items() if endpoint is None or e["endpoint"] == endpoint]
+            for key in keys:
+                self._remove(key)
+            self._save_index()
+        return len(keys)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            size = sum(e["size"] for e in self._index.values())
+            entries = len(self._index)
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    # ---- internals --------------------------------------------------------------------------
+
+    @staticmethod
+    def _key(endpoint: str, params: Any) -> str:
+        digest = hashlib.sha1(repr(params).encode("utf-8")).hexdigest()[:16]
+        return f"{endpoint}-{digest}"
+
+    def _refresh_in_background(self, key: str, endpoint: str, fetch: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(key, endpoint, fetch())
+                with self._lock:
+                    self.refreshes += 1
+            except Exception as e:
+                print(f"Background refresh of '{endpoint}' failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"cache-refresh-{endpoint}", daemon=True).start()
+
+    def _store(self, key: str, endpoint: str, value: Any) -> None:
+        if value is None:
+            return
+        path_base = os.path.join(self.root, key)
+        tmp = f"{path_base}.{threading.get_ident()}.tmp"
+        try:
+            if isinstance(value, pd.DataFrame):
+                try:
+                    fmt, path = "parquet", path_base + ".parquet"
+                    value.to_parquet(tmp)
+                except Exception:
+                    # Mixed-type object columns cannot always be written as Parquet
+                    fmt, path = "pickle", path_base + ".pkl"
+                    value.to_pickle(tmp)
+            else:
+                try:
+                    fmt, path = "json", path_base + ".json"
+                    payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
+                except (TypeError, ValueError):
+                    fmt, path = "pickle", path_base + ".pkl"
+                    payload = pickle.dumps(value)
+                with open(tmp, "wb") as f:
+                    f.write(payload)
+            os.replace(tmp, path)
+            digest = fingerprint(value)
+        except Exception as e:
+            print(f"Error caching '{endpoint}': {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            old = self._index.get(key)
+            if old is not None and old["file"] != os.path.basename(path):
+                self._remove(key)
+            self._index[key] = {
+                "endpoint": endpoint,
+                "file": os.path.basename(path),
+                "format": fmt,
+                "stored_at": now,
+                "last_access": now,
+                "size": os.path.getsize(path),
+                "fingerprint": digest,
+            }
+            self._evict()
+            self._save_index()
+
+    def _read(self, entry: Dict[str, Any]) -> Any:
+        path = os.path.join(self.root, entry["file"])
+        try:
+            if entry["format"] == "parquet":
+                return pd.read_parquet(path)
+            if entry["format"] == "json":
+                with open(path, encoding="utf-8") as f:
+                    return json.load(f)
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _evict(self) -> None:
+        """Drops least recently used entries until the cache fits in max_bytes. Caller holds the lock."""
+        total = sum(e["size"] for e in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self._index, key=lambda k: self._index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._index[key]["size"]
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        """Deletes an entry and its file. Caller holds the lock."""
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            try:
+                os.remove(os.path.join(self.root, entry["file"]))
+            except OSError:
+                pass
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        path = os.path.join(self.root, self.INDEX_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        """Atomically rewrites the index. Caller holds the lock."""
+        path = os.path.join(self.root, self.INDEX_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(path + ".tmp", path)
+
+
+_default_cache: Optional[DiskCache] = None
+_default_lock = threading.Lock()
+
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """
+    Returns the process-wide DiskCache, or None if caching is disabled with GOLD_AGENT_CACHE=0.
+    """
+    global _default_cache
+    if os.environ.get("GOLD_AGENT_CACHE", "1") == "0":
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DiskCache(
+                root=os.environ.get("GOLD_AGENT_CACHE_DIR", "data/cache"),
+                max_bytes=int(float(os.environ.get("GOLD_AGENT_CACHE_MAX_MB", "256")) * 1024 * 1024),
+            )
+        return _default_cache
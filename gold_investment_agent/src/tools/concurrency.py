@@ -0,0 +1,20 @@
+# concurrency.py
+# Purpose: Small helpers for running independent, I/O-bound fetches in parallel.
+# Used by agents that make several upstream calls per analysis so that an agent
+# takes as long as its slowest fetch rather than the sum of all of them.
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+def fetch_all(calls: Dict[str, Callable[[], Any]], max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Runs each zero-argument callable in `calls` on a thread pool and returns their results by key.
+    The first exception raised by any call (in key order) is re-raised once all calls have finished,
+    matching the behaviour of calling them one after another inside a single try block.
+    """
+    if not calls:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(calls), thread_name_prefix="fetch") as executor:
+        futures = {key: executor.submit(fn) for key, fn in calls.items()}
+    return {key: future.result() for key, future in futures.items()}
@@ -0,0 +1,283 @@
+# data_access.py
+# Purpose: Shared data-access layer that every agent goes through to reach AKShare.
+# Requests for the same endpoint and arguments are coalesced into a single upstream fetch:
+# - concurrent callers wait on the one in-flight request and share its result (single-flight);
+# - within an analysis run, repeated callers reuse the result that was already fetched.
+# The layer counts requests and upstream calls so each run can report how many calls were saved.
+# Upstream calls go through the persistent disk cache (src/tools/cache.py) when one is configured.
+# AKShare itself is imported lazily on the first upstream fetch, so importing agents stays cheap.
+# Every fetch is timed under the "fetch" span and every upstream call under "upstream" (with rows and
+# bytes received); requests answered by the run memo, an in-flight call or the disk cache are counted.
+# Forced refreshes (force_refresh) record whether upstream answered and whether the answer differed
+# from the previously cached value, so callers can tell a new release from a repeat of the old one.
+#
+# Usage:
+#   data = get_data_layer()
+#   with data.run():
+#       df = data.fetch("macro_usa_cpi_monthly")
+#   print(data.stats())
+#
+# Note:
+#   - Results are shared between agents; callers must treat returned DataFrames as read-only.
+
+import importlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Optional, Set
+
+from src.tools.cache import DiskCache, fingerprint, get_disk_cache
+from src.tools.metrics import Metrics, get_metrics
+
+
+class _Call:
+    """An in-flight upstream fetch that other callers can wait on."""
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _freeze(value: Any) -> Hashable:
+    """Turns call arguments into a hashable key component."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class DataLayer:
+    """
+    Single-flight, per-run memoizing access to AKShare endpoints.
+    Outside of a run, only concurrent in-flight requests are coalesced; inside a run
+    (see run()), completed results are also reused until the last active run ends.
+    """
+
+    def __init__(self, backend: Any = None, cache: Optional[DiskCache] = None,
+                 metrics: Optional[Metrics] = None):
+        """
+        Args:
+            backend: Object exposing the AKShare functions by name. Defaults to the akshare module,
+                imported on first use.
+            cache (DiskCache, optional): Persistent cache consulted before calling the backend.
+            metrics (Metrics, optional): Recorder used outside of runs. Defaults to the process-wide registry.
+        """
+        self._backend = backend
+        self.cache = cache
+        self.default_metrics = metrics if metrics is not None else get_metrics()
+        self.metrics = self.default_metrics
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._results: Dict[Hashable, Any] = {}
+        self._active_runs = 0
+        self._requests = 0
+        self._upstream_calls = 0
+        self._force = set()
+        self._refreshed: Dict[str, bool] = {}  # forced endpoint -> every forced fetch got an upstream answer
+        self._changed: Dict[str, bool] = {}    # forced endpoint -> some forced fetch got different data
+        self._fingerprints: Dict[Hashable, str] = {}  # forced key -> fingerprint of its last value (no cache)
+
+    @property
+    def backend(self) -> Any:
+        """The AKShare backend; the akshare module is imported the first time it is needed."""
+        if self._backend is None:
+            self._backend = importlib.import_module("akshare")
+        return self._backend
+
+    @contextmanager
+    def run(self, metrics: Optional[Metrics] = None):
+        """
+        Scopes an analysis run. Counters are reset when the first run starts and completed
+        results are dropped when the last active run ends, so later runs see fresh data.
+        `metrics` (e.g. a per-run Metrics) records the run's fetches; overlapping runs share the
+        recorder of the run that started first.
+        """
+        with self._lock:
+            if self._active_runs == 0:
+                self._results.clear()
+                self._requests = 0
+                self._upstream_calls = 0
+                if metrics is not None:
+                    self.metrics = metrics
+            self._active_runs += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._active_runs -= 1
+                if self._active_runs == 0:
+                    self._results.clear()
+                    self._force.clear()
+                    self.metrics = self.default_metrics
+
+    def force_refresh(self, endpoints) -> None:
+        """
+        Makes the next run (or the current one) bypass the disk cache's freshness check for these
+        endpoints, so newly released data is fetched; cached values remain the fallback on failure.
+        Use refreshed() and changed() afterwards to see which endpoints were fetched and which of
+        them actually received new data.
+        """
+        endpoints = list(endpoints)
+        with self._lock:
+            self._force.update(endpoints)
+            for endpoint in endpoints:
+                self._refreshed.pop(endpoint, None)
+                self._changed.pop(endpoint, None)
+
+    def refreshed(self, endpoints) -> Set[str]:
+        """
+        Returns the endpoints among `endpoints` that were fetched from upstream since they were last
+        passed to force_refresh(), with every forced fetch succeeding. Endpoints whose refresh raised or
+        returned None (and fell back to the cached value), or that were not fetched at all, are left out.
+        """
+        with self._lock:
+            return {endpoint for endpoint in endpoints if self._refreshed.get(endpoint)}
+
+    def changed(self, endpoints) -> Set[str]:
+        """
+        Returns the endpoints among `endpoints` whose forced fetches (since they were last passed to
+        force_refresh()) returned data that differs from the value cached before, e.g. a new release.
+        An endpoint that returned the same data again, as when the publisher has not released yet,
+        is left out.
+        """
+        with self._lock:
+            return {endpoint for endpoint in endpoints if self._changed.get(endpoint)}
+
+    def fetch(self, endpoint: str, *args, **kwargs) -> Any:
+        """
+        Calls the named AKShare endpoint, coalescing identical concurrent or repeated requests.
+        Exceptions raised by the upstream call propagate to every caller waiting on it and
+        are never memoized.
+        """
+        return self._fetch(endpoint, args, kwargs)
+
+    def fetch_immutable(self, endpoint: str, *args, stored_after: Optional[float] = None, **kwargs) -> Any:
+        """
+        Like fetch(), for data that no longer changes (e.g. a past day's events): the disk cache keeps
+        it without expiry and force_refresh() does not apply. A cached value stored before
+        `stored_after` (a Unix timestamp, e.g. the end of that day) may be incomplete and is
+        re-fetched once.
+        """
+        return self._fetch(endpoint, args, kwargs, immutable=True, stored_after=stored_after)
+
+    def _fetch(self, endpoint: str, args: tuple, kwargs: dict, immutable: bool = False,
+               stored_after: Optional[float] = None) -> Any:
+        key = (endpoint, _freeze(args), _freeze(kwargs))
+        metrics = self.metrics
+        with self._lock:
+            self._requests += 1
+            if key in self._results:
+                memoized = True
+                result = self._results[key]
+            else:
+                memoized = False
+                call = self._inflight.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._inflight[key] = call
+                    self._upstream_calls += 1
+        if memoized:
+            metrics.incr("fetch_memo_hits", endpoint=endpoint)
+            return result
+
+        if not leader:
+            metrics.incr("fetch_coalesced", endpoint=endpoint)
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        called = False
+        received = False
+        changed = False
+        caller = threading.get_ident()
+        forced = not immutable and endpoint in self._force
+        if forced:
+            # The value a new release has to differ from
+            previous = self.cache.fingerprint(endpoint, key[1:]) if self.cache is not None \
+                else self._fingerprints.get(key)
+
+        def upstream():
+            nonlocal called, received, changed
+            # A stale cache hit refreshes on a background thread; that still counts as a hit
+            on_caller = threading.get_ident() == caller
+            if on_caller:
+                called = True
+            with metrics.span("upstream", endpoint=endpoint) as span:
+                value = getattr(self.backend, endpoint)(*args, **kwargs)
+                span.payload(value)
+            if on_caller:
+                received = value is not None
+                if forced and received:
+                    digest = fingerprint(value)
+                    changed = digest != previous
+                    if self.cache is None:
+                        self._fingerprints[key] = digest
+            return value
+
+        try:
+            with metrics.span("fetch", endpoint=endpoint):
+                if self.cache is not None:
+                    if immutable:
+                        call.result = self.cache.get_or_fetch(endpoint, key[1:], upstream, ttl=float("inf"),
+                                                              stored_after=stored_after)
+                    else:
+                        call.result = self.cache.get_or_fetch(endpoint, key[1:], upstream,
+                                                              refresh=forced)
+                    if not called:
+                        metrics.incr("cache_hits", endpoint=endpoint)
+                else:
+                    call.result = upstream()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if call.error is None and self._active_runs > 0:
+                    self._results[key] = call.result
+                if forced:
+                    self._refreshed[endpoint] = self._refreshed.get(endpoint, True) and received \
+                        and call.error is None
+                    self._changed[endpoint] = self._changed.get(endpoint, False) or changed
+            call.event.set()
+        return call.result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns request counters for the current (or most recent) run:
+        requests made by agents, upstream calls actually issued, and calls saved by coalescing.
+        When a disk cache is attached, its counters are included under "cache".
+        Timings are reported separately through the Metrics recorder.
+        """
+        with self._lock:
+            stats = {
+                "requests": self._requests,
+                "upstream_calls": self._upstream_calls,
+                "saved_calls": self._requests - self._upstream_calls,
+            }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+
+_default_layer: Optional[DataLayer] = None
+_default_lock = threading.Lock()
+
+
+def get_data_layer() -> DataLayer:
+    """
+    Returns the process-wide DataLayer shared by all agents and the Coordinator.
+    """
+    global _default_layer
+    with _default_lock:
+        if _default_layer is None:
+            _default_layer = DataLayer(cache=get_disk_cache())
+        return _default_layer
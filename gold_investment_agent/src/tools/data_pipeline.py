@@ -0,0 +1,167 @@
+# data_pipeline.py
+# Purpose: Chunked, generator-based load -> clean -> indicators pipeline for histories that don't fit
+# in memory. Produces the same rows as
+#   add_technical_indicators(clean_data(load_historical_data(path)))
+# while holding only about one chunk at a time.
+#
+# State carried across chunk boundaries:
+# - ChunkedCleaner: the last valid value of every column (forward fill). Backward fill only
+#   affects leading missing values, so the first rows are held back until every column has
+#   produced a valid value (a column that is missing for a long prefix delays output accordingly).
+# - ChunkedIndicators: the last INDICATOR_LOOKBACK prices, so the rolling means and RSI of the
+#   first rows of a chunk see the same windows as the in-memory computation.
+#
+# Usage:
+#   for chunk in stream_historical_data("data/history/XAUUSD", chunksize=250_000):
+#       ...  # chunk has the cleaned columns plus ma_20, ma_50 and rsi_14
+
+import os
+from typing import Any, Iterable, Iterator, Optional
+
+import pandas as pd
+
+from src.tools.data_tools import INDICATOR_LOOKBACK, technical_indicator_columns
+from src.tools.history_store import HistoryStore, is_store_path
+
+PRICE_COLUMN = 'gold_price_usd'
+
+
+def iter_historical_chunks(filepath: str, chunksize: int = 100_000, columns: Optional[Iterable[str]] = None,
+                           start: Any = None, end: Any = None) -> Iterator[pd.DataFrame]:
+    """
+    Yields a CSV file or a HistoryStore instrument directory in chunks of at most `chunksize` rows,
+    with the same column projection and inclusive date bounds as load_historical_data.
+    Chunks carry a continuous RangeIndex, as a single in-memory load would.
+    """
+    if is_store_path(filepath):
+        root, instrument = os.path.split(os.path.normpath(filepath))
+        yield from HistoryStore(root).iter_chunks(instrument, columns=columns, start=start, end=end,
+                                                  chunksize=chunksize)
+        return
+    usecols = None
+    if columns is not None:
+        wanted = {'date', *columns}
+        usecols = lambda name: name in wanted
+    offset = 0
+    for chunk in pd.read_csv(filepath, comment='#', usecols=usecols, chunksize=chunksize):
+        if (start is not None or end is not None) and 'date' in chunk.columns:
+            dates = pd.to_datetime(chunk['date'])
+            mask = pd.Series(True, index=chunk.index)
+            if start is not None:
+                mask &= dates >= pd.Timestamp(start)
+            if end is not None:
+                mask &= dates <= pd.Timestamp(end)
+            chunk = chunk[mask]
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        if len(chunk):
+            yield chunk
+
+
+class ChunkedCleaner:
+    """
+    Streaming equivalent of clean_data: forward fill, then backward fill, then clip the gold price.
+    process() returns the rows that are final so far (possibly none); finish() returns the rest.
+    """
+
+    def __init__(self):
+        self._last = {}       # column -> last valid value seen
+        self._pending = []    # chunks held back until every column has a valid value
+        self._ready = False
+
+    def _forward_fill(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        for col in chunk.columns:
+            values = chunk[col]
+            if values.hasnans:
+                if col in self._last and pd.isna(values.iloc[0]):
+                    values = values.copy()
+                    values.iloc[0] = self._last[col]
+                values = values.ffill()
+                chunk[col] = values
+            # After the carried-over fill, the last value is only missing if none was ever valid
+            if pd.notna(values.iloc[-1]):
+                self._last[col] = values.iloc[-1]
+        return chunk
+
+    @staticmethod
+    def _finalize(chunk: pd.DataFrame) -> pd.DataFrame:
+        for col in chunk.columns:
+            if chunk[col].hasnans:
+                chunk[col] = chunk[col].bfill()
+        if PRICE_COLUMN in chunk.columns and (chunk[PRICE_COLUMN] < 0).any():
+            chunk[PRICE_COLUMN] = chunk[PRICE_COLUMN].clip(lower=0)
+        return chunk
+
+    def process(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Cleans one chunk. The chunk is modified (columns replaced) and must not be reused."""
+        chunk = self._forward_fill(chunk)
+        if self._ready:
+            return self._finalize(chunk)
+        self._pending.append(chunk)
+        if any(col not in self._last for col in chunk.columns):
+            return chunk.iloc[0:0]
+        # Every column now has a value: the held-back prefix can be backward filled and released
+        self._ready = True
+        held, self._pending = pd.concat(self._pending), []
+        return self._finalize(held)
+
+    def finish(self) -> pd.DataFrame:
+        """Returns rows still held back at the end of the data (columns that were never valid stay NaN)."""
+        if not self._pending:
+            return pd.DataFrame()
+        held, self._pending = pd.concat(self._pending), []
+        return self._finalize(held)
+
+
+class ChunkedIndicators:
+    """
+    Streaming equivalent of add_technical_indicators. Keeps the last INDICATOR_LOOKBACK prices
+    so every chunk is computed with the same look-back windows as the full series.
+    """
+
+    def __init__(self):
+        self._tail = pd.Series(dtype='float64')
+
+    def process(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Adds ma_20, ma_50 and rsi_14 to the chunk in place and returns it."""
+        if PRICE_COLUMN not in chunk.columns or chunk.empty:
+            return chunk
+        price = chunk[PRICE_COLUMN]
+        history = pd.concat([self._tail, price], ignore_index=True) if len(self._tail) else \
+            price.reset_index(drop=True)
+        skip = len(history) - len(price)
+        for name, values in technical_indicator_columns(history).items():
+            chunk[name] = values.to_numpy()[skip:]
+        self._tail = history.iloc[-INDICATOR_LOOKBACK:]
+        return chunk
+
+
+def stream_pipeline(chunks: Iterable[pd.DataFrame], clean: bool = True,
+                    indicators: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Runs chunks through ChunkedCleaner and ChunkedIndicators, yielding non-empty output chunks.
+    Concatenating the output equals the in-memory clean_data / add_technical_indicators result
+    (rolling sums may differ in the last floating-point digits).
+    """
+    cleaner = ChunkedCleaner() if clean else None
+    calculator = ChunkedIndicators() if indicators else None
+
+    def cleaned():
+        for chunk in chunks:
+            yield cleaner.process(chunk) if cleaner is not None else chunk
+        if cleaner is not None:
+            yield cleaner.finish()
+
+    for chunk in cleaned():
+        if len(chunk):
+            yield calculator.process(chunk) if calculator is not None else chunk
+
+
+def stream_historical_data(filepath: str, chunksize: int = 100_000, columns: Optional[Iterable[str]] = None,
+                           start: Any = None, end: Any = None, clean: bool = True,
+                           indicators: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Loads, cleans and adds indicators to a CSV or HistoryStore instrument chunk by chunk.
+    """
+    return stream_pipeline(iter_historical_chunks(filepath, chunksize, columns, start, end),
+                           clean=clean, indicators=indicators)
@@ -1,6 +1,10 @@
 # data_tools.py
 # Purpose: Provide utilities for loading, cleaning, and preprocessing historical datasets for gold and macroeconomic data.
 # Used by agents and simulation modules for offline and fallback analysis.
+# Large histories are best kept in the memory-mapped columnar store (src/tools/history_store.py):
+# load_historical_data reads a store instrument directory with column projection and a date range,
+# and clean_data/add_technical_indicators accept copy=False to work on a freshly loaded frame in place.
+# Indicator columns come from the shared NumPy engine in src/tools/indicators.py.
 #
 # References:
 # - https://github.com/virattt/ai-hedge-fund/blob/main/src/tools/api.py
@@ -8,64 +12,234 @@
 import pandas as pd
 import numpy as np
 import os
-from typing import Optional
+from typing import Any, Iterable, Optional
 
+from src.tools.history_store import HistoryStore, is_store_path
+from src.tools.indicators import compute_indicators
 
-def load_historical_data(filepath: str) -> Optional[pd.DataFrame]:
+
+def load_historical_data(filepath: str, columns: Optional[Iterable[str]] = None,
+                         start: Any = None, end: Any = None) -> Optional[pd.DataFrame]:
     """
-    Loads historical data from a CSV file into a pandas DataFrame.
-    Returns None if the file does not exist or cannot be loaded.
+    Loads historical data into a pandas DataFrame, either from a CSV file or from an instrument
+    directory of a HistoryStore (e.g. data/history/XAUUSD).
+    Args:
+        filepath (str): CSV file or store instrument directory.
+        columns (iterable, optional): Columns to load besides 'date' (default: all).
+        start, end (optional): Inclusive date bounds on the 'date' column.
+    Store reads only touch the requested columns and date range and are backed by memory-mapped
+    files (read-only; the functions below replace columns rather than writing into them).
+    Returns None if the path does not exist or cannot be loaded.
     """
     if not os.path.exists(filepath):
         print(f"File not found: {filepath}")
         return None
     try:
-        df = pd.read_csv(filepath, comment='#')
+        if is_store_path(filepath):
+            root, instrument = os.path.split(os.path.normpath(filepath))
+            return HistoryStore(root).read(instrument, columns=columns, start=start, end=end)
+        usecols = None
+        if columns is not None:
+            wanted = {'date', *columns}
+            usecols = lambda name: name in wanted
+        df = pd.read_csv(filepath, comment='#', usecols=usecols)
+        if (start is not None or end is not None) and 'date' in df.columns:
+            dates = pd.to_datetime(df['date'])
+            mask = pd.Series(True, index=df.index)
+            if start is not None:
+                mask &= dates >= pd.Timestamp(start)
+            if end is not None:
+                mask &= dates <= pd.Timestamp(end)
+            df = df[mask].reset_index(drop=True)
         return df
     except Exception as e:
         print(f"Error loading data from {filepath}: {e}")
         return None
 
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+def clean_data(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Cleans the input DataFrame by handling missing values and outliers.
     - Fills missing values with forward fill, then backward fill.
     - Optionally, clips outliers (can be customized).
+    Only columns that need changes are rewritten. With copy=False the columns of `df` itself are
+    replaced instead of cleaning a full copy.
     Returns the cleaned DataFrame.
     """
-    df = df.copy()
-    df = df.fillna(method='ffill').fillna(method='bfill')
+    if copy:
+        df = df.copy()
+    for col in df.columns:
+        if df[col].hasnans:
+            df[col] = df[col].ffill().bfill()
     # Example: clip gold price to reasonable range (customize as needed)
-    if 'gold_price_usd' in df.columns:
+    if 'gold_price_usd' in df.columns and (df['gold_price_usd'] < 0).any():
         df['gold_price_usd'] = df['gold_price_usd'].clip(lower=0)
     return df
 
 
-def merge_macro_and_gold(gold_df: pd.DataFrame, macro_df: pd.DataFrame) -> pd.DataFrame:
+def merge_macro_and_gold(gold_df: pd.DataFrame, macro_df: pd.DataFrame, asof: bool = False,
+                         lag: Any = None, presorted: bool = False) -> pd.DataFrame:
     """
     Merges gold price data and macroeconomic data on the 'date' column.
+    By default this is an outer merge (one row per date of either input). With asof=True the result
+    keeps exactly the gold rows and attaches the latest macro values published by each bar's date;
+    see align_macro_to_gold for `lag` and `presorted`.
     Returns the merged DataFrame.
     """
+    if asof:
+        return align_macro_to_gold(gold_df, macro_df, lag=lag, presorted=presorted)
     merged = pd.merge(gold_df, macro_df, on='date', how='outer', suffixes=('_gold', '_macro'))
     merged = merged.sort_values('date').reset_index(drop=True)
     return merged
 
 
-def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
+def _datetime_ns(values) -> np.ndarray:
+    """Converts dates to an int64 array of nanoseconds for binary search."""
+    return pd.to_datetime(values).to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def _lag_ns(lag: Any) -> int:
+    return int(pd.Timedelta(lag).value) if lag is not None else 0
+
+
+class MacroAligner:
+    """
+    Mixed-frequency as-of alignment of macro series onto price bars.
+    Each macro observation dated d becomes known at d + lag (its publication lag), and every bar
+    receives, per macro column, the latest value already known at the bar's date (NaN before the
+    first one). Macro columns are aligned independently, so missing values in one series never
+    hide older values of that series.
+
+    The aligner keeps the macro series as sorted arrays: align() only touches the bars it is given,
+    so new bars are aligned without re-merging the history, and update_macro() appends new releases.
+    """
+
+    def __init__(self, macro_df: Optional[pd.DataFrame] = None, lag: Any = None, date_col: str = 'date'):
+        """
+        Args:
+            macro_df (DataFrame, optional): Macro observations with a date column and one column per series.
+            lag: Publication lag as a Timedelta-like value (e.g. "14D") applied to every series, or a
+                dict {column: lag}; columns missing from the dict have no lag.
+            date_col (str): Name of the date column in the macro and price frames.
+        """
+        self.lag = lag
+        self.date_col = date_col
+        self._series: dict = {}  # column -> (known_at ns array, values array)
+        if macro_df is not None:
+            self.update_macro(macro_df)
+
+    @property
+    def columns(self) -> list:
+        return list(self._series)
+
+    def _lag_for(self, column: str) -> int:
+        if isinstance(self.lag, dict):
+            return _lag_ns(self.lag.get(column))
+        return _lag_ns(self.lag)
+
+    def update_macro(self, macro_df: pd.DataFrame) -> None:
+        """
+        Adds macro observations. Rows are expected in date order after those already added; older
+        rows are merged in with a sort of that series only.
+        """
+        if macro_df is None or macro_df.empty:
+            return
+        dates = _datetime_ns(macro_df[self.date_col])
+        for column in macro_df.columns:
+            if column == self.date_col:
+                continue
+            values = macro_df[column].to_numpy()
+            if values.dtype.kind in 'iub':
+                # Float so bars before the first release can hold NaN
+                values = values.astype('float64')
+            present = ~pd.isna(values)
+            known_at = dates[present] + self._lag_for(column)
+            values = values[present]
+            if column in self._series:
+                old_known, old_values = self._series[column]
+                known_at = np.concatenate([old_known, known_at])
+                values = np.concatenate([old_values, values])
+            if len(known_at) > 1 and (np.diff(known_at) < 0).any():
+                order = np.argsort(known_at, kind='stable')
+                known_at, values = known_at[order], values[order]
+            self._series[column] = (known_at, values)
+
+    def values_at(self, dates) -> dict:
+        """Returns {column: array} of the latest known value of each series at each date."""
+        when = _datetime_ns(dates)
+        out = {}
+        for column, (known_at, values) in self._series.items():
+            if not len(values):
+                out[column] = np.full(len(when), np.nan)
+                continue
+            idx = np.searchsorted(known_at, when, side='right') - 1
+            aligned = values[np.maximum(idx, 0)]
+            unknown = idx < 0
+            if unknown.any():
+                if aligned.dtype.kind == 'M':
+                    aligned[unknown] = np.datetime64('NaT')
+                elif aligned.dtype.kind == 'f':
+                    aligned[unknown] = np.nan
+                else:
+                    aligned = aligned.astype(object)
+                    aligned[unknown] = None
+            out[column] = aligned
+        return out
+
+    def align(self, gold_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns `gold_df` with the aligned macro columns added (columns that clash with gold columns
+        get a '_macro' suffix). The input frame is not modified.
+        """
+        aligned = self.values_at(gold_df[self.date_col])
+        extra = {(f'{c}_macro' if c in gold_df.columns else c): v for c, v in aligned.items()}
+        return gold_df.assign(**extra)
+
+
+def align_macro_to_gold(gold_df: pd.DataFrame, macro_df: pd.DataFrame, lag: Any = None,
+                        presorted: bool = False) -> pd.DataFrame:
+    """
+    As-of joins macro series onto gold bars: each bar gets the latest macro value published by its
+    date, respecting the publication `lag` (Timedelta-like, or {column: lag}). Unlike the outer merge
+    this keeps one row per gold bar and never creates all-NaN filler rows.
+    Set presorted=True when gold_df is already sorted by date to skip the sort.
+    """
+    if not presorted and not gold_df['date'].is_monotonic_increasing:
+        gold_df = gold_df.sort_values('date', kind='stable').reset_index(drop=True)
+    return MacroAligner(macro_df, lag=lag).align(gold_df)
+
+
+# Indicator columns added by add_technical_indicators (RSI with simple averages, as originally written)
+INDICATOR_SPEC = {
+    'ma_20': ('sma', 20),
+    'ma_50': ('sma', 50),
+    'rsi_14': ('rsi', 14, 'sma'),
+}
+
+# Longest look-back of the indicators above: rows of history needed before a row's values are final
+INDICATOR_LOOKBACK = 49
+
+
+def technical_indicator_columns(price: pd.Series, dtype=None) -> dict:
+    """
+    Computes the indicator columns added by add_technical_indicators for a price series.
+    Returns {'ma_20': Series, 'ma_50': Series, 'rsi_14': Series} aligned with `price`.
+    Values match pandas rolling means to floating-point precision; dtype=np.float32 narrows the output.
+    """
+    values = compute_indicators(price.to_numpy(dtype='float64', na_value=np.nan), INDICATOR_SPEC, dtype=dtype)
+    return {name: pd.Series(column, index=price.index, name=name, copy=False) for name, column in values.items()}
+
+
+def add_technical_indicators(df: pd.DataFrame, copy: bool = True, dtype=None) -> pd.DataFrame:
     """
     Adds basic technical indicators (e.g., moving averages, RSI) to the DataFrame.
-    Uses pandas for moving averages; TA-Lib can be added for more advanced indicators.
+    Computed in one pass by src/tools/indicators.py; TA-Lib can be added for more advanced indicators.
+    With copy=False the columns are added to `df` itself; dtype=np.float32 halves their memory.
     Returns the DataFrame with new columns.
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     if 'gold_price_usd' in df.columns:
-        df['ma_20'] = df['gold_price_usd'].rolling(window=20).mean()
-        df['ma_50'] = df['gold_price_usd'].rolling(window=50).mean()
-        # Example RSI calculation (simple version)
-        delta = df['gold_price_usd'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / (loss + 1e-9)
-        df['rsi_14'] = 100 - (100 / (1 + rs))
-    return df 
\ No newline at end of file
+        for name, values in technical_indicator_columns(df['gold_price_usd'], dtype=dtype).items():
+            df[name] = values
+    return df
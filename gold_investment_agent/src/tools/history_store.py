@@ -0,0 +1,308 @@
+# history_store.py
+# Purpose: Columnar, memory-mapped on-disk store for historical price and macro series.
+# Replaces re-parsing CSV files on every load: each column is a raw little-endian binary file,
+# partitioned by instrument and year, and read through np.memmap. Reads only touch the pages of
+# the projected columns inside the requested date range; appends only write the new rows.
+#
+# Layout:
+#   <root>/<instrument>/<year>/meta.json   {"rows": n, "columns": {name: dtype}, "first": ..., "last": ...}
+#   <root>/<instrument>/<year>/<column>.bin
+# The date column is stored as datetime64[ns] and kept sorted, so a date range maps to a row range
+# with a binary search. meta.json is rewritten last on every append and is the commit point:
+# bytes beyond meta["rows"] (from an interrupted append) are ignored and truncated by the next append.
+#
+# Usage:
+#   store = HistoryStore("data/history")
+#   store.append("XAUUSD", df)                                      # new bars only
+#   df = store.read("XAUUSD", columns=["gold_price_usd"], start="2023-01-01", end="2023-12-31")
+#   python -m src.tools.history_store ingest XAUUSD data/gold_prices.csv
+
+import argparse
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DATE_COLUMN = "date"
+DATE_DTYPE = "datetime64[ns]"
+
+
+def _to_datetime64(value: Any) -> np.datetime64:
+    """Converts a date-like bound to naive datetime64[ns] (timezone-aware values are taken as UTC)."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.to_datetime64().astype(DATE_DTYPE)
+
+
+class HistoryStore:
+    """
+    Append-only columnar store of time series, partitioned by instrument and year.
+    The schema (column names and dtypes) of an instrument is fixed by its first append.
+    Only numeric, boolean and datetime columns can be stored.
+    """
+
+    def __init__(self, root: str = "data/history"):
+        self.root = root
+        self._lock = threading.Lock()
+
+    # ----- metadata -----
+
+    def _dir(self, instrument: str, year: Optional[int] = None) -> str:
+        path = os.path.join(self.root, instrument)
+        return path if year is None else os.path.join(path, str(year))
+
+    def _meta(self, instrument: str, year: int) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._dir(instrument, year), "meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, instrument: str, year: int, meta: dict) -> None:
+        path = os.path.join(self._dir(instrument, year), "meta.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+
+    def instruments(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if self.years(d))
+
+    def years(self, instrument: str) -> List[int]:
+        """Returns the years with committed data for an instrument, ascending."""
+        path = self._dir(instrument)
+        if not os.path.isdir(path):
+            return []
+        return sorted(int(d) for d in os.listdir(path)
+                      if d.isdigit() and os.path.exists(os.path.join(path, d, "meta.json")))
+
+    def schema(self, instrument: str) -> Dict[str, str]:
+        """Returns {column: dtype} for an instrument (empty if it has no data)."""
+        years = self.years(instrument)
+        meta = self._meta(instrument, years[-1]) if years else None
+        return dict(meta["columns"]) if meta else {}
+
+    def info(self, instrument: str) -> Dict[str, Any]:
+        """Row counts and date bounds per year partition."""
+        partitions = {}
+        for year in self.years(instrument):
+            meta = self._meta(instrument, year)
+            partitions[year] = {"rows": meta["rows"], "first": meta.get("first"), "last": meta.get("last")}
+        return {"instrument": instrument, "columns": self.schema(instrument), "partitions": partitions}
+
+    # ----- writes -----
+
+    @staticmethod
+    def _prepare(df: pd.DataFrame, date_col: str) -> pd.DataFrame:
+        """Normalizes the date column to naive datetime64[ns], sorted ascending."""
+        if date_col not in df.columns:
+            raise ValueError(f"Frame has no '{date_col}' column.")
+        dates = pd.to_datetime(df[date_col])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+        dates = dates.astype(DATE_DTYPE)
+        if dates.isna().any():
+            raise ValueError(f"Column '{date_col}' contains missing or unparseable dates.")
+        frame = df.drop(columns=[date_col])
+        frame.insert(0, DATE_COLUMN, dates)
+        if not frame[DATE_COLUMN].is_monotonic_increasing:
+            frame = frame.sort_values(DATE_COLUMN, kind="stable")
+        return frame
+
+    def last_timestamp(self, instrument: str) -> Optional[pd.Timestamp]:
+        years = self.years(instrument)
+        if not years:
+            return None
+        last = self._meta(instrument, years[-1]).get("last")
+        return pd.Timestamp(last) if last else None
+
+    def append(self, instrument: str, df: pd.DataFrame, date_col: str = DATE_COLUMN) -> int:
+        """
+        Appends the bars of `df` that are newer than the last stored bar. Returns the number of rows
+        written. Raises ValueError if the columns don't match the instrument's schema.
+        """
+        frame = self._prepare(df, date_col)
+        columns = {DATE_COLUMN: DATE_DTYPE}
+        for name in frame.columns[1:]:
+            dtype = frame[name].dtype
+            if not isinstance(dtype, np.dtype) or dtype.kind not in "biufM":
+                raise ValueError(f"Column '{name}' has unsupported dtype {dtype}; only numeric, "
+                                 f"boolean and datetime columns can be stored.")
+            columns[name] = dtype.newbyteorder("<").str
+        with self._lock:
+            existing = self.schema(instrument)
+            if existing:
+                if list(existing) != list(columns):
+                    raise ValueError(f"Columns {list(columns)} don't match the schema of '{instrument}': "
+                                     f"{list(existing)}.")
+                for name, dtype in columns.items():
+                    # e.g. int64 bars appended to a float64 column
+                    if not np.can_cast(np.dtype(dtype), np.dtype(existing[name]), "same_kind"):
+                        raise ValueError(f"Column '{name}' has dtype {dtype}; '{instrument}' stores "
+                                         f"{existing[name]}.")
+                columns = existing
+            last = self.last_timestamp(instrument)
+            if last is not None:
+                frame = frame[frame[DATE_COLUMN] > last]
+            if frame.empty:
+                return 0
+            years = frame[DATE_COLUMN].dt.year.to_numpy()
+            bounds = np.flatnonzero(np.diff(years)) + 1
+            for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(frame)]):
+                self._append_partition(instrument, int(years[lo]), frame.iloc[lo:hi], columns)
+            return len(frame)
+
+    def _append_partition(self, instrument: str, year: int, part: pd.DataFrame, columns: Dict[str, str]) -> None:
+        directory = self._dir(instrument, year)
+        os.makedirs(directory, exist_ok=True)
+        meta = self._meta(instrument, year) or {"rows": 0, "columns": columns}
+        rows = meta["rows"]
+        for name, dtype in columns.items():
+            values = np.ascontiguousarray(part[name].to_numpy(dtype=dtype))
+            path = os.path.join(directory, f"{name}.bin")
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                # Drop any bytes left behind by an append that never committed
+                f.truncate(rows * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(values.tobytes())
+        dates = part[DATE_COLUMN]
+        meta.update({
+            "rows": rows + len(part),
+            "columns": columns,
+            "first": meta.get("first") or dates.iloc[0].isoformat(),
+            "last": dates.iloc[-1].isoformat(),
+        })
+        self._write_meta(instrument, year, meta)
+
+    def ingest_csv(self, instrument: str, filepath: str, date_col: str = DATE_COLUMN,
+                   chunksize: int = 1_000_000) -> int:
+        """
+        Converts a CSV (as read by data_tools.load_historical_data) into the store, chunk by chunk.
+        Integer columns are stored as float64, since a later chunk may contain missing values.
+        """
+        total = 0
+        for chunk in pd.read_csv(filepath, comment="#", chunksize=chunksize):
+            ints = [c for c in chunk.columns if c != date_col and chunk[c].dtype.kind in "iu"]
+            if ints:
+                chunk[ints] = chunk[ints].astype("float64")
+            total += self.append(instrument, chunk, date_col=date_col)
+        return total
+
+    # ----- reads -----
+
+    def _column(self, instrument: str, year: int, name: str, dtype: str, rows: int) -> np.ndarray:
+        return np.memmap(os.path.join(self._dir(instrument, year), f"{name}.bin"),
+                         dtype=dtype, mode="r", shape=(rows,))
+
+    def _partition_slices(self, instrument: str, columns: Optional[Iterable[str]], start: Any,
+                          end: Any) -> Iterator[Dict[str, np.ndarray]]:
+        """Yields {column: memory-mapped slice} for each partition overlapping [start, end]."""
+        schema = self.schema(instrument)
+        if not schema:
+            raise KeyError(f"No stored history for '{instrument}'.")
+        names = [DATE_COLUMN] + [c for c in (columns or schema) if c != DATE_COLUMN]
+        missing = [c for c in names if c not in schema]
+        if missing:
+            raise KeyError(f"Unknown columns for '{instrument}': {', '.join(missing)}.")
+        lo_ts = _to_datetime64(start) if start is not None else None
+        hi_ts = _to_datetime64(end) if end is not None else None
+
+        first_year = pd.Timestamp(lo_ts).year if lo_ts is not None else None
+        last_year = pd.Timestamp(hi_ts).year if hi_ts is not None else None
+        for year in self.years(instrument):
+            if (first_year is not None and year < first_year) or (last_year is not None and year > last_year):
+                continue
+            meta = self._meta(instrument, year)
+            rows = meta["rows"]
+            if rows == 0:
+                continue
+            dates = self._column(instrument, year, DATE_COLUMN, DATE_DTYPE, rows)
+            lo = int(np.searchsorted(dates, lo_ts, side="left")) if lo_ts is not None else 0
+            hi = int(np.searchsorted(dates, hi_ts, side="right")) if hi_ts is not None else rows
+            if hi <= lo:
+                continue
+            yield {name: (dates if name == DATE_COLUMN
+                          else self._column(instrument, year, name, schema[name], rows))[lo:hi]
+                   for name in names}
+
+    def read_arrays(self, instrument: str, columns: Optional[Iterable[str]] = None,
+                    start: Any = None, end: Any = None) -> Dict[str, np.ndarray]:
+        """
+        Returns {column: array} for rows with start <= date <= end (both optional, inclusive).
+        The date column is always included. When the range falls in one partition the arrays are
+        read-only views of the memory-mapped files; otherwise the selected slices are concatenated.
+        """
+        parts = list(self._partition_slices(instrument, columns, start, end))
+        if len(parts) == 1:
+            return parts[0]
+        schema = self.schema(instrument)
+        names = [DATE_COLUMN] + [c for c in (columns or schema) if c != DATE_COLUMN]
+        if not parts:
+            return {name: np.empty(0, dtype=schema[name]) for name in names}
+        return {name: np.concatenate([part[name] for part in parts]) for name in names}
+
+    def iter_chunks(self, instrument: str, columns: Optional[Iterable[str]] = None, start: Any = None,
+                    end: Any = None, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+        """
+        Yields the selected rows as DataFrames of at most `chunksize` rows, in date order.
+        Chunks are views of the memory-mapped files and never span two partitions, so memory use
+        is bounded by the chunk size whatever the length of the range.
+        """
+        offset = 0
+        for part in self._partition_slices(instrument, columns, start, end):
+            rows = len(part[DATE_COLUMN])
+            for lo in range(0, rows, chunksize):
+                hi = min(rows, lo + chunksize)
+                chunk = pd.DataFrame({name: values[lo:hi] for name, values in part.items()}, copy=False)
+                chunk.index = pd.RangeIndex(offset, offset + hi - lo)
+                offset += hi - lo
+                yield chunk
+
+    def read(self, instrument: str, columns: Optional[Iterable[str]] = None, start: Any = None,
+             end: Any = None, copy: bool = False) -> pd.DataFrame:
+        """
+        Loads a date range of selected columns as a DataFrame with a 'date' column first.
+        With copy=False, single-partition reads are backed by the memory-mapped (read-only) files;
+        use copy=True to get a writable, file-independent frame.
+        """
+        arrays = self.read_arrays(instrument, columns, start, end)
+        if copy:
+            arrays = {name: np.array(values) for name, values in arrays.items()}
+        return pd.DataFrame(arrays, copy=False)
+
+
+def is_store_path(path: str) -> bool:
+    """True if `path` is an instrument directory of a HistoryStore (contains year partitions)."""
+    return os.path.isdir(path) and any(
+        d.isdigit() and os.path.exists(os.path.join(path, d, "meta.json")) for d in os.listdir(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar history store")
+    parser.add_argument("--root", default="data/history", help="Store root directory.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Append a CSV's new rows to an instrument.")
+    ingest.add_argument("instrument")
+    ingest.add_argument("csv")
+    ingest.add_argument("--date-col", default=DATE_COLUMN)
+    info = sub.add_parser("info", help="Show partitions of an instrument (or list instruments).")
+    info.add_argument("instrument", nargs="?")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.root)
+    if args.command == "ingest":
+        rows = store.ingest_csv(args.instrument, args.csv, date_col=args.date_col)
+        print(f"Appended {rows} rows to {args.instrument}")
+    elif args.instrument:
+        print(json.dumps(store.info(args.instrument), indent=2))
+    else:
+        print("\n".join(store.instruments()))
+
+
+if __name__ == "__main__":
+    main()
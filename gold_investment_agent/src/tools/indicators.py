@@ -0,0 +1,425 @@
+# indicators.py
+# Purpose: Single NumPy indicator engine shared by data_tools, the simulation and TechnicalFactorsAgent.
+# Indicators are computed over raw arrays: a 1-D array is one series, a 2-D (T x S) array holds one
+# series per column. No DataFrames are built along the way.
+#
+# compute_indicators() evaluates a whole spec in as few passes over the data as possible:
+# - every simple moving average and Bollinger band reads one shared cumulative sum of the prices;
+# - every RSI reads one shared pass over the price changes (and its cumulative gain/loss sums);
+# - exponential smoothing (EMA, MACD, Wilder RSI/ATR) runs as a blocked closed-form recurrence
+#   instead of a per-bar loop, so long histories cost a handful of vectorized operations.
+#
+# Conventions (matching the pandas code this replaces):
+# - Rolling windows are NaN while incomplete or while they hold a NaN, as with pandas rolling(window).
+# - EMAs follow ewm(adjust=False): seeded with the first valid value; interior NaNs are forward filled.
+# - Wilder smoothing (RSI, ATR) is seeded per column with the simple mean of its first `period` values.
+# - RSI uses rs = gain / (loss + 1e-9), as in the original agent code. method="sma" reproduces the
+#   simple-average RSI of data_tools (the undefined first change counts as no gain and no loss).
+# - Arithmetic is float64; dtype=np.float32 only narrows the returned arrays.
+#
+# Usage:
+#   out = compute_indicators(close, {"ma_20": ("sma", 20), "rsi_14": ("rsi", 14)}, dtype=np.float32)
+#   out["ma_20"], out["rsi_14"]
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+RSI_EPSILON = 1e-9
+
+# MA crossover / RSI set used by TechnicalFactorsAgent and the simulation
+TECHNICAL_SPEC = {"ma20": ("sma", 20), "ma50": ("sma", 50), "rsi14": ("rsi", 14)}
+
+KINDS = ("sma", "ema", "rsi", "macd", "bollinger", "atr")
+
+# Output name suffixes of the indicators that produce several arrays
+MULTI_OUTPUT = {
+    "macd": ("line", "signal", "hist"),
+    "bollinger": ("mid", "upper", "lower"),
+}
+
+# The blocked recurrence scales values by up to decay**-block; keep that below e**_MAX_LOG_SCALE
+_MAX_LOG_SCALE = 300.0
+_MAX_BLOCK = 1024
+
+
+def _as_2d(x) -> Tuple[np.ndarray, bool]:
+    """
+    Returns x as a column-major float64 (T x S) array, copying only if needed, and whether x was 1-D.
+    Every pass runs down the columns, so column-major keeps them contiguous.
+    """
+    arr = np.asarray(x, dtype=np.float64, order="F")
+    if arr.ndim == 1:
+        return arr[:, None], True
+    if arr.ndim != 2:
+        raise ValueError(f"Indicators take 1-D or 2-D arrays, got {arr.ndim} dimensions.")
+    return arr, False
+
+
+def _padded_cumsum(x: np.ndarray) -> np.ndarray:
+    """Cumulative sum down the columns with a leading row of zeros, so window sums are c[t+1] - c[t+1-w]."""
+    out = np.empty((x.shape[0] + 1, x.shape[1]), order="F")
+    out[0] = 0.0
+    np.cumsum(x, axis=0, out=out[1:])
+    return out
+
+
+def _first_valid(x: np.ndarray) -> np.ndarray:
+    """Row of the first non-NaN value in each column (len(x) for all-NaN columns)."""
+    if x.shape[0] == 0:
+        return np.zeros(x.shape[1], dtype=np.int64)
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), x.shape[0])
+
+
+def _pick(x: np.ndarray, rows: np.ndarray, fill: float = np.nan) -> np.ndarray:
+    """x[rows[c], c] for every column c, or `fill` where rows[c] is past the end."""
+    out = np.full(x.shape[1], fill)
+    ok = rows < x.shape[0]
+    out[ok] = x[rows[ok], np.flatnonzero(ok)]
+    return out
+
+
+def _ffill(x: np.ndarray) -> np.ndarray:
+    """Forward fills NaNs down each column (leading NaNs stay NaN). Returns x itself if it has none."""
+    nan = np.isnan(x)
+    if not nan.any():
+        return x
+    idx = np.where(nan, 0, np.arange(x.shape[0])[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(x, idx, axis=0)
+
+
+def smooth(x, alpha: float, init) -> np.ndarray:
+    """
+    First-order recursive filter y[t] = y[t-1] + alpha * (x[t] - y[t-1]) with y[-1] = init, down each
+    column of x. This is ewm(alpha, adjust=False) / Wilder smoothing with an explicit starting value.
+    Rows are processed in blocks: inside a block the recurrence has a closed form (one scaled cumsum),
+    and only the block-end values are carried in a loop, so the cost is O(T) vectorized work plus
+    O(T / block) tiny steps.
+    Args:
+        x (array): 1-D or (T x S) input without NaNs.
+        alpha (float): Smoothing factor in (0, 1].
+        init (float or array): Value before the first row, per column.
+    """
+    values, squeeze = _as_2d(x)
+    T, S = values.shape
+    init = np.broadcast_to(np.asarray(init, dtype=np.float64), (S,))
+    decay = 1.0 - alpha
+    if decay <= 0.0 or T == 0:
+        out = values.copy()
+    else:
+        block = max(1, min(_MAX_BLOCK, int(_MAX_LOG_SCALE / -np.log(decay)), T))
+        blocks = -(-T // block)
+        # Work on an (S x blocks x block) layout so every pass runs over contiguous rows
+        local = np.zeros((S, blocks * block))
+        local[:, :T] = values.T
+        local = local.reshape(S, blocks, block)
+        k = np.arange(block)
+        # Zero-start response of each block: local[b, k] = alpha * sum_j<=k decay**(k-j) * x[b, j]
+        local *= alpha * decay ** -k
+        np.cumsum(local, axis=2, out=local)
+        local *= decay ** k
+        # Carry the state across blocks: y[b, k] = local[b, k] + decay**(k+1) * y[b-1, last]
+        starts = np.empty((S, blocks))
+        carry = init.copy()
+        tail = local[:, :, -1]
+        step = decay ** block
+        for b in range(blocks):
+            starts[:, b] = carry
+            carry = tail[:, b] + step * carry
+        local += (decay ** (k + 1)) * starts[:, :, None]
+        out = local.reshape(S, blocks * block)[:, :T].T
+    return out[:, 0] if squeeze else out
+
+
+def _seeded_smooth(x: np.ndarray, alpha: float, seed_row: np.ndarray, seed: np.ndarray) -> np.ndarray:
+    """
+    smooth() that starts each column at its own row: NaN before seed_row, `seed` at seed_row and the
+    recurrence afterwards. Rows up to the seed are replaced by the seed, which holds the filter there.
+    """
+    held = x.copy(order="F")
+    for c, row in enumerate(seed_row):
+        held[:row + 1, c] = seed[c]
+    out = smooth(held, alpha, seed)
+    for c, row in enumerate(seed_row):
+        out[:row, c] = np.nan
+    return out
+
+
+class _Series:
+    """
+    One (T x S) price array plus the intermediate passes indicators share (cumulative sums, price
+    changes, smoothed series). Each pass is computed at most once per compute_indicators() call.
+    """
+
+    def __init__(self, close, high=None, low=None):
+        self.close, self.squeeze = _as_2d(close)
+        self.high = _as_2d(high)[0] if high is not None else None
+        self.low = _as_2d(low)[0] if low is not None else None
+        self.T, self.S = self.close.shape
+        self._cache = {}
+
+    def _cached(self, key, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def finish(self, out: np.ndarray, dtype=None) -> np.ndarray:
+        if self.squeeze:
+            out = out[:, 0]
+        return out.astype(dtype, copy=False) if dtype is not None else out
+
+    # --- shared passes ---
+
+    def _nan(self) -> Optional[np.ndarray]:
+        """NaN mask of the prices, or None when there are none (the common, fast case)."""
+        def build():
+            nan = np.isnan(self.close)
+            return nan if nan.any() else None
+        return self._cached("nan", build)
+
+    def _first(self) -> np.ndarray:
+        def build():
+            nan = self._nan()
+            if nan is None:
+                return np.zeros(self.S, dtype=np.int64)
+            return np.where(nan.all(axis=0), self.T, nan.argmin(axis=0))
+        return self._cached("first", build)
+
+    def _sums(self):
+        """
+        Cumulative sum of the prices centred on each column's first value (which keeps the running
+        sums small) and the cumulative NaN count (None when there are no NaNs).
+        """
+        def build():
+            csum = np.empty((self.T + 1, self.S), order="F")
+            csum[0] = 0.0
+            body = np.subtract(self.close, _pick(self.close, self._first(), 0.0), out=csum[1:])
+            nan, cnan = self._nan(), None
+            if nan is not None:
+                body[nan] = 0.0
+                cnan = _padded_cumsum(nan)
+            np.cumsum(body, axis=0, out=body)
+            return csum, cnan
+        return self._cached("sums", build)
+
+    def _square_sums(self) -> np.ndarray:
+        """Cumulative sum of the squared centred prices (for rolling variances)."""
+        centred = self.close - _pick(self.close, self._first(), 0.0)
+        np.square(centred, out=centred)
+        if self._nan() is not None:
+            centred[self._nan()] = 0.0
+        return _padded_cumsum(centred)
+
+    def _window(self, csum: np.ndarray, window: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Sums over each trailing window (rows window-1 onwards), NaN where the window holds a NaN."""
+        out = np.subtract(csum[window:], csum[:-window], out=out)
+        cnan = self._sums()[1]
+        if cnan is not None:
+            out[(cnan[window:] - cnan[:-window]) > 0] = np.nan
+        return out
+
+    def _delta(self) -> np.ndarray:
+        """Bar-to-bar price changes; the first row is NaN."""
+        def build():
+            delta = np.empty((self.T, self.S), order="F")
+            delta[:1] = np.nan
+            np.subtract(self.close[1:], self.close[:-1], out=delta[1:])
+            return delta
+        return self._cached("delta", build)
+
+    def _gain_sums(self) -> np.ndarray:
+        """Cumulative sum of the per-bar gains (NaN changes, including the first, count as no gain)."""
+        def build():
+            cgain = np.empty((self.T + 1, self.S), order="F")
+            cgain[:2] = 0.0
+            body = np.subtract(self.close[1:], self.close[:-1], out=cgain[2:])
+            np.fmax(body, 0.0, out=body)
+            np.cumsum(cgain[1:], axis=0, out=cgain[1:])
+            return cgain
+        return self._cached("gain_sums", build)
+
+    def _changes(self):
+        """
+        Gains and losses of each bar side by side in one (T x 2S) array, plus its cumulative sum.
+        NaN changes (including the undefined first one) count as no gain and no loss.
+        """
+        def build():
+            S = self.S
+            moves = np.empty((self.T, 2 * S), order="F")
+            delta = self._delta()
+            np.fmax(delta, 0.0, out=moves[:, :S])
+            np.fmax(-delta, 0.0, out=moves[:, S:])
+            return moves, _padded_cumsum(moves)
+        return self._cached("changes", build)
+
+    def _wilder(self, x: np.ndarray, csum: np.ndarray, period: int, first: np.ndarray) -> np.ndarray:
+        """Wilder smoothing of x, seeded with the mean of x[first:first + period] in each column."""
+        seed_row = first + period - 1
+        seed = (_pick(csum, seed_row + 1) - _pick(csum, first, 0.0)) / period
+        return _seeded_smooth(x, 1.0 / period, seed_row, seed)
+
+    # --- indicators ---
+
+    def sma(self, window: int) -> np.ndarray:
+        def build():
+            out = np.empty((self.T, self.S), order="F")
+            out[:window - 1] = np.nan
+            if self.T >= window:
+                body = self._window(self._sums()[0], window, out=out[window - 1:])
+                body /= window
+                body += _pick(self.close, self._first(), 0.0)
+            return out
+        return self._cached(("sma", window), build)
+
+    def ema(self, span: float) -> np.ndarray:
+        return self._cached(("ema", span), lambda: self._ema(self.close, 2.0 / (span + 1.0)))
+
+    @staticmethod
+    def _ema(x: np.ndarray, alpha: float) -> np.ndarray:
+        first = _first_valid(x)
+        filled = _ffill(x)
+        return _seeded_smooth(filled, alpha, first, _pick(filled, first))
+
+    def rsi(self, period: int = 14, method: str = "wilder") -> np.ndarray:
+        if method not in ("wilder", "sma"):
+            raise ValueError(f"Unknown RSI method '{method}' (expected 'wilder' or 'sma').")
+        return self._cached(("rsi", period, method), lambda: self._rsi(period, method))
+
+    def _rsi(self, period: int, method: str) -> np.ndarray:
+        # 100 - 100 / (1 + gain / (loss + eps)) is rewritten as 100 * gain / (gain + loss + eps)
+        S = self.S
+        if method == "sma" and self._nan() is None:
+            # Without NaNs the changes in a window sum to a price difference, so the loss sums follow
+            # from the gain sums (loss = gain - net change) and need no pass of their own
+            out = np.empty((self.T, S), order="F")
+            out[:period - 1] = np.nan
+            if self.T >= period:
+                cgain = self._gain_sums()
+                gain = np.subtract(cgain[period:], cgain[:-period])
+                # Clamp the cancellation noise of the differenced sums at zero
+                np.maximum(gain, 0.0, out=gain)
+                # gain + loss = 2 * gain - net change, with the net change written straight into out
+                body = out[period - 1:]
+                body[0] = self.close[0] - self.close[period - 1]
+                np.subtract(self.close[:-period], self.close[period:], out=body[1:])
+                body += gain
+                body += gain
+                body += period * RSI_EPSILON
+                np.divide(gain, body, out=body)
+                body *= 100.0
+            return out
+        moves, cmoves = self._changes()
+        if method == "sma":
+            avg = np.empty(moves.shape, order="F")
+            avg[:period - 1] = np.nan
+            if self.T >= period:
+                body = np.subtract(cmoves[period:], cmoves[:-period], out=avg[period - 1:])
+                np.maximum(body, 0.0, out=body)
+                body /= period
+        else:
+            # Changes start one row after each column's first valid close
+            avg = self._wilder(moves, cmoves, period, np.tile(self._first() + 1, 2))
+        gain, loss = avg[:, :S], avg[:, S:]
+        out = gain + loss
+        out += RSI_EPSILON
+        np.divide(gain, out, out=out)
+        out *= 100.0
+        return out
+
+    def macd(self, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, ...]:
+        line = self.ema(fast) - self.ema(slow)
+        signal_line = self._ema(line, 2.0 / (signal + 1.0))
+        return line, signal_line, line - signal_line
+
+    def bollinger(self, window: int = 20, num_std: float = 2.0) -> Tuple[np.ndarray, ...]:
+        """Middle band (SMA) and bands num_std population standard deviations away."""
+        mid = self.sma(window)
+        std = np.full((self.T, self.S), np.nan, order="F")
+        if self.T >= window:
+            csum = self._sums()[0]
+            csq = self._cached("squares", self._square_sums)
+            mean = self._window(csum, window) / window
+            var = self._window(csq, window) / window - mean * mean
+            np.maximum(var, 0.0, out=var)
+            std[window - 1:] = np.sqrt(var)
+        return mid, mid + num_std * std, mid - num_std * std
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        """Average true range with Wilder smoothing; the first bar's true range is high - low."""
+        if self.high is None or self.low is None:
+            raise ValueError("ATR needs high and low prices.")
+        prev = np.empty_like(self.close)
+        prev[:1] = np.nan
+        prev[1:] = self.close[:-1]
+        tr = np.fmax(self.high - self.low, np.fmax(np.abs(self.high - prev), np.abs(self.low - prev)))
+        first = _first_valid(tr)
+        tr = _ffill(tr)
+        return self._wilder(tr, _padded_cumsum(np.nan_to_num(tr)), period, first)
+
+
+def compute_indicators(close, spec: Dict[str, tuple] = TECHNICAL_SPEC, high=None, low=None,
+                       dtype=None) -> Dict[str, np.ndarray]:
+    """
+    Computes a set of indicators over one price array, sharing intermediate passes between them.
+    Args:
+        close (array): 1-D prices, or a (T x S) array with one series per column.
+        spec (dict): Output name -> (kind, *params), where kind is one of
+            ("sma", window), ("ema", span), ("rsi", period[, "wilder" | "sma"]),
+            ("macd", fast, slow, signal), ("bollinger", window, num_std), ("atr", period).
+            macd and bollinger produce <name>_line/_signal/_hist and <name>_mid/_upper/_lower.
+        high, low (array, optional): Bar highs and lows, required by "atr".
+        dtype (optional): Output dtype, e.g. np.float32 to halve the memory of the results.
+    Returns:
+        dict: Output name -> array with the shape of `close`.
+    """
+    series = _Series(close, high, low)
+    out = {}
+    for name, (kind, *params) in spec.items():
+        if kind not in KINDS:
+            raise ValueError(f"Unknown indicator '{kind}' for '{name}' (expected one of {', '.join(KINDS)}).")
+        result = getattr(series, kind)(*params)
+        if kind in MULTI_OUTPUT:
+            for suffix, values in zip(MULTI_OUTPUT[kind], result):
+                out[f"{name}_{suffix}"] = series.finish(values, dtype)
+        else:
+            out[name] = series.finish(result, dtype)
+    return out
+
+
+def sma(x, window: int, dtype=None) -> np.ndarray:
+    """Trailing simple moving average; NaN where the window is incomplete or holds a NaN."""
+    series = _Series(x)
+    return series.finish(series.sma(window), dtype)
+
+
+def ema(x, span: float, dtype=None) -> np.ndarray:
+    """Exponential moving average with alpha = 2 / (span + 1), as ewm(span=span, adjust=False)."""
+    series = _Series(x)
+    return series.finish(series.ema(span), dtype)
+
+
+def rsi(close, period: int = 14, method: str = "wilder", dtype=None) -> np.ndarray:
+    """Relative Strength Index with Wilder ("wilder") or simple-average ("sma") smoothing."""
+    series = _Series(close)
+    return series.finish(series.rsi(period, method), dtype)
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9, dtype=None) -> Tuple[np.ndarray, ...]:
+    """MACD line, signal line and histogram."""
+    series = _Series(close)
+    return tuple(series.finish(v, dtype) for v in series.macd(fast, slow, signal))
+
+
+def bollinger(close, window: int = 20, num_std: float = 2.0, dtype=None) -> Tuple[np.ndarray, ...]:
+    """Bollinger middle, upper and lower bands."""
+    series = _Series(close)
+    return tuple(series.finish(v, dtype) for v in series.bollinger(window, num_std))
+
+
+def atr(high, low, close, period: int = 14, dtype=None) -> np.ndarray:
+    """Average true range (Wilder)."""
+    series = _Series(close, high, low)
+    return series.finish(series.atr(period), dtype)
+
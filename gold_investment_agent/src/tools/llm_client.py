@@ -0,0 +1,333 @@
+# llm_client.py
+# Purpose: OpenRouter chat-completion client for agents and the Coordinator's debate step.
+# Replaces one-off blocking requests.post calls (see test_openrouter_connection.py) with:
+# - a content-addressed response cache: each request is keyed on a SHA-256 of its canonical form
+#   (model, messages, temperature, max_tokens) in memory and in the disk cache (src/tools/cache.py,
+#   endpoint "llm.chat", no expiry), so analysis over unchanged inputs makes no LLM calls;
+# - single-flight: identical requests issued at the same time share one upstream call;
+# - batching: OpenRouter's chat endpoint takes one conversation per request and has no batch
+#   endpoint, so complete_many() deduplicates prompts and fans the distinct ones out over the pool;
+# - a bounded concurrency pool: at most max_concurrency upstream requests in flight, whether they
+#   come from agent threads or from acomplete()/complete_many() on an event loop;
+# - a per-run token budget: run(token_budget=...) scopes a budget; every upstream call reserves its
+#   estimated prompt tokens plus max_tokens before it is sent and settles with the usage the API
+#   reports. Calls that would overrun the budget raise TokenBudgetExceeded; cache hits are free.
+# Requests go through the shared, rate-limited "openrouter" HTTPSession (src/tools/api_tools.py) and
+# are timed under the "llm" span; tokens, cache hits and coalesced calls are counted in Metrics.
+#
+# Usage:
+#   llm = LLMClient()                                   # OPENROUTER_API_KEY / OPENROUTER_MODEL from .env
+#   with llm.run(token_budget=20_000):
+#       text = llm.complete("Summarize: ...", system="You are a gold market analyst.")
+#       texts = llm.complete_many(["prompt 1", "prompt 2"])
+#   LLMClient(api_key="test", base_url="http://127.0.0.1:8765/v1/")   # local stub server
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from src.tools.api_tools import HTTPSession, get_session
+from src.tools.cache import DiskCache, get_disk_cache
+from src.tools.metrics import get_metrics
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1/"
+DEFAULT_MODEL = "qwen/qwen3-4b:free"
+CACHE_ENDPOINT = "llm.chat"
+DEFAULT_MAX_TOKENS = 512
+DEFAULT_MAX_CONCURRENCY = 4
+# Completions kept in memory per client (the disk cache holds the rest)
+MEMORY_CACHE_SIZE = 1024
+# Rough prompt-size estimate used to reserve budget before the API reports actual usage
+CHARS_PER_TOKEN = 4
+
+Messages = List[Dict[str, str]]
+
+
+class LLMError(Exception):
+    """Raised when the LLM API returns an error or an unusable response."""
+    pass
+
+
+class TokenBudgetExceeded(LLMError):
+    """Raised instead of sending a request that could overrun the run's token budget."""
+    pass
+
+
+class TokenBudget:
+    """
+    Thread-safe token budget for one run. reserve() holds an upper bound for a request in flight;
+    settle() replaces the reservation with the tokens the API reports.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self.used = 0
+        self.reserved = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> None:
+        with self._lock:
+            if self.limit is not None and self.used + self.reserved + tokens > self.limit:
+                raise TokenBudgetExceeded(
+                    f"Request needs up to {tokens} tokens but only "
+                    f"{self.limit - self.used - self.reserved} of {self.limit} remain in this run.")
+            self.reserved += tokens
+
+    def settle(self, reserved: int, used: int) -> None:
+        with self._lock:
+            self.reserved -= reserved
+            self.used += used
+
+    def remaining(self) -> Optional[int]:
+        with self._lock:
+            return None if self.limit is None else self.limit - self.used - self.reserved
+
+
+class _Call:
+    """An in-flight completion that identical requests wait on."""
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _messages(prompt: Union[str, Messages], system: Optional[str]) -> Messages:
+    messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else list(prompt)
+    if system is not None:
+        messages = [{"role": "system", "content": system}] + messages
+    return messages
+
+
+class LLMClient:
+    """
+    Cached, single-flight, concurrency-limited client for OpenRouter's chat completions API
+    (or any OpenAI-compatible endpoint given as base_url).
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 base_url: Optional[str] = None, cache: Optional[DiskCache] = None,
+                 session: Optional[HTTPSession] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_tokens: int = DEFAULT_MAX_TOKENS, temperature: float = 0.0, timeout: float = 60.0,
+                 use_disk_cache: bool = True):
+        """
+        Args:
+            api_key (str, optional): Defaults to OPENROUTER_API_KEY (see src/tools/env_loader.py).
+            model (str, optional): Defaults to OPENROUTER_MODEL.
+            base_url (str, optional): Overrides DEFAULT_BASE_URL, e.g. to point at a local stub server.
+            cache (DiskCache, optional): Response cache; defaults to the process-wide disk cache.
+            session (HTTPSession, optional): Defaults to the shared "openrouter" session.
+            max_concurrency (int): Upstream requests allowed in flight at once.
+            max_tokens (int): Default completion limit per request (also the budget reservation).
+            temperature (float): Default sampling temperature.
+            timeout (float): Seconds per HTTP request.
+            use_disk_cache (bool): When False, responses are only cached in memory.
+        """
+        if api_key is None:
+            from src.tools.env_loader import get_openrouter_config
+            api_key, env_model = get_openrouter_config()
+            model = model or env_model
+        self.api_key = api_key
+        self.model = model or os.getenv("OPENROUTER_MODEL", DEFAULT_MODEL)
+        self.base_url = base_url or DEFAULT_BASE_URL
+        if not self.base_url.endswith("/"):
+            self.base_url += "/"
+        self.cache = (cache or get_disk_cache()) if use_disk_cache else None
+        self.session = session or get_session("openrouter")
+        self.max_concurrency = max_concurrency
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._memory: Dict[str, str] = {}
+        self._inflight: Dict[str, _Call] = {}
+        self._loop_slots = None
+        self.budget = TokenBudget()
+        self._run_budget = self.budget
+        self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        self.requests = 0
+        self.upstream_calls = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+
+    # ----- runs and stats -----
+
+    @contextmanager
+    def run(self, token_budget: Optional[int] = None):
+        """
+        Scopes a run: counters are reset and `token_budget` (None for unlimited) applies to every
+        upstream call until the block exits. Yields the client.
+        """
+        previous = self.budget
+        with self._lock:
+            self.budget = self._run_budget = TokenBudget(token_budget)
+            self._reset_counters()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self.budget = previous
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the current (or most recent) run, including tokens used against the budget."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "upstream_calls": self.upstream_calls,
+                "cache_hits": self.cache_hits,
+                "coalesced": self.coalesced,
+                "tokens_used": self._run_budget.used,
+                "token_budget": self._run_budget.limit,
+            }
+
+    # ----- requests -----
+
+    def request_key(self, messages: Messages, model: str, temperature: float, max_tokens: int) -> str:
+        """Content address of a request: SHA-256 of its canonical JSON form."""
+        canonical = json.dumps({"model": model, "messages": messages, "temperature": temperature,
+                                "max_tokens": max_tokens}, sort_keys=True, ensure_ascii=False,
+                               separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def complete(self, prompt: Union[str, Messages], system: Optional[str] = None, model: Optional[str] = None,
+                 max_tokens: Optional[int] = None, temperature: Optional[float] = None) -> str:
+        """
+        Returns the completion text for a prompt (a string or a list of chat messages).
+        Served from the cache when the same request was answered before; identical concurrent
+        requests share one upstream call.
+        Raises:
+            TokenBudgetExceeded: The call could overrun the current run's token budget.
+            LLMError: The API returned an error or no completion.
+        """
+        messages = _messages(prompt, system)
+        model = model or self.model
+        max_tokens = self.max_tokens if max_tokens is None else max_tokens
+        temperature = self.temperature if temperature is None else temperature
+        key = self.request_key(messages, model, temperature, max_tokens)
+        metrics = get_metrics()
+        with self._lock:
+            self.requests += 1
+            if key in self._memory:
+                self.cache_hits += 1
+                metrics.incr("llm_cache_hits", model=model)
+                return self._memory[key]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+        if not leader:
+            with self._lock:
+                self.coalesced += 1
+            metrics.incr("llm_coalesced", model=model)
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        called = False
+
+        def upstream():
+            nonlocal called
+            called = True
+            return self._post(messages, model, temperature, max_tokens)
+
+        try:
+            if self.cache is not None:
+                call.result = self.cache.get_or_fetch(CACHE_ENDPOINT, key, upstream)
+            else:
+                call.result = upstream()
+            if not called:
+                with self._lock:
+                    self.cache_hits += 1
+                metrics.incr("llm_cache_hits", model=model)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if call.error is None:
+                    if len(self._memory) >= MEMORY_CACHE_SIZE:
+                        self._memory.clear()
+                    self._memory[key] = call.result
+            call.event.set()
+        return call.result
+
+    def _post(self, messages: Messages, model: str, temperature: float, max_tokens: int) -> str:
+        """Sends one chat completion within the concurrency limit and the token budget."""
+        budget = self.budget
+        estimate = sum(len(m.get("content", "")) for m in messages) // CHARS_PER_TOKEN + 1 + max_tokens
+        budget.reserve(estimate)
+        used = estimate
+        metrics = get_metrics()
+        try:
+            with self._slots, metrics.span("llm", model=model):
+                with self._lock:
+                    self.upstream_calls += 1
+                response = self.session.post(
+                    f"{self.base_url}chat/completions",
+                    json={"model": model, "messages": messages, "temperature": temperature,
+                          "max_tokens": max_tokens},
+                    headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+                    timeout=self.timeout)
+                if response.status_code >= 400:
+                    raise LLMError(f"LLM request failed with HTTP {response.status_code}: {response.text[:200]}")
+                data = response.json()
+            usage = data.get("usage") or {}
+            # Some OpenAI-compatible servers send "total_tokens": null; fall back to the estimate
+            used = usage.get("total_tokens") or estimate
+            metrics.incr("llm_tokens", used, model=model)
+            try:
+                text = data["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                raise LLMError(f"LLM response has no completion: {str(data)[:200]}")
+            if text is None:
+                raise LLMError("LLM response has an empty completion.")
+            return text
+        finally:
+            budget.settle(estimate, used)
+
+    async def acomplete(self, prompt: Union[str, Messages], **kwargs) -> str:
+        """complete() for event loops: runs on a worker thread, at most max_concurrency at a time."""
+        async with self._async_slots():
+            return await asyncio.to_thread(self.complete, prompt, **kwargs)
+
+    def _async_slots(self) -> asyncio.Semaphore:
+        # One semaphore per event loop (asyncio primitives are bound to the loop they are used on)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slots = self._loop_slots
+            if slots is None or slots[0] is not loop:
+                slots = self._loop_slots = (loop, asyncio.Semaphore(self.max_concurrency))
+        return slots[1]
+
+    async def acomplete_many(self, prompts: Sequence[Union[str, Messages]], return_exceptions: bool = False,
+                             **kwargs) -> List[Any]:
+        """
+        Completes many prompts concurrently (bounded by max_concurrency), sending each distinct
+        prompt once. Results keep the order of `prompts`; with return_exceptions, failures are
+        returned in place instead of raised.
+        """
+        distinct: Dict[str, int] = {}
+        unique = []
+        for prompt in prompts:
+            key = json.dumps(prompt, sort_keys=True, ensure_ascii=False)
+            if key not in distinct:
+                distinct[key] = len(unique)
+                unique.append(prompt)
+        results = await asyncio.gather(*(self.acomplete(p, **kwargs) for p in unique),
+                                       return_exceptions=return_exceptions)
+        return [results[distinct[json.dumps(p, sort_keys=True, ensure_ascii=False)]] for p in prompts]
+
+    def complete_many(self, prompts: Sequence[Union[str, Messages]], return_exceptions: bool = False,
+                      **kwargs) -> List[Any]:
+        """Blocking acomplete_many() for code that is not running an event loop."""
+        return asyncio.run(self.acomplete_many(prompts, return_exceptions=return_exceptions, **kwargs))
@@ -0,0 +1,243 @@
+# metrics.py
+# Purpose: Lightweight hot-path instrumentation for agents, upstream fetches and synthesis.
+# Records timing spans plus rows/bytes received and error counts, keyed by a span name and labels
+# (e.g. span "agent" with agent="EconomicIndicatorsAgent", span "fetch" with endpoint="news_cctv").
+#
+# Key Components:
+# - Metrics: Thread-safe recorder with JSON (to_dict) and Prometheus text (to_prometheus) export.
+#   A per-run Metrics can forward everything into a parent, e.g. the process-wide registry.
+# - NULL_METRICS: Disabled recorder; span() returns a shared no-op context manager, so
+#   instrumentation costs one attribute lookup and call when turned off.
+# - get_metrics: Process-wide cumulative registry (disable with GOLD_AGENT_METRICS=0).
+#
+# Usage:
+#   metrics = Metrics(parent=get_metrics())
+#   with metrics.span("fetch", endpoint="news_cctv") as span:
+#       df = fetch()
+#       span.payload(df)
+#   print(metrics.to_prometheus())
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+PROMETHEUS_PREFIX = "gold_agent"
+
+# Per-series fields: count, total seconds, max seconds, errors, rows, bytes
+_COUNT, _SUM, _MAX, _ERRORS, _ROWS, _BYTES = range(6)
+
+
+def payload_size(value: Any) -> Tuple[int, int]:
+    """
+    Returns (rows, bytes) for a fetched payload without copying it: DataFrame memory usage
+    (shallow), len() of bytes/str/collections, and (1, 0) for scalars.
+    """
+    if value is None:
+        return 0, 0
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        return len(value), int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return 1, len(value)
+    if isinstance(value, str):
+        return 1, len(value.encode("utf-8"))
+    if hasattr(value, "__len__"):
+        return len(value), 0
+    return 1, 0
+
+
+class _Span:
+    """Context manager timing one operation; records an error if the block raises."""
+    __slots__ = ("_metrics", "_key", "_start", "_failed", "rows", "nbytes")
+
+    def __init__(self, metrics: "Metrics", key: tuple):
+        self._metrics = metrics
+        self._key = key
+        self._failed = False
+        self.rows = 0
+        self.nbytes = 0
+
+    def payload(self, value: Any = None, rows: Optional[int] = None, nbytes: Optional[int] = None) -> None:
+        """Attaches the size of the received payload to this span."""
+        if value is not None:
+            rows, nbytes = payload_size(value)
+        self.rows += rows or 0
+        self.nbytes += nbytes or 0
+
+    def fail(self) -> None:
+        """Counts this span as an error even though no exception escaped (e.g. an HTTP 5xx)."""
+        self._failed = True
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._metrics._record(self._key, time.perf_counter() - self._start,
+                              self._failed or exc_type is not None, self.rows, self.nbytes)
+        return False
+
+
+class _NullSpan:
+    """Shared no-op span used when instrumentation is disabled."""
+    __slots__ = ()
+
+    def payload(self, value: Any = None, rows: Optional[int] = None, nbytes: Optional[int] = None) -> None:
+        pass
+
+    def fail(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """
+    Thread-safe span and counter recorder.
+    """
+
+    def __init__(self, enabled: bool = True, parent: Optional["Metrics"] = None):
+        self.enabled = enabled
+        self.parent = parent if parent is not None and parent.enabled else None
+        self._lock = threading.Lock()
+        self._series: Dict[tuple, list] = {}
+        self._counters: Dict[tuple, float] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> tuple:
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def span(self, name: str, **labels):
+        """Returns a context manager timing the enclosed block under `name` and `labels`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, self._key(name, labels))
+
+    def incr(self, name: str, value: float = 1, **labels) -> None:
+        """Adds `value` to a counter."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        if self.parent is not None:
+            self.parent.incr(name, value, **labels)
+
+    def _record(self, key: tuple, seconds: float, error: bool, rows: int, nbytes: int) -> None:
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0, 0.0, 0.0, 0, 0, 0]
+            series[_COUNT] += 1
+            series[_SUM] += seconds
+            if seconds > series[_MAX]:
+                series[_MAX] = seconds
+            series[_ERRORS] += error
+            series[_ROWS] += rows
+            series[_BYTES] += nbytes
+        if self.parent is not None:
+            self.parent._record(key, seconds, error, rows, nbytes)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._counters.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns spans and counters as JSON-ready lists of records."""
+        with self._lock:
+            spans = [{
+                "name": name,
+                "labels": dict(labels),
+                "count": s[_COUNT],
+                "total_seconds": s[_SUM],
+                "max_seconds": s[_MAX],
+                "mean_seconds": s[_SUM] / s[_COUNT] if s[_COUNT] else 0.0,
+                "errors": s[_ERRORS],
+                "rows": s[_ROWS],
+                "bytes": s[_BYTES],
+            } for (name, labels), s in self._series.items()]
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in self._counters.items()]
+        spans.sort(key=lambda s: s["total_seconds"], reverse=True)
+        return {"spans": spans, "counters": counters}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Metrics":
+        """Rebuilds a Metrics from to_dict() output, e.g. to export a run's metrics as Prometheus text."""
+        metrics = cls()
+        for s in data.get("spans", []):
+            key = metrics._key(s["name"], s["labels"])
+            metrics._series[key] = [s["count"], s["total_seconds"], s["max_seconds"],
+                                    s["errors"], s["rows"], s["bytes"]]
+        for c in data.get("counters", []):
+            metrics._counters[metrics._key(c["name"], c["labels"])] = c["value"]
+        return metrics
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, **kwargs)
+
+    def to_prometheus(self, prefix: str = PROMETHEUS_PREFIX) -> str:
+        """Renders the metrics in Prometheus text exposition format."""
+        def fmt_labels(labels: tuple) -> str:
+            if not labels:
+                return ""
+            parts = (f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for k, v in labels)
+            return "{" + ",".join(parts) + "}"
+
+        with self._lock:
+            series = sorted(self._series.items())
+            counters = sorted(self._counters.items())
+        lines = []
+        by_name: Dict[str, list] = {}
+        for (name, labels), s in series:
+            by_name.setdefault(name, []).append((labels, s))
+        for name, entries in by_name.items():
+            base = f"{prefix}_{name}"
+            lines.append(f"# TYPE {base}_seconds summary")
+            for labels, s in entries:
+                lines.append(f"{base}_seconds_count{fmt_labels(labels)} {s[_COUNT]}")
+                lines.append(f"{base}_seconds_sum{fmt_labels(labels)} {s[_SUM]:.6f}")
+            for suffix, field in (("seconds_max", _MAX), ("errors_total", _ERRORS),
+                                  ("rows_total", _ROWS), ("bytes_total", _BYTES)):
+                kind = "gauge" if field == _MAX else "counter"
+                lines.append(f"# TYPE {base}_{suffix} {kind}")
+                for labels, s in entries:
+                    value = f"{s[field]:.6f}" if field == _MAX else s[field]
+                    lines.append(f"{base}_{suffix}{fmt_labels(labels)} {value}")
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f"{prefix}_{name}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f"{metric}{fmt_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+NULL_METRICS = Metrics(enabled=False)
+
+_default_metrics: Optional[Metrics] = None
+_default_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """
+    Returns the process-wide cumulative Metrics registry (NULL_METRICS if GOLD_AGENT_METRICS=0).
+    """
+    global _default_metrics
+    if os.environ.get("GOLD_AGENT_METRICS", "1") == "0":
+        return NULL_METRICS
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
@@ -0,0 +1,414 @@
+# run_history.py
+# Purpose: Append-only SQLite store of every analysis run (recommendation, confidence and each
+# agent's signal, confidence, reasoning and details), with range queries, per-agent time series
+# and downsampled aggregates.
+#
+# Schema:
+# - runs(id, ts, recommendation, confidence, extras): one row per run, indexed by ts. extras holds
+#   data_stats and other small result keys as compact JSON; timing metrics are not stored.
+# - signals(agent_id, ts, run_id, signal, confidence, reasoning, details, refs): one row per agent
+#   output, clustered by (agent_id, ts) (WITHOUT ROWID), so an agent's time series is a contiguous
+#   range scan. agents(id, name) interns the agent names.
+# - runs_hourly / signals_hourly: hourly rollups (count, confidence sum/min/max, Buy/Sell/Hold counts)
+#   updated in the same transaction as each append. Aggregates at whole-hour intervals read only the
+#   rollups, so a year of minute-level runs is summarized from ~8,760 rows instead of ~525,000.
+#
+# Timestamps are stored as seconds since the epoch of naive datetimes (timezone-aware values are
+# taken as UTC, as in the history store); signals are stored as codes (0=Buy, 1=Sell, 2=Hold).
+#
+# Usage:
+#   history = RunHistory("data/run_history.sqlite")
+#   history.append(coordinator.run_analysis())
+#   history.runs(start="2024-06-01")                         # DataFrame of runs
+#   history.agent_series("TechnicalFactorsAgent", start="2024-06-01")
+#   history.last_flip("TechnicalFactorsAgent", "Sell")        # when it last turned Sell
+#   history.aggregate("1D", start="2024-01-01")               # daily recommendation mix
+#   python -m src.tools.run_history data/run_history.sqlite --since 7D --interval 1D
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.signals import SIGNAL_CODES, SIGNALS, AgentSignal, combined_reasoning
+
+HOUR = 3600
+
+# Result keys that are not stored in runs.extras (stored elsewhere, derivable, or large)
+_SKIP_EXTRAS = {"recommendation", "confidence", "reasoning", "agent_outputs", "summary_table", "metrics"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    recommendation INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    extras TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_ts ON runs (ts);
+CREATE TABLE IF NOT EXISTS agents (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS signals (
+    agent_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    run_id INTEGER NOT NULL,
+    signal INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    reasoning TEXT,
+    details TEXT,
+    refs TEXT,
+    PRIMARY KEY (agent_id, ts, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signals_run ON signals (run_id);
+CREATE TABLE IF NOT EXISTS runs_hourly (
+    bucket INTEGER PRIMARY KEY,
+    n INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    confidence_min REAL NOT NULL,
+    confidence_max REAL NOT NULL,
+    buy INTEGER NOT NULL,
+    sell INTEGER NOT NULL,
+    hold INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signals_hourly (
+    agent_id INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    confidence_min REAL NOT NULL,
+    confidence_max REAL NOT NULL,
+    buy INTEGER NOT NULL,
+    sell INTEGER NOT NULL,
+    hold INTEGER NOT NULL,
+    PRIMARY KEY (agent_id, bucket)
+) WITHOUT ROWID;
+"""
+
+# Upsert of one observation into an hourly rollup; the key columns are filled in per table
+_ROLLUP_VALUES = "?, 1, ?, ?, ?, ? = 0, ? = 1, ? = 2"
+_ROLLUP_UPDATE = """
+    n = n + 1,
+    confidence_sum = confidence_sum + excluded.confidence_sum,
+    confidence_min = min(confidence_min, excluded.confidence_min),
+    confidence_max = max(confidence_max, excluded.confidence_max),
+    buy = buy + excluded.buy,
+    sell = sell + excluded.sell,
+    hold = hold + excluded.hold
+"""
+_RUNS_ROLLUP = (f"INSERT INTO runs_hourly VALUES ({_ROLLUP_VALUES}) "
+                f"ON CONFLICT (bucket) DO UPDATE SET {_ROLLUP_UPDATE}")
+_SIGNALS_ROLLUP = (f"INSERT INTO signals_hourly VALUES (?, {_ROLLUP_VALUES}) "
+                   f"ON CONFLICT (agent_id, bucket) DO UPDATE SET {_ROLLUP_UPDATE}")
+
+AGGREGATE_COLUMNS = ["runs", "mean_confidence", "min_confidence", "max_confidence", "buy", "sell", "hold"]
+
+
+def _epoch(value: Any) -> float:
+    """Seconds since the epoch of a naive timestamp (timezone-aware values are taken as UTC)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.value / 1e9
+
+
+def _to_datetimes(seconds: np.ndarray) -> pd.DatetimeIndex:
+    return pd.to_datetime(np.round(seconds * 1e6).astype("int64"), unit="us")
+
+
+def _seconds(interval: Any) -> float:
+    """Interval length in seconds from a number of seconds or a pandas offset string such as "15min" or "1D"."""
+    if isinstance(interval, (int, float)):
+        return float(interval)
+    return pd.Timedelta(interval).total_seconds()
+
+
+def _compact(value: Any) -> Optional[str]:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str) if value else None
+
+
+class RunHistory:
+    """
+    Append-only history of Coordinator results in a local SQLite database.
+    Safe to share between threads (writes and reads are serialized on one connection).
+    """
+
+    def __init__(self, path: str = "data/run_history.sqlite"):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        self._agent_ids: Dict[str, int] = dict(
+            (name, agent_id) for agent_id, name in self._conn.execute("SELECT id, name FROM agents"))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _agent_id(self, name: str, pending: Dict[str, int]) -> int:
+        """
+        Id of `name`, inserting the agent if needed. Called inside an append transaction: ids not yet
+        cached go to `pending` and are cached only once the transaction commits.
+        """
+        agent_id = self._agent_ids.get(name) or pending.get(name)
+        if agent_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO agents (name) VALUES (?)", (name,))
+            (agent_id,) = self._conn.execute("SELECT id FROM agents WHERE name = ?", (name,)).fetchone()
+            pending[name] = agent_id
+        return agent_id
+
+    def _lookup(self, name: str) -> Optional[int]:
+        """
+        Id of an existing agent, or None. The database is shared with other processes (e.g. the CLI
+        and the service), so names missing from the cache are looked up before giving up.
+        """
+        agent_id = self._agent_ids.get(name)
+        if agent_id is None:
+            row = self._query("SELECT id FROM agents WHERE name = ?", (name,))
+            if row:
+                agent_id = self._agent_ids[name] = row[0][0]
+        return agent_id
+
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # ----- writes -----
+
+    def append(self, result: Dict[str, Any], timestamp: Any = None) -> int:
+        """
+        Appends one Coordinator result and updates the hourly rollups in a single transaction.
+        Args:
+            result (dict): Output of Coordinator.run_analysis / run_partial.
+            timestamp (optional): Run time (datetime, string or epoch seconds); defaults to now.
+        Returns:
+            int: The run id.
+        """
+        ts = _epoch(timestamp if timestamp is not None else datetime.now())
+        bucket = int(ts // HOUR) * HOUR
+        outputs = [AgentSignal.coerce(o) for o in result.get("agent_outputs", [])]
+        code = SIGNAL_CODES[result.get("recommendation", "Hold")]
+        confidence = float(result.get("confidence", 0.0))
+        extras = {k: v for k, v in result.items() if k not in _SKIP_EXTRAS}
+        pending: Dict[str, int] = {}
+        with self._lock, self._conn:
+            run_id = self._conn.execute(
+                "INSERT INTO runs (ts, recommendation, confidence, extras) VALUES (?, ?, ?, ?)",
+                (ts, code, confidence, _compact(extras))).lastrowid
+            self._conn.execute(_RUNS_ROLLUP, (bucket, confidence, confidence, confidence, code, code, code))
+            rows, rollups = [], []
+            for output in outputs:
+                agent_id = self._agent_id(output.agent, pending)
+                rows.append((agent_id, ts, run_id, output.code, output.confidence, output.reasoning,
+                             _compact(output.details), _compact(output.refs)))
+                rollups.append((agent_id, bucket, output.confidence, output.confidence, output.confidence,
+                                output.code, output.code, output.code))
+            self._conn.executemany("INSERT INTO signals VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.executemany(_SIGNALS_ROLLUP, rollups)
+        # Committed: the new agents exist now (after a rollback they would not)
+        self._agent_ids.update(pending)
+        return run_id
+
+    # ----- reads -----
+
+    @staticmethod
+    def _range(start: Any, end: Any, column: str = "ts") -> tuple:
+        """SQL condition and parameters for inclusive start/end bounds."""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(_epoch(start))
+        if end is not None:
+            clauses.append(f"{column} <= ?")
+            params.append(_epoch(end))
+        return " AND ".join(clauses) or "1", params
+
+    def agents(self) -> List[str]:
+        """Names of all agents that appear in the history."""
+        return [name for (name,) in self._query("SELECT name FROM agents ORDER BY name")]
+
+    def runs(self, start: Any = None, end: Any = None, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Runs with start <= time <= end, oldest first (or the most recent `limit` runs of that range).
+        Returns a DataFrame with run_id, timestamp, recommendation and confidence.
+        """
+        where, params = self._range(start, end)
+        sql = f"SELECT id, ts, recommendation, confidence FROM runs WHERE {where} ORDER BY ts"
+        if limit is not None:
+            sql = f"SELECT * FROM ({sql} DESC LIMIT {int(limit)}) ORDER BY ts"
+        rows = self._query(sql, params)
+        ids, ts, codes, confidence = (np.array(col) for col in zip(*rows)) if rows else ([], [], [], [])
+        return pd.DataFrame({
+            "run_id": np.asarray(ids, dtype="int64"),
+            "timestamp": _to_datetimes(np.asarray(ts, dtype=float)),
+            "recommendation": np.asarray(SIGNALS, dtype=object)[np.asarray(codes, dtype=int)],
+            "confidence": np.asarray(confidence, dtype=float),
+        })
+
+    def agent_series(self, agent: str, start: Any = None, end: Any = None,
+                     details: bool = False) -> pd.DataFrame:
+        """
+        One agent's outputs with start <= time <= end, oldest first: timestamp, run_id, signal and
+        confidence, plus one column per details key when `details` is True.
+        """
+        agent_id = self._lookup(agent)
+        where, params = self._range(start, end)
+        columns = "ts, run_id, signal, confidence" + (", details" if details else "")
+        rows = self._query(f"SELECT {columns} FROM signals WHERE agent_id = ? AND {where} ORDER BY ts",
+                           [agent_id, *params]) if agent_id is not None else []
+        cols = list(zip(*rows)) if rows else [[]] * (5 if details else 4)
+        frame = pd.DataFrame({
+            "timestamp": _to_datetimes(np.asarray(cols[0], dtype=float)),
+            "run_id": np.asarray(cols[1], dtype="int64"),
+            "signal": np.asarray(SIGNALS, dtype=object)[np.asarray(cols[2], dtype=int)],
+            "confidence": np.asarray(cols[3], dtype=float),
+        })
+        if details:
+            values = pd.DataFrame([json.loads(d) if d else {} for d in cols[4]], index=frame.index)
+            frame = pd.concat([frame, values], axis=1)
+        return frame
+
+    def last_flip(self, agent: str, signal: str) -> Optional[pd.Timestamp]:
+        """
+        When `agent` last changed to `signal` from a different signal (or first reported it, if it
+        never reported anything else before). None if it never reported `signal`.
+        """
+        agent_id = self._lookup(agent)
+        if agent_id is None:
+            return None
+        code = SIGNAL_CODES[signal]
+        with self._lock:
+            # Latest run with that signal, the latest different signal before it, then the first
+            # run with the signal after that: three range scans on the (agent_id, ts) key.
+            (latest,) = self._conn.execute(
+                "SELECT max(ts) FROM signals WHERE agent_id = ? AND signal = ?", (agent_id, code)).fetchone()
+            if latest is None:
+                return None
+            (before,) = self._conn.execute(
+                "SELECT max(ts) FROM signals WHERE agent_id = ? AND signal != ? AND ts < ?",
+                (agent_id, code, latest)).fetchone()
+            (flip,) = self._conn.execute(
+                "SELECT min(ts) FROM signals WHERE agent_id = ? AND signal = ? AND ts > ?",
+                (agent_id, code, before if before is not None else float("-inf"))).fetchone()
+        return _to_datetimes(np.array([flip]))[0]
+
+    def load_result(self, run_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Rebuilds a stored run as a result dict (without the metrics), or None if it does not exist.
+        Agent outputs are ordered by when each agent first appeared in the history.
+        """
+        run = self._query("SELECT ts, recommendation, confidence, extras FROM runs WHERE id = ?", (run_id,))
+        if not run:
+            return None
+        ts, code, confidence, extras = run[0]
+        # Names come from the agents table: other processes may have added agents this one hasn't seen
+        rows = self._query("SELECT a.name, s.signal, s.confidence, s.reasoning, s.details, s.refs "
+                           "FROM signals s JOIN agents a ON a.id = s.agent_id "
+                           "WHERE s.run_id = ? ORDER BY s.agent_id", (run_id,))
+        outputs = [AgentSignal(name, SIGNALS[signal], conf, reasoning or "",
+                               details=json.loads(details) if details else None,
+                               refs=json.loads(refs) if refs else None)
+                   for name, signal, conf, reasoning, details, refs in rows]
+        return {
+            "recommendation": SIGNALS[code],
+            "confidence": confidence,
+            "reasoning": combined_reasoning(outputs),
+            "agent_outputs": outputs,
+            "timestamp": _to_datetimes(np.array([ts]))[0],
+            **(json.loads(extras) if extras else {}),
+        }
+
+    def aggregate(self, interval: Any = "1h", start: Any = None, end: Any = None,
+                  agent: Optional[str] = None) -> pd.DataFrame:
+        """
+        Downsamples runs (or one agent's outputs) into fixed intervals aligned to the epoch.
+        Whole-hour intervals are computed from the hourly rollups; shorter ones from the raw rows.
+        Bounds select whole rollup hours, so with hourly rollups a partial first/last hour is included.
+        Args:
+            interval: Bucket length: seconds or a pandas offset string ("15min", "1h", "1D", "7D").
+            start, end (optional): Inclusive time bounds.
+            agent (str, optional): Aggregate this agent's signals instead of the recommendations.
+        Returns:
+            DataFrame indexed by bucket start: runs, mean/min/max confidence and Buy/Sell/Hold counts.
+        """
+        seconds = _seconds(interval)
+        if seconds <= 0:
+            raise ValueError(f"Interval must be positive, got {interval!r}.")
+        agent_id = self._lookup(agent) if agent is not None else None
+        if agent is not None and agent_id is None:
+            return pd.DataFrame(columns=AGGREGATE_COLUMNS, index=pd.DatetimeIndex([], name="bucket"))
+        rollup = seconds % HOUR == 0
+        if rollup:
+            # Hour buckets overlapping [start, end]
+            start = None if start is None else int(_epoch(start) // HOUR) * HOUR
+            where, params = self._range(start, end, "bucket")
+            table = "signals_hourly" if agent is not None else "runs_hourly"
+            select = ("sum(n), sum(confidence_sum), min(confidence_min), max(confidence_max), "
+                      "sum(buy), sum(sell), sum(hold)")
+            key = "bucket"
+        else:
+            where, params = self._range(start, end)
+            table = "signals" if agent is not None else "runs"
+            code = "signal" if agent is not None else "recommendation"
+            select = (f"count(*), sum(confidence), min(confidence), max(confidence), "
+                      f"sum({code} = 0), sum({code} = 1), sum({code} = 2)")
+            key = "ts"
+        if agent is not None:
+            where = f"agent_id = ? AND {where}"
+            params = [agent_id, *params]
+        rows = self._query(f"SELECT CAST({key} / ? AS INTEGER) AS b, {select} FROM {table} "
+                           f"WHERE {where} GROUP BY b ORDER BY b", [seconds, *params])
+        data = np.array(rows, dtype=float).reshape(-1, 8)
+        frame = pd.DataFrame({
+            "runs": data[:, 1].astype("int64"),
+            "mean_confidence": data[:, 2] / np.maximum(data[:, 1], 1),
+            "min_confidence": data[:, 3],
+            "max_confidence": data[:, 4],
+            "buy": data[:, 5].astype("int64"),
+            "sell": data[:, 6].astype("int64"),
+            "hold": data[:, 7].astype("int64"),
+        }, index=pd.DatetimeIndex(_to_datetimes(data[:, 0] * seconds), name="bucket"))
+        return frame
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the analysis run history")
+    parser.add_argument("path", nargs="?", default="data/run_history.sqlite", help="History database.")
+    parser.add_argument("--since", help="Only runs newer than this duration ago, e.g. 7D or 12h.")
+    parser.add_argument("--agent", help="Show this agent's signals instead of the recommendations.")
+    parser.add_argument("--interval", help="Downsample into intervals (e.g. 1h, 1D) instead of listing runs.")
+    parser.add_argument("--last-flip", metavar="SIGNAL", choices=SIGNALS,
+                        help="Print when --agent last changed to SIGNAL.")
+    parser.add_argument("--limit", type=int, default=20, help="Rows to print when listing.")
+    args = parser.parse_args(argv)
+
+    history = RunHistory(args.path)
+    start = datetime.now() - pd.Timedelta(args.since) if args.since else None
+    if args.last_flip:
+        if not args.agent:
+            parser.error("--last-flip needs --agent.")
+        print(history.last_flip(args.agent, args.last_flip))
+    elif args.interval:
+        print(history.aggregate(args.interval, start=start, agent=args.agent).to_string())
+    elif args.agent:
+        print(history.agent_series(args.agent, start=start).tail(args.limit).to_string(index=False))
+    else:
+        print(history.runs(start=start, limit=args.limit).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# sentiment.py
+# Purpose: Incremental keyword sentiment over a rolling window of news articles.
+# Each article is scored once: its keyword counts are cached by a hash of its normalized text, so a
+# run only scores articles it has not seen before. Near-duplicates (syndicated copies, light edits)
+# are collapsed before aggregating, so a story counts once however many outlets carry it.
+#
+# Key Components:
+# - LexiconMatcher: counts every lexicon's keywords in one pass over the text. All keywords are
+#   compiled into a single alternation (longest first), so the regex engine scans each article once
+#   instead of once per lexicon, and each match is mapped back to its lexicon by a dict lookup.
+# - minhash: MinHash signature of an article's character shingles (NUM_PERM multiply-shift hashes of
+#   SHINGLE-character windows, computed with NumPy).
+# - SentimentIndex: the per-article cache (counts, signature, near-duplicate cluster) with an LSH
+#   index (BANDS bands of the signature) to find near-duplicate candidates of new articles.
+#   score(texts) returns the window's totals with one article per cluster. State is persisted
+#   as an .npz snapshot plus an append-only journal of newer articles, and bounded to MAX_ARTICLES:
+#   on overflow the least recently seen are evicted down to EVICT_TO of it.
+#
+# Cost per run: hashing and a dict lookup per article in the window, plus lexicon matching, MinHash,
+# an LSH probe and a journal append for new articles only. Eviction and snapshot rewrites touch the
+# whole index but happen once per thousands of new articles.
+#
+# Usage:
+#   index = SentimentIndex.load("data/state/sentiment.npz", {"positive": [...], "negative": [...]})
+#   totals, stats = index.score(news_df["content"])
+#   index.save("data/state/sentiment.npz")
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Characters per shingle (Chinese news text has no word boundaries, so shingles are characters)
+SHINGLE = 5
+NUM_PERM = 64
+BANDS = 16  # 16 bands of 4 rows: candidate pairs are likely from ~50% Jaccard similarity upwards
+# Estimated Jaccard similarity (share of equal signature slots) at which articles are duplicates
+DUPLICATE_THRESHOLD = 0.8
+MAX_ARTICLES = 20000
+# Share of MAX_ARTICLES kept when the index overflows (the least recently seen are evicted)
+EVICT_TO = 0.9
+# Journal records always allowed before save() rewrites the snapshot
+JOURNAL_MIN = 1000
+
+_ROWS = NUM_PERM // BANDS
+_PRIME = np.uint64(1099511628211)
+_perm = np.random.default_rng(20240628)
+_MULTIPLIERS = _perm.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _perm.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _record_dtype(lexicons: int) -> np.dtype:
+    """One stored article: content hash, keyword counts per lexicon, MinHash signature, cluster, recency."""
+    return np.dtype([("hash", np.uint8, (20,)), ("counts", "<i8", (lexicons,)), ("signature", "<u4", (NUM_PERM,)),
+                     ("cluster", "<i8"), ("last_seen", "<i8")])
+
+
+def normalize(text: str) -> str:
+    """Lower-cases and collapses whitespace, so copies that differ only in layout hash the same."""
+    return _WHITESPACE.sub(" ", str(text)).strip().lower()
+
+
+def content_hash(text: str) -> bytes:
+    """Hash of a normalized article (the cache key)."""
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32 values) of a normalized text's character shingles."""
+    chars = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    width = min(SHINGLE, len(chars))
+    if width == 0:
+        return np.zeros(NUM_PERM, dtype=np.uint32)
+    n = len(chars) - width + 1
+    shingles = np.zeros(n, dtype=np.uint64)
+    for j in range(width):
+        shingles = shingles * _PRIME + chars[j:j + n]  # wraps modulo 2**64
+    shingles = np.unique(shingles)
+    hashed = _MULTIPLIERS[:, None] * shingles[None, :] + _OFFSETS[:, None]
+    return (hashed >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+class LexiconMatcher:
+    """
+    Counts keyword occurrences of several lexicons in a single pass, e.g.
+    LexiconMatcher({"positive": ["上涨", "利好"], "negative": ["下跌", "利空"]}).count(text) -> [1, 0].
+    Matches do not overlap; when keywords share a prefix the longest one wins.
+    """
+
+    def __init__(self, lexicons: Dict[str, Sequence[str]]):
+        self.labels = list(lexicons)
+        self._label_of = {}
+        for i, label in enumerate(self.labels):
+            for word in lexicons[label]:
+                self._label_of.setdefault(word, i)
+        words = sorted(self._label_of, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, words))) if words else None
+        self.key = hashlib.sha1(json.dumps(lexicons, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def count(self, text: str) -> List[int]:
+        counts = [0] * len(self.labels)
+        if self._pattern is not None:
+            label_of = self._label_of
+            for word in self._pattern.findall(text):
+                counts[label_of[word]] += 1
+        return counts
+
+
+class SentimentIndex:
+    """
+    Cache of scored articles with near-duplicate clusters. Thread-safe.
+    """
+
+    def __init__(self, lexicons: Dict[str, Sequence[str]], max_articles: int = MAX_ARTICLES):
+        self.matcher = LexiconMatcher(lexicons)
+        self.max_articles = max_articles
+        self._lock = threading.Lock()
+        self._ids: Dict[bytes, int] = {}      # content hash -> article id
+        self._hashes: List[bytes] = []
+        self._counts: List[List[int]] = []
+        self._signatures: List[np.ndarray] = []
+        self._cluster: List[int] = []         # id of the first-seen member of the article's cluster
+        self._last_seen: List[int] = []       # run number in which the article was last in the window
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self.runs = 0
+        self._token = None   # token of the snapshot on disk matching the current ids (see save)
+        self._saved = 0      # articles already in the snapshot or its journal
+        self._journaled = 0  # articles in the journal
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _bands(self, signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        rows = signature.reshape(BANDS, _ROWS)
+        return ((band, rows[band].tobytes()) for band in range(BANDS))
+
+    def _add(self, digest: bytes, text: str) -> int:
+        """Scores a new article, finds its near-duplicate cluster and indexes it."""
+        article = len(self._hashes)
+        signature = minhash(text)
+        cluster, best = article, DUPLICATE_THRESHOLD
+        candidates = set()
+        for key in self._bands(signature):
+            bucket = self._buckets.setdefault(key, [])
+            candidates.update(bucket)
+            bucket.append(article)
+        for other in candidates:
+            similarity = np.count_nonzero(self._signatures[other] == signature) / NUM_PERM
+            if similarity >= best:
+                cluster, best = self._cluster[other], similarity
+        self._ids[digest] = article
+        self._hashes.append(digest)
+        self._counts.append(self.matcher.count(text))
+        self._signatures.append(signature)
+        self._cluster.append(cluster)
+        self._last_seen.append(self.runs)
+        return article
+
+    def score(self, texts: Iterable[str]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        Scores a window of articles, reusing cached scores.
+        Returns (totals per lexicon over one article per near-duplicate cluster,
+        stats: articles, unique (clusters), new (scored this call)).
+        """
+        with self._lock:
+            self.runs += 1
+            totals = [0] * len(self.matcher.labels)
+            clusters = set()
+            articles = new = 0
+            for text in texts:
+                text = normalize(text) if isinstance(text, str) else ""
+                digest = content_hash(text)
+                article = self._ids.get(digest)
+                if article is None:
+                    article = self._add(digest, text)
+                    new += 1
+                else:
+                    self._last_seen[article] = self.runs
+                articles += 1
+                cluster = self._cluster[article]
+                if cluster not in clusters:
+                    clusters.add(cluster)
+                    for i, c in enumerate(self._counts[article]):
+                        totals[i] += c
+            if len(self._hashes) > self.max_articles:
+                self._evict()
+            return (dict(zip(self.matcher.labels, totals)),
+                    {"articles": articles, "unique": len(clusters), "new": new})
+
+    def _evict(self) -> None:
+        """
+        Keeps the most recently seen EVICT_TO share of max_articles and rebuilds the indexes. Trimming
+        below capacity means the rebuild happens once per many new articles, not on every run.
+        Caller holds the lock.
+        """
+        order = np.argsort(np.array(self._last_seen), kind="stable")
+        keep = np.sort(order[len(order) - int(self.max_articles * EVICT_TO):])
+        self._restore(self._records(0)[keep], keep)
+        self._token = None  # Ids changed, so the next save rewrites the snapshot
+
+    def _records(self, start: int) -> np.ndarray:
+        """Articles from id `start` on as an array of _record_dtype. Caller holds the lock."""
+        n = len(self._hashes) - start
+        records = np.zeros(n, dtype=_record_dtype(len(self.matcher.labels)))
+        if n:
+            records["hash"] = np.frombuffer(b"".join(self._hashes[start:]), dtype=np.uint8).reshape(n, 20)
+            records["counts"] = np.array(self._counts[start:], dtype=np.int64).reshape(n, -1)
+            records["signature"] = np.array(self._signatures[start:], dtype=np.uint32)
+            records["cluster"] = self._cluster[start:]
+            records["last_seen"] = self._last_seen[start:]
+        return records
+
+    def _restore(self, records: np.ndarray, old_ids: np.ndarray) -> None:
+        """Replaces the state with `records`, whose ids before the restore were `old_ids`."""
+        # Clusters whose first member is gone are re-rooted at their first surviving member
+        new_id = {int(old): new for new, old in enumerate(old_ids)}
+        roots: Dict[int, int] = {}
+        cluster = []
+        for i, root in enumerate(records["cluster"].tolist()):
+            if root in new_id:
+                cluster.append(new_id[root])
+            else:
+                cluster.append(roots.setdefault(root, i))
+        n = len(records)
+        signatures = np.ascontiguousarray(records["signature"], dtype=np.uint32).reshape(n, NUM_PERM)
+        self._hashes = [row.tobytes() for row in records["hash"]]
+        self._ids = {digest: i for i, digest in enumerate(self._hashes)}
+        self._counts = records["counts"].reshape(n, -1).tolist()
+        self._signatures = list(signatures)
+        self._cluster = cluster
+        self._last_seen = records["last_seen"].tolist()
+        # Same keys as _bands(): each band's rows as bytes
+        bands = signatures.view(np.dtype((np.void, _ROWS * 4))).reshape(n, BANDS).tolist()
+        self._buckets = {}
+        for i, keys in enumerate(bands):
+            for band, key in enumerate(keys):
+                self._buckets.setdefault((band, key), []).append(i)
+
+    # ----- persistence -----
+
+    def save(self, path: str, compact: bool = False) -> None:
+        """
+        Persists the index. Articles added since the last save are appended to a journal next to the
+        snapshot (path + ".journal"), so a save costs time proportional to what is new. The .npz
+        snapshot is rewritten (atomically, with a fresh journal) when there is none yet, after an
+        eviction renumbered the articles, once the journal outgrows a quarter of the snapshot, or
+        with compact=True. Recency of already saved articles is only persisted by snapshots.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        journal = path + ".journal"
+        with self._lock:
+            n = len(self._hashes)
+            if self._token is not None and not compact:
+                if n == self._saved:
+                    return
+                itemsize = _record_dtype(len(self.matcher.labels)).itemsize
+                try:
+                    intact = os.path.getsize(journal) == len(self._token) + self._journaled * itemsize
+                except OSError:
+                    intact = False
+                if intact and self._journaled + n - self._saved <= max(JOURNAL_MIN, self._saved // 4):
+                    with open(journal, "ab") as f:
+                        f.write(self._records(self._saved).tobytes())
+                    self._journaled += n - self._saved
+                    self._saved = n
+                    return
+            token = os.urandom(16)
+            tmp = path + ".tmp.npz"
+            np.savez(tmp, lexicons=np.array(self.matcher.key), runs=np.array(self.runs),
+                     token=np.frombuffer(token, dtype=np.uint8), articles=self._records(0))
+            os.replace(tmp, path)
+            # A journal left from an older snapshot carries that snapshot's token and is ignored on load
+            with open(journal, "wb") as f:
+                f.write(token)
+            self._token, self._saved, self._journaled = token, n, 0
+
+    @classmethod
+    def load(cls, path: str, lexicons: Dict[str, Sequence[str]],
+             max_articles: int = MAX_ARTICLES) -> "SentimentIndex":
+        """
+        Restores an index saved with save(), replaying its journal. Returns an empty index if the
+        snapshot is missing, unreadable, or was built with different lexicons or MinHash settings.
+        """
+        index = cls(lexicons, max_articles)
+        dtype = _record_dtype(len(index.matcher.labels))
+        try:
+            with np.load(path) as data:
+                if str(data["lexicons"]) != index.matcher.key or data["articles"].dtype != dtype:
+                    return index
+                runs = int(data["runs"])
+                token = data["token"].tobytes()
+                records = data["articles"]
+        except (OSError, ValueError, KeyError):
+            return index
+        journaled = np.zeros(0, dtype=dtype)
+        try:
+            with open(path + ".journal", "rb") as f:
+                if f.read(len(token)) == token:
+                    tail = f.read()
+                    # A record cut short by a crash is dropped (the next save rewrites the snapshot)
+                    journaled = np.frombuffer(tail[:len(tail) - len(tail) % dtype.itemsize], dtype=dtype)
+        except OSError:
+            pass
+        records = np.concatenate([records, journaled])
+        # Stored ids are positions, so restoring keeps clusters as they are
+        index._restore(records, np.arange(len(records)))
+        index.runs = max([runs, *index._last_seen[-1:]])
+        index._token, index._saved, index._journaled = token, len(records), len(journaled)
+        return index
@@ -0,0 +1,338 @@
+# streaming_indicators.py
+# Purpose: Incremental (streaming) technical indicators for gold price bars.
+# Each new bar updates the moving averages and RSI in constant time and memory, so intraday
+# bars can be evaluated at high frequency without rescanning the full price history.
+#
+# Key Components:
+# - RingBuffer: Fixed-size, array-backed circular buffer.
+# - RollingMean: Simple moving average kept as a running sum over a RingBuffer.
+# - WilderRSI: RSI with Wilder-smoothed average gain/loss.
+# - StreamingIndicators: MA(fast), MA(slow) and RSI bundled with JSON persistence, so state
+#   survives between runs and only bars newer than the last one seen need to be applied.
+#   extend() applies a whole batch of bars with the vectorized smoothing of src/tools/indicators.py,
+#   which makes the first warm-up from years of history cheap. The last bar of a batch can be
+#   applied provisionally (e.g. today's bar, which may still be partial or revised): the state before
+#   it is kept, and rollback() restores it so the bar can be re-applied with its final close.
+#
+# Usage:
+#   engine = StreamingIndicators.load("data/state/technical_AU9999.json")
+#   engine.update(412.3, timestamp="2024-05-20")
+#   engine.save("data/state/technical_AU9999.json")
+
+import json
+import math
+import os
+from array import array
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.tools.indicators import smooth
+
+
+class RingBuffer:
+    """
+    Fixed-size circular buffer of floats backed by array('d').
+    push() overwrites the oldest value once the buffer is full and returns it.
+    """
+    __slots__ = ("size", "_data", "_pos", "_count")
+
+    def __init__(self, size: int):
+        if size <= 0:
+            raise ValueError("RingBuffer size must be positive.")
+        self.size = size
+        self._data = array("d", [0.0]) * size
+        self._pos = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count == self.size
+
+    def push(self, value: float) -> Optional[float]:
+        """Appends a value; returns the evicted value when the buffer was already full."""
+        evicted = self._data[self._pos] if self.full else None
+        self._data[self._pos] = value
+        self._pos = (self._pos + 1) % self.size
+        if self._count < self.size:
+            self._count += 1
+        return evicted
+
+    def values(self) -> list:
+        """Returns the buffered values from oldest to newest."""
+        if not self.full:
+            return self._data[:self._count].tolist()
+        return (self._data[self._pos:] + self._data[:self._pos]).tolist()
+
+    def to_dict(self) -> dict:
+        return {"size": self.size, "values": self.values()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RingBuffer":
+        buf = cls(data["size"])
+        for value in data["values"][-buf.size:]:
+            buf.push(value)
+        return buf
+
+
+class RollingMean:
+    """
+    Simple moving average over a fixed window, updated in O(1) per value.
+    The running sum is recomputed from the buffer once per full cycle to stop floating-point drift.
+    """
+    __slots__ = ("window", "buffer", "_sum")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = RingBuffer(window)
+        self._sum = 0.0
+
+    def update(self, value: float) -> float:
+        """Adds a value and returns the current mean (NaN until the window is full)."""
+        evicted = self.buffer.push(value)
+        self._sum += value - (evicted if evicted is not None else 0.0)
+        if self.buffer._pos == 0:
+            self._sum = math.fsum(self.buffer._data[:len(self.buffer)])
+        return self.value
+
+    def extend(self, values: np.ndarray) -> float:
+        """Adds many values at once; only the last `window` of them (with the buffer) matter."""
+        tail = (self.buffer.values() + values[-self.window:].tolist())[-self.window:]
+        self.buffer = RingBuffer(self.window)
+        for value in tail:
+            self.buffer.push(value)
+        self._sum = math.fsum(tail)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self._sum / self.window if self.buffer.full else math.nan
+
+    def to_dict(self) -> dict:
+        return {"window": self.window, "buffer": self.buffer.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RollingMean":
+        mean = cls(data["window"])
+        for value in data["buffer"]["values"]:
+            mean.update(value)
+        return mean
+
+
+class WilderRSI:
+    """
+    Relative Strength Index with Wilder smoothing.
+    The first `period` price changes seed the averages with their simple mean; after that
+    avg = (avg * (period - 1) + x) / period. Uses the same rs = gain / (loss + 1e-9) form as
+    the original agent code.
+    """
+    __slots__ = ("period", "prev_close", "avg_gain", "avg_loss", "_seed_count")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close: Optional[float] = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self._seed_count = 0
+
+    def update(self, close: float) -> float:
+        """Adds a closing price and returns the current RSI (NaN until `period` changes are seen)."""
+        if self.prev_close is None:
+            self.prev_close = close
+            return math.nan
+        delta = close - self.prev_close
+        self.prev_close = close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if self._seed_count < self.period:
+            # Accumulate sums during the seed period, then turn them into averages
+            self.avg_gain += gain
+            self.avg_loss += loss
+            self._seed_count += 1
+            if self._seed_count == self.period:
+                self.avg_gain /= self.period
+                self.avg_loss /= self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return self.value
+
+    def extend(self, closes: np.ndarray) -> float:
+        """Adds many closing prices at once; same result as update() for each, up to rounding."""
+        if self.prev_close is None and len(closes):
+            self.prev_close, closes = float(closes[0]), closes[1:]
+        if not len(closes):
+            return self.value
+        delta = np.diff(closes, prepend=self.prev_close)
+        self.prev_close = float(closes[-1])
+        moves = np.column_stack((np.maximum(delta, 0.0), np.maximum(-delta, 0.0)))
+        need = self.period - self._seed_count
+        if need > 0:
+            seeded = moves[:need]
+            self.avg_gain += float(seeded[:, 0].sum())
+            self.avg_loss += float(seeded[:, 1].sum())
+            self._seed_count += len(seeded)
+            if self._seed_count == self.period:
+                self.avg_gain /= self.period
+                self.avg_loss /= self.period
+            moves = moves[need:]
+        if len(moves):
+            last = smooth(moves, 1.0 / self.period, (self.avg_gain, self.avg_loss))[-1]
+            self.avg_gain, self.avg_loss = float(last[0]), float(last[1])
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self._seed_count < self.period:
+            return math.nan
+        rs = self.avg_gain / (self.avg_loss + 1e-9)
+        return 100 - (100 / (1 + rs))
+
+    def to_dict(self) -> dict:
+        return {
+            "period": self.period,
+            "prev_close": self.prev_close,
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss,
+            "seed_count": self._seed_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WilderRSI":
+        rsi = cls(data["period"])
+        rsi.prev_close = data["prev_close"]
+        rsi.avg_gain = data["avg_gain"]
+        rsi.avg_loss = data["avg_loss"]
+        rsi._seed_count = data["seed_count"]
+        return rsi
+
+
+class StreamingIndicators:
+    """
+    Fast/slow moving averages and RSI maintained incrementally over a stream of closing prices.
+    Tracks the timestamp of the last applied bar so callers can apply only newer bars.
+    """
+
+    def __init__(self, fast: int = 20, slow: int = 50, rsi_period: int = 14):
+        self.fast = RollingMean(fast)
+        self.slow = RollingMean(slow)
+        self.rsi = WilderRSI(rsi_period)
+        self.last_timestamp: Optional[str] = None
+        self.bars = 0
+        self._checkpoint: Optional[dict] = None  # State before a provisional last bar (see extend)
+
+    def update(self, close: float, timestamp: Optional[str] = None) -> Dict[str, float]:
+        """
+        Applies one bar in O(1) and returns the latest indicator values.
+        NaN closes are ignored.
+        """
+        if close is not None and not math.isnan(close):
+            self.fast.update(close)
+            self.slow.update(close)
+            self.rsi.update(close)
+            self.bars += 1
+            self._checkpoint = None
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+        return self.latest()
+
+    def extend(self, closes, timestamp: Optional[str] = None, provisional: bool = False) -> Dict[str, float]:
+        """
+        Applies a batch of bars (oldest first) and returns the latest indicator values. Equivalent to
+        update() per bar, but vectorized. NaN closes are ignored; `timestamp` is the last bar's.
+        With provisional=True the last bar may still change: the state before it is kept so that
+        rollback() can undo it before the bar is applied again.
+        """
+        values = np.asarray(closes, dtype=float)
+        values = values[~np.isnan(values)]
+        if provisional and len(values):
+            self._apply(values[:-1])
+            self._checkpoint = None
+            checkpoint = self.to_dict()
+            self._apply(values[-1:])
+            self._checkpoint = checkpoint
+        elif len(values):
+            self._apply(values)
+            self._checkpoint = None
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+        return self.latest()
+
+    def _apply(self, values: np.ndarray) -> None:
+        if len(values):
+            self.fast.extend(values)
+            self.slow.extend(values)
+            self.rsi.extend(values)
+            self.bars += len(values)
+
+    @property
+    def provisional(self) -> bool:
+        """True if the last applied bar was provisional and can be rolled back."""
+        return self._checkpoint is not None
+
+    def rollback(self) -> bool:
+        """
+        Restores the state from before the last provisional bar, including the previous bar's timestamp.
+        Returns False (and changes nothing) if the last bar was not applied provisionally.
+        """
+        if self._checkpoint is None:
+            return False
+        previous = self.from_dict(self._checkpoint)
+        self.fast, self.slow, self.rsi = previous.fast, previous.slow, previous.rsi
+        self.last_timestamp, self.bars = previous.last_timestamp, previous.bars
+        self._checkpoint = None
+        return True
+
+    def latest(self) -> Dict[str, float]:
+        """Returns the current indicator values keyed as ma<fast>, ma<slow> and rsi<period>."""
+        return {
+            f"ma{self.fast.window}": self.fast.value,
+            f"ma{self.slow.window}": self.slow.value,
+            f"rsi{self.rsi.period}": self.rsi.value,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "fast": self.fast.to_dict(),
+            "slow": self.slow.to_dict(),
+            "rsi": self.rsi.to_dict(),
+            "last_timestamp": self.last_timestamp,
+            "bars": self.bars,
+            "provisional": self._checkpoint,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StreamingIndicators":
+        engine = cls.__new__(cls)
+        engine.fast = RollingMean.from_dict(data["fast"])
+        engine.slow = RollingMean.from_dict(data["slow"])
+        engine.rsi = WilderRSI.from_dict(data["rsi"])
+        engine.last_timestamp = data.get("last_timestamp")
+        engine.bars = data.get("bars", 0)
+        engine._checkpoint = data.get("provisional")
+        return engine
+
+    def save(self, path: str) -> None:
+        """Atomically writes the engine state to a JSON file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str, fast: int = 20, slow: int = 50, rsi_period: int = 14) -> "StreamingIndicators":
+        """
+        Restores engine state from a JSON file. Returns a fresh engine if the file is missing,
+        unreadable, or was saved with different window settings.
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                engine = cls.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return cls(fast, slow, rsi_period)
+        if (engine.fast.window, engine.slow.window, engine.rsi.period) != (fast, slow, rsi_period):
+            return cls(fast, slow, rsi_period)
+        return engine
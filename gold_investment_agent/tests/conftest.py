@@ -0,0 +1,96 @@
+# conftest.py
+# Purpose: Shared pytest fixtures. `stub_server` runs a local HTTP server on 127.0.0.1 so the REST
+# and LLM clients (src/tools/api_tools.py, src/tools/llm_client.py) can be tested without network access.
+#
+# Usage:
+#   def test_something(stub_server):
+#       stub_server.respond = lambda request: (200, {}, {"rates": {"USD": 2300.0}})
+#       client = MetalPriceAPIClient(api_key="test", base_url=stub_server.url)
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+
+class StubRequest:
+    """One request received by the stub server."""
+
+    def __init__(self, method: str, path: str, query: dict, body, started: float):
+        self.method = method
+        self.path = path
+        self.query = query    # parameter -> first value
+        self.body = body      # parsed JSON body, or None
+        self.started = started  # time.monotonic() when the request arrived
+
+
+class StubServer:
+    """
+    Local HTTP server whose answers come from `respond(request) -> (status, headers, payload)`;
+    payload is encoded as JSON. Records every request and the peak number handled at once.
+    """
+
+    def __init__(self):
+        self.respond = lambda request: (200, {}, {})
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}/v1/"
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                request = StubRequest(self.command, url.path, {k: v[0] for k, v in parse_qs(url.query).items()},
+                                      body, time.monotonic())
+                with stub._lock:
+                    stub.requests.append(request)
+                    stub.active += 1
+                    stub.peak = max(stub.peak, stub.active)
+                try:
+                    status, headers, payload = stub.respond(request)
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _serve
+            do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer().start()
+    yield server
+    server.stop()
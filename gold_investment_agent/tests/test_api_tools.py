@@ -0,0 +1,94 @@
+# test_api_tools.py
+# Purpose: Tests for the pooled, rate-limited HTTP layer and the MetalpriceAPI client
+# (src/tools/api_tools.py) against the local stub server in conftest.py.
+
+from datetime import date, timedelta
+
+import pandas as pd
+
+from src.tools.api_tools import HTTPSession, MetalPriceAPIClient
+
+
+def _session(**kwargs) -> HTTPSession:
+    """A session that never waits on its rate limit or backoff unless a test asks it to."""
+    options = {"rate": 1000.0, "burst": 1000, "backoff_base": 0.001, "timeout": 5, "name": "test"}
+    options.update(kwargs)
+    return HTTPSession(**options)
+
+
+def _scripted(*statuses, headers=None):
+    """Answers with the given statuses in order, then 200 with a gold price."""
+    statuses = list(statuses)
+
+    def respond(request):
+        if statuses:
+            status = statuses.pop(0)
+            return status, (headers or {}) if status == 429 else {}, {"error": status}
+        return 200, {}, {"rates": {"USD": 2300.5}}
+    return respond
+
+
+def test_retries_429_and_5xx_until_success(stub_server):
+    stub_server.respond = _scripted(429, 429)
+    client = MetalPriceAPIClient(api_key="test", session=_session(), base_url=stub_server.url)
+    assert client.get_gold_price("USD") == 2300.5
+    assert len(stub_server.requests) == 3
+
+    stub_server.requests.clear()
+    stub_server.respond = _scripted(500, 502, 503)
+    assert client.get_gold_price("USD") == 2300.5
+    assert len(stub_server.requests) == 4
+
+
+def test_gives_up_after_max_retries(stub_server):
+    stub_server.respond = _scripted(503, 503, 503, 503)
+    session = _session(max_retries=2)
+    response = session.get(f"{stub_server.url}latest")
+    assert response.status_code == 503
+    assert len(stub_server.requests) == 3
+
+
+def test_honours_retry_after(stub_server):
+    stub_server.respond = _scripted(429, headers={"Retry-After": "0.4"})
+    session = _session(backoff_base=0.001)
+    assert session.get(f"{stub_server.url}latest").status_code == 200
+    first, second = stub_server.requests
+    assert second.started - first.started >= 0.4
+
+
+def test_token_bucket_spaces_requests(stub_server):
+    stub_server.respond = _scripted()
+    session = _session(rate=10.0, burst=1)
+    for _ in range(5):
+        session.get(f"{stub_server.url}latest")
+    starts = [request.started for request in stub_server.requests]
+    # One token per 0.1 s after the burst of one
+    assert all(later - earlier >= 0.09 for earlier, later in zip(starts, starts[1:]))
+    assert starts[-1] - starts[0] >= 0.39
+
+
+def test_timeframe_chunks_merge_into_one_frame(stub_server):
+    def respond(request):
+        start = date.fromisoformat(request.query["start_date"])
+        end = date.fromisoformat(request.query["end_date"])
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        # Answer newest first, as a server need not order its keys
+        rates = {day.isoformat(): {"USD": 1000 + day.toordinal() % 1000, "EUR": 900.0}
+                 for day in reversed(days)}
+        return 200, {}, {"success": True, "rates": rates}
+
+    stub_server.respond = respond
+    client = MetalPriceAPIClient(api_key="test", session=_session(), base_url=stub_server.url)
+    df = client.get_timeframe("2021-03-01", "2023-12-31", currencies=["usd", "eur"])
+
+    ranges = sorted((r.query["start_date"], r.query["end_date"]) for r in stub_server.requests)
+    assert len(ranges) == 3
+    assert all((date.fromisoformat(end) - date.fromisoformat(start)).days < 365 for start, end in ranges)
+    assert all(r.query["api_key"] == "test" and r.path == "/v1/timeframe" for r in stub_server.requests)
+
+    expected = pd.date_range("2021-03-01", "2023-12-31", freq="D")
+    assert list(df.columns) == ["date", "gold_price_usd", "gold_price_eur"]
+    assert pd.api.types.is_datetime64_any_dtype(df["date"])
+    assert df["date"].tolist() == expected.tolist()
+    assert df["gold_price_usd"].tolist() == [1000 + day.toordinal() % 1000 for day in expected]
+    assert (df["gold_price_eur"] == 900.0).all()
@@ -0,0 +1,118 @@
+# test_llm_client.py
+# Purpose: Tests for the cached, single-flight, concurrency-limited LLM client (src/tools/llm_client.py)
+# against the local stub server in conftest.py, which answers as an OpenAI-compatible chat endpoint.
+
+import threading
+import time
+
+import pytest
+
+from src.tools.api_tools import HTTPSession
+from src.tools.cache import DiskCache
+from src.tools.llm_client import CHARS_PER_TOKEN, LLMClient, LLMError, TokenBudgetExceeded
+
+
+def _chat(delay: float = 0.0, total_tokens=10):
+    """Stub answer: echoes the last message after `delay` seconds, reporting `total_tokens` used."""
+    def respond(request):
+        time.sleep(delay)
+        prompt = request.body["messages"][-1]["content"]
+        return 200, {}, {"choices": [{"message": {"content": f"re: {prompt}"}}],
+                         "usage": {"total_tokens": total_tokens}}
+    return respond
+
+
+def _client(stub_server, **kwargs) -> LLMClient:
+    session = HTTPSession(rate=1000.0, burst=1000, backoff_base=0.001, timeout=5, name="test")
+    options = {"api_key": "test", "model": "stub", "base_url": stub_server.url, "session": session,
+               "use_disk_cache": False}
+    options.update(kwargs)
+    return LLMClient(**options)
+
+
+def _estimate(prompt: str, max_tokens: int) -> int:
+    """The budget reservation LLMClient makes for a single-message prompt."""
+    return len(prompt) // CHARS_PER_TOKEN + 1 + max_tokens
+
+
+def test_repeated_prompt_is_served_from_cache(stub_server, tmp_path):
+    stub_server.respond = _chat()
+    client = _client(stub_server)
+    with client.run():
+        assert client.complete("gold?") == "re: gold?"
+        assert client.complete("gold?") == "re: gold?"
+        stats = client.stats()
+    assert len(stub_server.requests) == 1
+    assert (stats["requests"], stats["upstream_calls"], stats["cache_hits"]) == (2, 1, 1)
+    request = stub_server.requests[0]
+    assert request.path == "/v1/chat/completions"
+    assert request.body["model"] == "stub" and request.body["messages"] == [{"role": "user", "content": "gold?"}]
+
+    # A new client over the same disk cache answers without calling the server
+    cache = DiskCache(str(tmp_path))
+    _client(stub_server, cache=cache, use_disk_cache=True).complete("silver?")
+    assert _client(stub_server, cache=cache, use_disk_cache=True).complete("silver?") == "re: silver?"
+    assert len(stub_server.requests) == 2
+
+
+def test_identical_concurrent_requests_share_one_call(stub_server):
+    stub_server.respond = _chat(delay=0.3)
+    client = _client(stub_server)
+    results = []
+    with client.run():
+        threads = [threading.Thread(target=lambda: results.append(client.complete("same"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = client.stats()
+    assert results == ["re: same"] * 5
+    assert len(stub_server.requests) == 1
+    assert stats["upstream_calls"] == 1 and stats["coalesced"] == 4
+
+
+def test_concurrency_is_bounded(stub_server):
+    stub_server.respond = _chat(delay=0.15)
+    client = _client(stub_server, max_concurrency=2)
+    prompts = [f"prompt {i}" for i in range(6)]
+    assert client.complete_many(prompts + prompts[:2]) == [f"re: {p}" for p in prompts + prompts[:2]]
+    assert len(stub_server.requests) == 6
+    assert stub_server.peak == 2
+
+
+def test_token_budget_stops_calls_before_they_are_sent(stub_server):
+    stub_server.respond = _chat(total_tokens=100)
+    client = _client(stub_server, max_tokens=50)
+    budget = 250
+    with client.run(token_budget=budget):
+        client.complete("first")
+        client.complete("second")
+        assert client.stats()["tokens_used"] == 200
+        # Reserving the third call's estimate would exceed the remaining 50 tokens
+        assert _estimate("third", 50) > budget - 200
+        with pytest.raises(TokenBudgetExceeded):
+            client.complete("third")
+        # Cache hits cost nothing
+        assert client.complete("first") == "re: first"
+        assert client.budget.remaining() == 50
+    assert len(stub_server.requests) == 2
+
+
+def test_null_total_tokens_falls_back_to_the_estimate(stub_server):
+    stub_server.respond = _chat(total_tokens=None)
+    client = _client(stub_server, max_tokens=20)
+    with client.run(token_budget=1000):
+        assert client.complete("how much?") == "re: how much?"
+        stats = client.stats()
+    assert stats["tokens_used"] == _estimate("how much?", 20)
+
+
+def test_http_errors_raise_llm_error(stub_server):
+    stub_server.respond = lambda request: (400, {}, {"error": "bad request"})
+    client = _client(stub_server)
+    with client.run(token_budget=1000):
+        with pytest.raises(LLMError):
+            client.complete("oops")
+        # A failed call is charged its estimate and releases its reservation
+        assert client.stats()["tokens_used"] == _estimate("oops", client.max_tokens)
+        assert client.budget.reserved == 0